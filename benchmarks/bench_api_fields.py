@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_matching import bench  # noqa: E402
+from diff_api_walker import DiffApiFieldWalker  # noqa: E402
+
+
+def legacy_api_fields(schema):
+    """
+    Recursive field extraction used by `DiffApiParser` before the memoized
+    `DiffApiFieldWalker`. Kept as the reference implementation.
+    """
+    api_field_list = []
+    api_output_only = []
+
+    def walk(key_origin, value_origin):
+        nested = False
+        key_appendix = key_origin + "." if key_origin != "" else ""
+        try:
+            for key, value in value_origin["properties"].items():
+                if key != "properties":
+                    walk(key_appendix + key, value)
+                else:
+                    walk(key_appendix, value)
+            nested = True
+        except KeyError:
+            pass
+        try:
+            for key, value in value_origin["items"]["properties"].items():
+                walk(key_appendix + key, value)
+            nested = True
+        except KeyError:
+            pass
+        if not nested and key_origin not in api_field_list:
+            description = value_origin.get("description", "")
+            if ("[Output Only]" in description
+                    or "Output only." in description):
+                api_output_only.append(key_origin)
+            else:
+                api_field_list.append(key_origin)
+
+    walk("", schema)
+    return api_field_list, api_output_only
+
+
+def synthetic_schemas(components, shared, fields, seed=0):
+    """
+    Generates dereferenced component schemas referencing `shared` message
+    types (like `NetworkInterface` or `AttachedDisk`) of `fields` fields.
+
+    Returns:
+        dict: Schemas keyed by the component name.
+    """
+    rng = random.Random(seed)
+    messages = []
+    for i in range(shared):
+        properties = {
+            f"field{j}": {"type": "string", "description": f"Field {j}."}
+            for j in range(fields)
+        }
+        properties["state"] = {"description": "[Output Only] State."}
+        # Message types are nested in chains of up to 3 levels, each level
+        # referencing the previous one twice, once as a list item.
+        if i % 3:
+            properties["nested"] = messages[-1]
+            properties["nestedList"] = {
+                "type": "array",
+                "items": messages[-1],
+            }
+        messages.append({"type": "object", "properties": properties})
+
+    return {
+        f"Component{i}": {
+            "type": "object",
+            "properties": {
+                f"message{j}": rng.choice(messages) for j in range(10)
+            },
+        }
+        for i in range(components)
+    }
+
+
+def walker_fields(schemas):
+    walker = DiffApiFieldWalker()
+    tables = {}
+    for component, schema in schemas.items():
+        fields, output_only = walker.component_fields(schema)
+        tables[component] = (list(fields), output_only)
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the API field extraction"
+    )
+    parser.add_argument("-c", "--components", type=int, default=50,
+                        help="Number of components")
+    parser.add_argument("-m", "--messages", type=int, default=40,
+                        help="Number of shared message types")
+    parser.add_argument("-n", "--fields", type=int, default=10,
+                        help="Number of fields per message type")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of repetitions, the best is reported")
+    args = parser.parse_args()
+
+    schemas = synthetic_schemas(args.components, args.messages, args.fields)
+
+    legacy_time, legacy_tables = bench(
+        lambda: {component: legacy_api_fields(schema)
+                 for component, schema in schemas.items()},
+        (),
+        args.repeat
+    )
+    new_time, new_tables = bench(walker_fields, (schemas,), args.repeat)
+    if legacy_tables != new_tables:
+        print("Results of the field extraction implementations differ!")
+        return 1
+
+    print(f"Components: {len(schemas)}, fields: "
+          f"{sum(len(fields) for fields, _ in new_tables.values())}")
+    print(f"recursive extraction: {legacy_time * 1000:10.1f} ms")
+    print(f"memoized extraction:  {new_time * 1000:10.1f} ms")
+    print(f"speedup:              {legacy_time / new_time:10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
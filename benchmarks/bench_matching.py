@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from diff_engine import match_fields  # noqa: E402
+from diff_mapping import DiffMapping  # noqa: E402
+
+
+def legacy_match_fields(api_field_list, api_output_only, tf_field_list,
+                        config):
+    """
+    List based matching used by the report drivers before the set based
+    `match_fields`. Kept as the reference implementation.
+    """
+    mapping = config.get("Mapping") or {}
+    exact_mapping = config.get("ExactMapping") or {}
+
+    api_implemented = []
+    excluded = []
+    api_missing = api_field_list.copy()
+    tf_specific = tf_field_list.copy()
+
+    for tf_field in tf_field_list:
+        mapped_field = ".".join(mapping.get(segment, segment)
+                                for segment in tf_field.split("."))
+        if (mapped_field in api_field_list and
+                mapped_field not in api_implemented):
+            api_implemented.append(mapped_field)
+            api_missing.remove(mapped_field)
+            tf_specific.remove(tf_field)
+
+    for api_field in api_field_list:
+        mapped_field = exact_mapping.get(api_field)
+        if mapped_field is None or mapped_field in api_implemented:
+            continue
+        if mapped_field in tf_specific and api_field in api_missing:
+            api_missing.remove(api_field)
+            api_implemented.append(api_field)
+            tf_specific.remove(mapped_field)
+
+    for excluded_field in config.get("Exclude") or []:
+        if excluded_field in api_missing:
+            api_missing.remove(excluded_field)
+            excluded.append(excluded_field)
+
+    for output_only_field in api_output_only:
+        if output_only_field not in excluded:
+            excluded.append(output_only_field)
+
+    return api_implemented, api_missing, tf_specific, excluded
+
+
+def synthetic_component(fields, seed=0):
+    """
+    Generates a synthetic component with roughly `fields` API fields.
+
+    Returns:
+        tuple: `api_field_list`, `api_output_only`, `tf_field_list` and
+               the component `config`.
+    """
+    rng = random.Random(seed)
+    api_field_list = []
+    for i in range(fields):
+        depth = rng.randint(1, 4)
+        path = [f"field{i}"] + [f"nested{rng.randint(0, 9)}"
+                                for _ in range(depth - 1)]
+        api_field_list.append(".".join(path))
+    api_output_only = [f"outputOnly{i}" for i in range(fields // 20)]
+
+    # Terraform names of every 50th top level field differ from the API
+    # names and are translated by the component mapping.
+    mapping = {f"tfField{i}": f"field{i}" for i in range(0, fields, 50)}
+    tf_names = {value: key for key, value in mapping.items()}
+    tf_field_list = [
+        ".".join(tf_names.get(segment, segment)
+                 for segment in field.split("."))
+        for field in api_field_list if rng.random() < 0.7
+    ]
+    tf_field_list += [f"tfOnly{i}" for i in range(fields // 10)]
+    rng.shuffle(tf_field_list)
+
+    config = {
+        "Mapping": mapping,
+        "ExactMapping": {
+            api_field_list[i]: f"tfOnly{i}"
+            for i in range(0, fields // 10, 7)
+        },
+        "Exclude": rng.sample(api_field_list, fields // 100),
+    }
+    return api_field_list, api_output_only, tf_field_list, config
+
+
+def bench(function, args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the API and Terraform field matching"
+    )
+    parser.add_argument("-n", "--fields", type=int, default=20000,
+                        help="Number of API fields of the component")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of repetitions, the best is reported")
+    args = parser.parse_args()
+
+    component = synthetic_component(args.fields)
+    print(f"API fields: {len(component[0])}, "
+          f"Terraform fields: {len(component[2])}")
+
+    legacy_time, legacy_result = bench(legacy_match_fields, component,
+                                       args.repeat)
+    api_field_list, api_output_only, tf_field_list, config = component
+    new_time, new_result = bench(
+        lambda: match_fields(api_field_list, api_output_only, tf_field_list,
+                             DiffMapping(config)),
+        (),
+        args.repeat
+    )
+    if legacy_result != new_result:
+        print("Results of the matching implementations differ!")
+        return 1
+
+    print(f"list based matching: {legacy_time * 1000:10.1f} ms")
+    print(f"set based matching:  {new_time * 1000:10.1f} ms")
+    print(f"speedup:             {legacy_time / new_time:10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_matching import bench  # noqa: E402
+from diff_report_differ import diff_reports  # noqa: E402
+
+try:
+    import deepdiff
+except ImportError:
+    deepdiff = None
+
+
+def synthetic_reports(components, fields, seed=0):
+    """
+    Generates an old and a new compare-apis report with `components`
+    components of roughly `fields` beta only fields each. Every 10th
+    component changes between the reports.
+
+    Returns:
+        tuple: The old and the new report.
+    """
+    rng = random.Random(seed)
+    old = {}
+    new = {}
+    for i in range(components):
+        component = f"Component{i}"
+        old[component] = [f"field{j}" for j in range(rng.randint(0, fields))]
+        new[component] = list(old[component])
+        if i % 10 == 0:
+            new[component] = new[component][fields // 10:]
+            new[component] += [f"betaField{j}" for j in range(fields // 10)]
+    return old, new
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the report differ"
+    )
+    parser.add_argument("-c", "--components", type=int, default=5000,
+                        help="Number of components of the report")
+    parser.add_argument("-n", "--fields", type=int, default=50,
+                        help="Maximal number of fields per component")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of repetitions, the best is reported")
+    args = parser.parse_args()
+
+    old, new = synthetic_reports(args.components, args.fields)
+    print(f"Components: {len(new)}, "
+          f"fields: {sum(len(fields) for fields in new.values())}")
+
+    new_time, deltas = bench(diff_reports, (old, new), args.repeat)
+    print(f"changed components: {len(deltas)}")
+    print(f"set based differ: {new_time * 1000:10.1f} ms")
+    if deepdiff is None:
+        print("deepdiff is not installed, skipping the reference")
+        return 0
+
+    deepdiff_time, _ = bench(deepdiff.DeepDiff, (new, old), args.repeat)
+    print(f"deepdiff:         {deepdiff_time * 1000:10.1f} ms")
+    print(f"speedup:          {deepdiff_time / new_time:10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_matching import bench  # noqa: E402
+from bench_synthetic import TF_VERSIONS, SyntheticApi  # noqa: E402
+from diff_api_parser import DiffApiParser  # noqa: E402
+from diff_api_walker import (  # noqa: E402
+    DiffApiFieldWalker,
+    iter_azure_api_fields
+)
+from diff_aws_schema_loader import DiffAwsSchemaLoader  # noqa: E402
+from diff_azure_schema_store import DiffAzureSchemaStore  # noqa: E402
+from diff_common import DiffCommon  # noqa: E402
+from diff_discovery_cache import DiffDiscoveryCache  # noqa: E402
+from diff_engine import match_fields  # noqa: E402
+from diff_mapping import DiffMapping  # noqa: E402
+from diff_report_sink import DiffReportSink  # noqa: E402
+from diff_tf_parser import DiffTfParser, iter_tf_fields  # noqa: E402
+
+API = "compute"
+STAGES = ("discovery_fetch", "get_api_schemas", "api_fields", "get_tf_schemas",
+          "get_tf_component_schema", "tf_fields", "matching",
+          "report_writing", "aws_schemas", "azure_schemas")
+STUB_TERRAFORM = """#!/bin/sh
+dir=$(dirname "$0")
+if [ "$1" = "version" ]; then exec cat "$dir/version.json"; fi
+if [ "$1" = "providers" ]; then exec cat "$dir/schema.json"; fi
+exit 1
+"""
+
+
+class BenchDriver(DiffCommon, DiffApiParser, DiffTfParser):
+    """
+    Report driver state of the benchmarked stages, set without parsing the
+    command line.
+    """
+    def __init__(self, workspace, discovery_url):
+        self.log = logging.getLogger(__name__)
+        self.cwd = workspace
+        self.tf_config_path = os.path.join(workspace, "tf")
+        self.cache_dir = os.path.join(workspace, "cache")
+        self.discovery_urls = {API: discovery_url}
+        self.api = API
+        self.date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.save_file = False
+
+
+class StubDiscoveryHandler(BaseHTTPRequestHandler):
+    """
+    Serves the synthetic discovery document of the stub HTTP server.
+    """
+    def do_GET(self):
+        body = self.server.document
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_workspace(workspace, api):
+    """
+    Writes the synthetic schemas, the stub `terraform` command and the
+    Terraform configuration into the workspace.
+    """
+    bin_dir = os.path.join(workspace, "bin")
+    os.makedirs(bin_dir)
+    with open(os.path.join(bin_dir, "version.json"), "w") as f:
+        json.dump(TF_VERSIONS, f)
+    with open(os.path.join(bin_dir, "schema.json"), "w") as f:
+        json.dump(api.tf_schema(), f)
+    terraform = os.path.join(bin_dir, "terraform")
+    with open(terraform, "w") as f:
+        f.write(STUB_TERRAFORM)
+    os.chmod(terraform, 0o755)
+
+    os.makedirs(os.path.join(workspace, "tf"))
+    with open(os.path.join(workspace, "tf", "main.tf"), "w") as f:
+        f.write("")
+
+    aws_dir = os.path.join(workspace, "aws")
+    os.makedirs(aws_dir)
+    for name, schema in api.cfn_schemas().items():
+        with open(os.path.join(aws_dir, f"{name}.json"), "w") as f:
+            json.dump(schema, f)
+
+    azure_path = os.path.join(workspace, "azure.json")
+    with open(azure_path, "w") as f:
+        json.dump(api.arm_document(), f)
+    return bin_dir, aws_dir, azure_path
+
+
+def fresh_dir(workspace, name):
+    path = os.path.join(workspace, name)
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def run_stages(args, workspace, selected):
+    """
+    Runs the selected stages and returns their best times in seconds and
+    their counts.
+    """
+    api = SyntheticApi(resources=args.resources, fields=args.fields,
+                       depth=args.depth, fan_out=args.fan_out,
+                       shared=args.shared)
+    bin_dir, aws_dir, azure_path = stub_workspace(workspace, api)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDiscoveryHandler)
+    server.document = json.dumps(api.discovery_document(API)).encode()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/{API}.json"
+
+    driver = BenchDriver(workspace, url)
+    components = list(api.resources)
+    times = {}
+    counts = {}
+
+    def stage(name, function, *function_args):
+        # Stages depend on the results of the previous ones, so they are run
+        # once even if only their dependents are selected.
+        elapsed, result = bench(function, function_args,
+                                args.repeat if name in selected else 1)
+        if name in selected:
+            times[name] = elapsed
+        return result
+
+    def fetch():
+        return DiffDiscoveryCache(
+            driver.log, cache_dir=fresh_dir(workspace, "discovery")
+        ).get_discovery_doc(API, url)
+
+    discovery_doc = stage("discovery_fetch", fetch)
+    counts["discovery_bytes"] = len(server.document)
+    stage("get_api_schemas", driver.get_api_schemas, API, discovery_doc)
+    counts["api_fields"] = sum(
+        len(fields) for fields, _ in driver.api_field_tables.values()
+    )
+
+    def api_fields():
+        walker = DiffApiFieldWalker()
+        return [walker.component_fields(driver.api_schemas[component])
+                for component in components]
+    if "api_fields" in selected:
+        stage("api_fields", api_fields)
+
+    selection = driver.get_tf_resource_selection(components, API)
+    if not stage("get_tf_schemas", driver.get_tf_schemas, selection):
+        raise RuntimeError("Cannot get the stub Terraform schemas!")
+    driver.build_tf_resource_index(API)
+    driver.get_tf_provider_version(API)
+
+    def tf_component_schemas():
+        schemas = {}
+        for component in components:
+            driver.get_tf_component_schema(component, API)
+            schemas[component] = driver.component_tf_schema
+        return schemas
+    tf_schemas = stage("get_tf_component_schema", tf_component_schemas)
+
+    tf_fields = stage("tf_fields", lambda: {
+        component: [path for path, _, _ in iter_tf_fields(schema)]
+        for component, schema in tf_schemas.items()
+    })
+    counts["tf_fields"] = sum(len(fields) for fields in tf_fields.values())
+
+    mapping = DiffMapping()
+    results = stage("matching", lambda: {
+        component: match_fields(*driver.api_field_tables[component],
+                                tf_fields[component], mapping)
+        for component in components
+    })
+    counts["api_implemented"] = sum(
+        len(api_implemented) for api_implemented, _, _, _ in results.values()
+    )
+
+    def write_reports():
+        directory = fresh_dir(workspace, "reports")
+        driver.report_sink = DiffReportSink(
+            driver.log, os.path.join(directory, "report"),
+            stream_format=args.consolidated_report
+        )
+        with driver.report_sink:
+            for component, result in results.items():
+                driver.component = component
+                driver.save_new_report(*result, directory=directory)
+                driver.report_sink.add_row([component] + [
+                    len(fields) for fields in result
+                ])
+    if "report_writing" in selected:
+        stage("report_writing", write_reports)
+
+    if "aws_schemas" in selected:
+        stage("aws_schemas", lambda: DiffAwsSchemaLoader(
+            driver.log, aws_dir,
+            cache_dir=fresh_dir(workspace, "aws-cache")
+        ).load(name[:-len(".json")] for name in os.listdir(aws_dir)))
+
+    def azure_schemas():
+        store = DiffAzureSchemaStore(driver.log)
+        return {
+            component: list(iter_azure_api_fields(
+                store.get_definition(azure_path, component)
+            ))
+            for component in components
+        }
+    if "azure_schemas" in selected:
+        stage("azure_schemas", azure_schemas)
+
+    server.shutdown()
+    counts["resources"] = len(components)
+    return times, counts
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_record(path, params):
+    """
+    Returns the last record of the results file with the same parameters.
+    """
+    previous = None
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("params") == params:
+                    previous = record
+    except (OSError, ValueError):
+        return None
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=("Benchmark of the report stages on synthetic schemas,"
+                     " with stub Terraform and discovery HTTP server")
+    )
+    parser.add_argument("-c", "--resources", type=int, default=50,
+                        help="Number of resources")
+    parser.add_argument("-n", "--fields", type=int, default=20,
+                        help="Number of fields per message type")
+    parser.add_argument("-d", "--depth", type=int, default=3,
+                        help="Nesting depth of the message types")
+    parser.add_argument("-f", "--fan_out", type=int, default=2,
+                        help="Number of $ref of every message type")
+    parser.add_argument("-m", "--shared", type=int, default=20,
+                        help="Number of shared message types per level")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Number of repetitions, the best is reported")
+    parser.add_argument("-s", "--stages", nargs="+", choices=STAGES,
+                        default=list(STAGES), help="Stages to run")
+    parser.add_argument("--consolidated_report", choices=("jsonl", "yaml"),
+                        help="Write the reports to a consolidated stream")
+    parser.add_argument("-o", "--results",
+                        help=("Append the results to the JSON Lines file and"
+                              " compare them with the previous run of the"
+                              " same parameters"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    params = {key: getattr(args, key)
+              for key in ("resources", "fields", "depth", "fan_out",
+                          "shared", "consolidated_report")}
+    workspace = tempfile.mkdtemp(prefix="gcpdiff-bench-")
+    path = os.environ["PATH"]
+    try:
+        times, counts = run_stages(args, workspace, set(args.stages))
+    finally:
+        os.environ["PATH"] = path
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    previous = previous_record(args.results, params) if args.results else None
+    print(", ".join(f"{key}: {value}" for key, value in counts.items()))
+    for name in STAGES:
+        if name not in times:
+            continue
+        line = f"{name:24} {times[name] * 1000:10.1f} ms"
+        before = previous and previous["stages"].get(name)
+        if before:
+            line += f" {(times[name] / before - 1) * 100:+8.1f}%"
+        print(line)
+
+    if args.results:
+        record = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "params": params,
+            "counts": counts,
+            "stages": times,
+        }
+        with open(args.results, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import random
+import re
+
+from dataclasses import dataclass, field
+
+GOOGLE_PROVIDER = "registry.terraform.io/hashicorp/google"
+GOOGLE_BETA_PROVIDER = "registry.terraform.io/hashicorp/google-beta"
+TF_VERSIONS = {
+    "terraform_version": "1.9.0",
+    "provider_selections": {
+        GOOGLE_PROVIDER: "6.10.0",
+        GOOGLE_BETA_PROVIDER: "6.10.0",
+    },
+}
+
+
+def camel_to_snake(name):
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+@dataclass
+class SyntheticMessage:
+    """
+    Message type of the synthetic API: scalar fields and references to the
+    message types of the next nesting level.
+
+    Attributes:
+        fields (list): `(name, output_only)` tuples of the scalar fields.
+        refs (list): `(name, message, is_list)` tuples of the references.
+    """
+    fields: list = field(default_factory=list)
+    refs: list = field(default_factory=list)
+
+
+class SyntheticApi:
+    """
+    Synthetic API whose resources reference shared message types nested in
+    `depth` levels, every message referencing `fan_out` messages of the next
+    level. The same API is rendered as a Google discovery document, as
+    CloudFormation and Azure Resource Manager schemas and as the output of
+    `terraform providers schema -json` with Terraform resources implementing
+    a part of the API fields.
+    """
+    def __init__(self, resources=50, fields=20, depth=3, fan_out=2,
+                 shared=20, seed=0):
+        """
+        Args:
+            resources (int): Number of resources.
+            fields (int): Number of scalar fields of every message.
+            depth (int): Number of nesting levels of the message types.
+            fan_out (int): Number of references of every message to the
+                           message types of the next level.
+            shared (int): Number of message types of every level.
+            seed (int): Seed of the random generator.
+        """
+        self.rng = random.Random(seed)
+        self.messages = {}
+        for level in range(depth, 0, -1):
+            for i in range(shared):
+                self.messages[f"Message{level}x{i}"] = self._message(
+                    fields,
+                    fan_out if level < depth else 0,
+                    [f"Message{level + 1}x{j}" for j in range(shared)]
+                )
+        self.resources = {
+            f"Resource{i}": self._message(
+                fields, fan_out, [f"Message1x{j}" for j in range(shared)]
+            )
+            for i in range(resources)
+        }
+
+    def _message(self, fields, fan_out, targets):
+        message = SyntheticMessage(
+            fields=[(f"field{j}", j % 10 == 9) for j in range(fields)]
+        )
+        for k, target in enumerate(self.rng.sample(targets, fan_out)
+                                   if targets and fan_out else []):
+            message.refs.append(
+                (f"nestedList{k}" if k % 2 else f"nested{k}", target, k % 2)
+            )
+        return message
+
+    def reachable(self, message):
+        """
+        Returns the names of the message types reachable from the message.
+        """
+        names = set()
+        stack = [message]
+        while stack:
+            for _, target, _ in stack.pop().refs:
+                if target not in names:
+                    names.add(target)
+                    stack.append(self.messages[target])
+        return names
+
+    def _properties(self, message, ref):
+        properties = {}
+        for name, output_only in message.fields:
+            properties[name] = {
+                "type": "string",
+                "description": ("[Output Only] Synthetic field."
+                                if output_only else "Synthetic field."),
+            }
+        for name, target, is_list in message.refs:
+            properties[name] = ({"type": "array", "items": ref(target)}
+                                if is_list else ref(target))
+        return properties
+
+    def discovery_document(self, name="compute"):
+        """
+        Returns the Google discovery document of the API.
+        """
+        def ref(target):
+            return {"$ref": target}
+
+        schemas = {}
+        for schema_id, message in {**self.resources,
+                                   **self.messages}.items():
+            schemas[schema_id] = {
+                "id": schema_id,
+                "type": "object",
+                "properties": self._properties(message, ref),
+            }
+        return {"kind": "discovery#restDescription", "name": name,
+                "schemas": schemas}
+
+    def cfn_schemas(self):
+        """
+        Returns the CloudFormation schemas of the resources keyed by the
+        schema file name.
+        """
+        def ref(target):
+            return {"$ref": f"#/definitions/{target}"}
+
+        schemas = {}
+        for i, (resource, message) in enumerate(self.resources.items()):
+            schemas[f"aws-bench-{resource.lower()}"] = {
+                "typeName": f"AWS::Bench::{resource}",
+                "properties": self._properties(message, ref),
+                "definitions": {
+                    target: {
+                        "type": "object",
+                        "properties": self._properties(
+                            self.messages[target], ref
+                        ),
+                    }
+                    for target in sorted(self.reachable(message))
+                },
+            }
+        return schemas
+
+    def arm_document(self):
+        """
+        Returns the Azure Resource Manager schema document of the API.
+        """
+        def ref(target):
+            return {"oneOf": [{"$ref": f"#/definitions/{target}"}]}
+
+        definitions = {
+            name: {"type": "object",
+                   "properties": self._properties(message, ref)}
+            for name, message in self.messages.items()
+        }
+        resource_definitions = {}
+        for resource, message in self.resources.items():
+            definitions[f"{resource}Properties"] = {
+                "type": "object",
+                "properties": self._properties(message, ref),
+            }
+            resource_definitions[resource] = {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "properties": ref(f"{resource}Properties"),
+                },
+            }
+        return {"id": "https://schema.management.azure.com/bench.json#",
+                "resourceDefinitions": resource_definitions,
+                "definitions": definitions}
+
+    def _tf_block(self, message, coverage, tf_only):
+        attributes = {
+            camel_to_snake(name): {"type": "string", "optional": True}
+            for name, output_only in message.fields
+            if not output_only and self.rng.random() < coverage
+        }
+        for k in range(tf_only):
+            attributes[f"tf_only{k}"] = {"type": "string", "optional": True}
+        block_types = {
+            camel_to_snake(name): {
+                "nesting_mode": "list",
+                "block": self._tf_block(self.messages[target], coverage,
+                                        tf_only),
+            }
+            for name, target, _ in message.refs
+        }
+        return {"attributes": attributes, "block_types": block_types}
+
+    def tf_schema(self, prefix="google_compute_", coverage=0.7, tf_only=2,
+                  other_resources=200):
+        """
+        Returns the output of `terraform providers schema -json` with
+        a Terraform resource of every API resource, implementing the
+        `coverage` part of the API fields, and `other_resources` resources of
+        other APIs, which are skipped by the streamed parser.
+        """
+        resource_schemas = {
+            f"{prefix}{camel_to_snake(resource)}": {
+                "version": 0,
+                "block": self._tf_block(message, coverage, tf_only),
+            }
+            for resource, message in self.resources.items()
+        }
+        other = SyntheticMessage(
+            fields=[(f"field{j}", False) for j in range(20)]
+        )
+        for i in range(other_resources):
+            resource_schemas[f"google_other_resource{i}"] = {
+                "version": 0,
+                "block": self._tf_block(other, 1.0, 0),
+            }
+        provider_schema = {"provider": {"version": 0, "block": {}},
+                           "resource_schemas": resource_schemas,
+                           "data_source_schemas": {}}
+        return {"format_version": "1.0",
+                "provider_schemas": {GOOGLE_PROVIDER: provider_schema,
+                                     GOOGLE_BETA_PROVIDER: provider_schema}}
@@ -5,12 +5,16 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
-import deepdiff
 import os
 import yaml
 
 from datetime import datetime
+from diff_api_pair import compare_api_pair
+from diff_common import YamlDumper, write_atomic
+from diff_config import API_URLS
+from diff_profiler import PROFILE_STATS_SUFFIX, PROFILE_SUFFIX, DiffProfiler
 from diff_report import DiffReport
+from diff_report_differ import diff_reports
 
 
 class DiffApiCompare(DiffReport):
@@ -19,6 +23,7 @@ class DiffApiCompare(DiffReport):
     """
     def __init__(self):
         parser = self.diff_cmdline()
+        self.diff_discovery_cmdline(parser)
         parser.add_argument(
             "-d",
             "--diff_report",
@@ -27,12 +32,60 @@ class DiffApiCompare(DiffReport):
                 " report"
             )
         )
+        parser.add_argument(
+            "-b",
+            "--compare_api",
+            choices=API_URLS.keys(),
+            help=(
+                "The API compared with the base API. Defaults to the beta"
+                " version of the base API"
+            )
+        )
         self._cmd_input = parser.parse_args()
+        self.cwd = os.getcwd()
+        self.api, self.compare_api = self.get_api_pair(
+            self._cmd_input.api,
+            self._cmd_input.compare_api
+        )
+        if not self.compare_api or self.compare_api == self.api:
+            parser.error(f"No API to compare with {self.api}! Use"
+                         " --compare_api.")
+        self.discovery_urls = {**API_URLS,
+                               **dict(self._cmd_input.discovery_url)}
         self.tf_config_path = self._cmd_input.terraform_config
         self.save_file = self._cmd_input.save_file
+        self.cache_dir = os.path.abspath(self._cmd_input.cache_dir)
+        self.cache_ttl = self._cmd_input.cache_ttl
+        self.offline = self._cmd_input.offline
+        self.refresh_tf_cache = self._cmd_input.refresh_tf_cache
         self.verbose = self._cmd_input.verbose
         self.old_yaml_report_path = self._cmd_input.diff_report
         self.diff_log(verbose=self.verbose)
+        self.profiler = DiffProfiler(self.log,
+                                     enabled=self._cmd_input.profile,
+                                     stats=self._cmd_input.profile_stats)
+
+    @staticmethod
+    def get_api_pair(api, compare_api=None):
+        """
+        Returns the base and the compared API. The base API is the V1
+        version of `api`, so both `-a compute` and `-a compute-beta` compare
+        `compute` with `compute-beta`.
+
+        Args:
+            api (str): Name of the API.
+            compare_api (str, optional): Name of the compared API.
+
+        Returns:
+            tuple: Names of the base and the compared API. The compared API
+                   is `None` if `api` has no beta version.
+        """
+        base_api = api
+        if api.endswith("-beta") and api[:-len("-beta")] in API_URLS:
+            base_api = api[:-len("-beta")]
+        if not compare_api and f"{base_api}-beta" in API_URLS:
+            compare_api = f"{base_api}-beta"
+        return base_api, compare_api
 
     def generate_api_comparison(self):
         """
@@ -45,44 +98,47 @@ class DiffApiCompare(DiffReport):
             self.log.error("Cannot get YAML config! Exiting...")
             exit(1)
 
-        self.log.info("Changing directory to terraform config place")
-        if not self.change_to_tf_dir():
-            self.log.error("Cannot change workspace directory! Exiting...")
-            exit(1)
-
-        self.log.info("Getting V1 API Schemas")
-        if not self.get_api_schemas(api="compute"):
-            self.log.error("Cannot get V1 API schemas! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
-
-        v1_api_schemas_list = []
-        v1_api_schemas = self.api_schemas.copy()
-        for component in self.api_schemas:
-            v1_api_schemas_list.append(component)
-
-        self.log.info("Getting beta API Schemas")
-        if not self.get_api_schemas(api="compute-beta"):
-            self.log.error("Cannot get Beta API schemas! Exiting...")
-            os.chdir(self.cwd)
+        self.log.info("Checking terraform config place")
+        if not self.check_tf_dir():
+            self.log.error("Cannot use terraform config directory!"
+                           " Exiting...")
             exit(1)
 
-        beta_api_schemas_list = []
-        beta_api_schemas = self.api_schemas.copy()
-        for component in self.api_schemas:
-            beta_api_schemas_list.append(component)
+        self.log.info(f"Getting {self.api} API Schemas")
+        with self.profiler.stage("api_schemas"):
+            if not self.get_api_schemas(api=self.api):
+                self.log.error(f"Cannot get {self.api} API schemas!"
+                               " Exiting...")
+                exit(1)
+        base_api_schemas = self.api_schemas
+
+        self.log.info(f"Getting {self.compare_api} API Schemas")
+        with self.profiler.stage("compared_api_schemas"):
+            if not self.get_api_schemas(api=self.compare_api):
+                self.log.error(f"Cannot get {self.compare_api} API schemas!"
+                               " Exiting...")
+                exit(1)
+        compared_api_schemas = self.api_schemas
 
         self.log.info("Getting Terraform Schemas")
-        if not self.get_tf_schemas():
-            self.log.error("Cannot get Terraform schema! Exiting...")
-            os.chdir(self.cwd)
+        tf_resources = self.get_tf_resources_for_components(
+            base_api_schemas,
+            self.api
+        )
+        with self.profiler.stage("tf_schemas"):
+            if not self.get_tf_schemas(resources=tf_resources):
+                self.log.error("Cannot get Terraform schema! Exiting...")
+                exit(1)
+        if not self.build_tf_resource_index(self.api):
+            self.log.error("Cannot index Terraform resources! Exiting...")
+            exit(1)
+        if not self.get_tf_provider_version(self.api):
+            self.log.error("Cannot get Terraform provider version! Exiting...")
             exit(1)
 
-        self.log.info("Getting Matching V1 Terraform Resources")
-        matching_schemas_v1 = {}
-        not_matching_api_v1 = []
-
-        for component in v1_api_schemas_list:
+        self.log.info(f"Getting Matching {self.api} Terraform Resources")
+        matching_components = []
+        for component in base_api_schemas:
             self.log.debug(f"Trying to match {component} with Terraform"
                            " resource")
             related_resources = {component: None}
@@ -93,64 +149,68 @@ class DiffApiCompare(DiffReport):
             except KeyError:
                 pass
 
-            tf_schemas = {}
-            for resource, _ in related_resources.items():
-                if not self.get_tf_component_schema(
-                    resource,
-                    "compute",
-                    save_file=self.save_file
-                ):
-                    self.log.debug("Could not get Terraform "
-                                   f"schema for {resource}")
-                    continue
-                tf_schemas.update({resource: self.component_tf_schema})
-
-            if not tf_schemas:
+            if not any(self.has_tf_component_schema(resource, self.api)
+                       for resource in related_resources):
                 self.log.debug("Could not get matching Terraform resource for"
                                f" {component}")
-                not_matching_api_v1.append(component)
                 continue
-            matching_schemas_v1.update(
-                {component: tf_schemas}
-            )
-
-        report_dir = os.path.join(self.cwd, f"{self.date}-compare-"
-                                  f"apis-v{self.tf_provider_version}.yaml")
+            matching_components.append(component)
+
+        api_names = "" if self.api == "compute" else f"-{self.api}"
+        report_dir = os.path.join(self.cwd, f"{self.date}-compare-apis"
+                                  f"{api_names}-v{self.tf_provider_version}"
+                                  ".yaml")
+        details_dir = os.path.join(self.cwd, f"{self.date}-compare-apis"
+                                   f"{api_names}-details-v"
+                                   f"{self.tf_provider_version}.yaml")
         if os.path.exists(report_dir):
             self.log.error("Compare report file exist! Check the"
                            f" content of this path: {report_dir}. Exiting...")
             exit(1)
 
         self.log.info("Creating API schemas comparison for components")
-        for component in matching_schemas_v1.keys():
-            if not self.compare_api_fields(component, v1_api_schemas,
-                                           beta_api_schemas,
-                                           report_dir=report_dir):
-                self.log.error(f"Cannot compare {component} v1 and beta"
-                               " schemas!")
-                continue
-
-        if not os.path.exists(report_dir):
-            self.log.error("Creation of the comparison report failed!"
-                           " Exiting...")
+        with self.profiler.stage("compare") as stage:
+            if not self.compare_api_fields(matching_components,
+                                           base_api_schemas,
+                                           compared_api_schemas,
+                                           report_dir=report_dir,
+                                           details_dir=details_dir):
+                self.log.error("Creation of the comparison report failed!"
+                               " Exiting...")
+                exit(1)
+            stage.count(components=len(self.api_comparison))
+
+        profile_base = os.path.join(self.cwd, f"{self.date}-compare-apis"
+                                    f"{api_names}-v"
+                                    f"{self.tf_provider_version}")
+        if not self.profiler.dump_stats(
+            f"{profile_base}{PROFILE_STATS_SUFFIX}",
+            compare_api_pair,
+            base_api_schemas,
+            compared_api_schemas,
+            matching_components
+        ):
+            self.log.error("Cannot save profile statistics! Exiting...")
+            exit(1)
+        if not self.profiler.save(f"{profile_base}{PROFILE_SUFFIX}"):
+            self.log.error("Cannot save timing report! Exiting...")
             exit(1)
 
         self.log.info("Comparison report created successfully! Check file:"
                       f" {report_dir}")
-        os.chdir(self.cwd)
 
         if (not hasattr(self, "old_yaml_report_path")
                 or not self.old_yaml_report_path):
             return
 
-        if not self._check_new_api_differences(report_dir):
+        if not self._check_new_api_differences():
             self.log.error("Cannot compare new report with old report! "
                            "Exiting...")
-            os.chdir(self.cwd)
             exit(1)
 
         compare_dir = os.path.join(self.cwd, f"{self.date}-reports-comparison"
-                                   f"-v{self.tf_provider_version}.yaml")
+                                   f"{api_names}-v{self.tf_provider_version}"
+                                   ".yaml")
 
         if os.path.exists(compare_dir):
             self.log.error("Report comparison file exist! Check the"
@@ -160,69 +220,73 @@ class DiffApiCompare(DiffReport):
         with open(compare_dir, "w") as f:
             yaml.dump(self.result, f)
 
-    def compare_api_fields(self, component, v1_schemas, beta_schemas,
-                           report_dir=None):
+    def compare_api_fields(self, components, base_schemas, compared_schemas,
+                           report_dir=None, details_dir=None):
         """
-        Compares API fields between V1 and beta schemas for a specified
-        component and generates a report of fields that are only present
-        in the beta schema.
+        Compares API fields of the components between the base and the
+        compared API schemas. The report of the fields that are only present
+        in the compared schemas is saved to `report_dir`. The fields present
+        only in the base schemas and the fields with changed descriptions
+        are saved to `details_dir`.
+
         Args:
-            component (str): The name of the component to compare.
-            v1_schemas (dict): A dictionary containing V1 API schemas.
-            beta_schemas (dict): A dictionary containing beta API schemas.
-            report_dir (str): The directory path to save the comparison report.
+            components (list): Names of the components to compare.
+            base_schemas (dict): Dereferenced base API schemas.
+            compared_schemas (dict): Dereferenced compared API schemas.
+            report_dir (str): The file path of the comparison report.
+            details_dir (str, optional): The file path of the detailed
+                                         comparison report.
+
         Returns:
             bool: True if the comparison is successful and the report is
-                   created, False otherwise.
+                  created, False otherwise.
         """
         if not hasattr(self, 'log'):
             print("Error: Logger not found!")
             return False
 
-        self.log.debug(f"Getting v1 api schema for {component}")
-        component_v1_schema = v1_schemas.get(component)
-        if not component_v1_schema:
-            self.log.error("The specified component not found in the schema!")
+        results, missing = compare_api_pair(base_schemas, compared_schemas,
+                                            components)
+        for component in missing:
+            self.log.error(f"The {component} component not found in the"
+                           f" {self.api} or {self.compare_api} schema!")
+
+        self.api_comparison = {}
+        details = {}
+        for result in results:
+            self.log.debug(f"{result.component}: {len(result.compared_only)}"
+                           f" fields only in {self.compare_api},"
+                           f" {len(result.base_only)} fields only in"
+                           f" {self.api}, {len(result.changed_description)}"
+                           " changed descriptions")
+            self.api_comparison[result.component] = result.compared_only
+            details[result.component] = {
+                f"{self.compare_api}_only": result.compared_only,
+                f"{self.api}_only": result.base_only,
+                "changed_description": result.changed_description,
+            }
+
+        if not self.api_comparison:
+            self.log.error("No components were compared!")
             return False
 
-        self.log.debug(f"Getting beta api schema for {component}")
-        component_beta_schema = beta_schemas.get(component)
-        if not component_beta_schema:
-            self.log.error("The specified component not found in the schema!")
-            return False
-
-        self.log.debug(f"Getting api fields for {component} v1")
-        self.component_api_schema = component_v1_schema
-        if not self.get_api_fields():
-            self.log.error(f"Cannot get API fields for {component} v1!")
-            return False
-        component_v1_fields = self.api_field_list.copy()
-
-        self.log.debug(f"Getting api fields for {component} beta")
-        self.component_api_schema = component_beta_schema
-        if not self.get_api_fields():
-            self.log.error(f"Cannot get API fields for {component} beta!")
-            return False
-        component_beta_fields = self.api_field_list.copy()
-
-        self.log.debug(f"Fields only in beta API {component} schema")
-        beta_only_fields = [
-            field for field in component_beta_fields
-            if field not in component_v1_fields
-        ]
-
-        with open(report_dir, "a") as f:
-            yaml.dump({component: beta_only_fields}, f)
-        if not os.path.exists(report_dir):
+        try:
+            write_atomic(report_dir, yaml.dump(
+                self.api_comparison, Dumper=YamlDumper, sort_keys=False
+            ).encode())
+            if details_dir:
+                write_atomic(details_dir, yaml.dump(
+                    details, Dumper=YamlDumper, sort_keys=False
+                ).encode())
+        except OSError as e:
+            self.log.error(f"Cannot save the comparison report: {e}")
             return False
         return True
 
-    def _check_new_api_differences(self, report_dir):
+    def _check_new_api_differences(self):
         """
         Compares the newly generated API comparison report with an old report
         and identifies differences between them.
-        Args:
-            report_dir (str): The directory path of the new comparison report.
         Returns:
             bool: True if the comparison is successful, False otherwise.
         """
@@ -231,28 +295,20 @@ class DiffApiCompare(DiffReport):
             self.log.error("Cannot get old YAML report! Exiting...")
             return False
 
-        with open(report_dir, "r") as yaml_report:
-            diff = deepdiff.DeepDiff(yaml.safe_load(yaml_report),
-                                     self.yaml_old_report)
+        deltas = diff_reports(self.yaml_old_report, self.api_comparison)
         self.result = {"Added to beta API": {}, "Implemented in V1 API": {}}
-        for action, values in diff.items():
-            if action == "iterable_item_added":
-                key = "Added to beta API"
-            elif action == "iterable_item_removed":
-                key = "Implemented in V1 API"
-            else:
-                self.log.error(f"Unknown action {action} found!")
-                return False
-            for resource, value in values.items():
-                resource_formatted = resource.split("root['")[1].split("']")[0]
-                try:
-                    resource_values = self.result[key][resource_formatted]
-                    resource_values.append(value)
-                    self.result[key].update(
-                        {resource_formatted: resource_values}
-                    )
-                except KeyError:
-                    self.result[key].update({resource_formatted: [value]})
+        for component, delta in deltas.items():
+            self.log.info(f"{component}: {delta.added_count} fields added to"
+                          f" beta API, {delta.removed_count} fields"
+                          " implemented in V1 API")
+            if delta.added:
+                self.result["Added to beta API"][component] = (
+                    delta.added[None]
+                )
+            if delta.removed:
+                self.result["Implemented in V1 API"][component] = (
+                    delta.removed[None]
+                )
 
         return True
 
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from dataclasses import dataclass, field
+from diff_api_walker import DiffApiFieldWalker
+
+
+@dataclass
+class DiffApiPairResult:
+    """
+    Differences between the schemas of a component in two API versions.
+    """
+    component: str
+    base_only: list = field(default_factory=list)
+    compared_only: list = field(default_factory=list)
+    changed_description: list = field(default_factory=list)
+
+
+def compare_api_pair(base_schemas, compared_schemas, components):
+    """
+    Compares the fields of the components in two versions of an API (e.g.
+    `compute` and `compute-beta`).
+
+    Args:
+        base_schemas (dict): Dereferenced schemas of the base API version.
+        compared_schemas (dict): Dereferenced schemas of the compared API
+                                 version.
+        components (iterable): Names of the components to compare.
+
+    Returns:
+        tuple: `DiffApiPairResult` objects of the components present in both
+               versions and the names of the components missing in any of
+               them.
+    """
+    base_walker = DiffApiFieldWalker()
+    compared_walker = DiffApiFieldWalker()
+    results = []
+    missing = []
+    for component in components:
+        base_schema = base_schemas.get(component)
+        compared_schema = compared_schemas.get(component)
+        if not base_schema or not compared_schema:
+            missing.append(component)
+            continue
+
+        base_fields, _ = base_walker.component_fields(base_schema)
+        compared_fields, _ = compared_walker.component_fields(compared_schema)
+        results.append(DiffApiPairResult(
+            component,
+            base_only=[f for f in base_fields if f not in compared_fields],
+            compared_only=[f for f in compared_fields if f not in base_fields],
+            changed_description=[
+                f for f, description in base_fields.items()
+                if f in compared_fields
+                and compared_fields[f] != description
+            ]
+        ))
+    return results, missing
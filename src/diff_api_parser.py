@@ -7,20 +7,40 @@
 
 import json
 import jsonref
-import requests
 import os
+import pickle
 import time
 
-from diff_config import API_URLS
+from diff_common import write_atomic
+from diff_config import (
+    API_URLS,
+    API_SNAPSHOT_FORMAT,
+    CACHE_DIR,
+    DISCOVERY_CACHE_TTL,
+    SCHEMA_MAX_REF_DEPTH
+)
+from diff_api_walker import DiffApiFieldWalker, iter_azure_api_fields
+from diff_azure_schema_store import DiffAzureSchemaStore
+from diff_discovery_cache import DiffDiscoveryCache
+from diff_profiler import profile_stage
+from diff_schema_resolver import (
+    DiffSchemaResolver,
+    DiffSchemaResolverError,
+    discovery_lookup
+)
 
 
 class DiffApiParser:
-    def get_api_schemas(self, api):
+    def get_api_schemas(self, api, discovery_doc=None):
         """
         Retrieves and processes the API schemas from the discovery document.
 
         Args:
             api (str): Name of analyzed API
+            discovery_doc (dict, optional): Already downloaded discovery
+                                            document of the API. Defaults to
+                                            None, in which case it is taken
+                                            from the discovery cache.
 
         Returns:
             bool:
@@ -34,40 +54,159 @@ class DiffApiParser:
             print("Error: Logger not found!")
             return False
 
-        discovery_doc_url = API_URLS[api]
-
-        self.log.debug(
-            f"Trying to get discovery doc from: {discovery_doc_url}"
-        )
-        discovery_response = requests.get(discovery_doc_url)
-        try:
-            self.log.debug("Trying to decode JSON file")
-            ref_api_schemas = discovery_response.json()
-        except json.decoder.JSONDecodeError:
-            self.log.error("Response does not contain the JSON file!")
-            return False
-
+        if discovery_doc is not None:
+            ref_api_schemas = discovery_doc
+        else:
+            with profile_stage(self, "discovery"):
+                ref_api_schemas = self.get_discovery_cache().get_discovery_doc(
+                    api,
+                    getattr(self, 'discovery_urls', API_URLS)[api]
+                )
         if not ref_api_schemas:
             self.log.error("Unknown error during parsing discovery doc!")
             return False
+        self.api_revision = (ref_api_schemas.get("revision"),
+                             ref_api_schemas.get("etag"))
+
+        snapshot_path = self._api_snapshot_path(api, ref_api_schemas)
+        if snapshot_path:
+            with profile_stage(self, "snapshot"):
+                if self._load_api_snapshot(snapshot_path, ref_api_schemas):
+                    return True
 
         try:
             self.log.debug("Trying to dereference API schemas")
-            self.api_schemas = jsonref.JsonRef.replace_refs(
-                ref_api_schemas,
-                base_uri=discovery_doc_url,
-                jsonschema=True
-            ).get("schemas", {})
-        except jsonref.JsonRefError:
-            self.log.error("Dereferencing API schema has failed!")
+            with profile_stage(self, "dereference") as stage:
+                resolver = DiffSchemaResolver(
+                    discovery_lookup(ref_api_schemas)
+                )
+                self.api_schemas = {
+                    component: resolver.resolve_ref(component)
+                    for component in ref_api_schemas.get("schemas", {})
+                }
+                stage.count(schemas=len(self.api_schemas))
+        except DiffSchemaResolverError as e:
+            self.log.error(f"Dereferencing API schema has failed! {e}")
             return False
 
         if not self.api_schemas:
             self.log.error("Unknown error during dereferencing API schema!")
             return False
 
+        self.log.debug("Creating API field tables")
+        self.api_field_tables = {}
+        walker = DiffApiFieldWalker()
+        with profile_stage(self, "field_tables") as stage:
+            for component, schema in self.api_schemas.items():
+                fields, output_only = walker.component_fields(schema)
+                self.api_field_tables[component] = (list(fields),
+                                                    output_only)
+            stage.count(fields=sum(
+                len(fields) for fields, _ in self.api_field_tables.values()
+            ))
+
+        if snapshot_path:
+            self._save_api_snapshot(snapshot_path, ref_api_schemas)
         return True
 
+    def get_discovery_cache(self):
+        """
+        Returns the discovery documents cache of the driver, created on
+        first use.
+
+        Returns:
+            DiffDiscoveryCache: The cache.
+        """
+        if not hasattr(self, 'discovery_cache'):
+            self.discovery_cache = DiffDiscoveryCache(
+                self.log,
+                cache_dir=getattr(self, 'cache_dir', CACHE_DIR),
+                ttl=getattr(self, 'cache_ttl', DISCOVERY_CACHE_TTL),
+                offline=getattr(self, 'offline', False)
+            )
+        return self.discovery_cache
+
+    def _api_snapshot_path(self, api, discovery_doc):
+        """
+        Returns the path of the API schemas snapshot for the discovery
+        document revision.
+
+        Args:
+            api (str): Name of analyzed API
+            discovery_doc (dict): Discovery document of the API.
+
+        Returns:
+            str: Path of the snapshot or `None` if the document has no
+                 revision.
+        """
+        revision = discovery_doc.get("revision")
+        if not revision:
+            return None
+        return os.path.join(
+            getattr(self, 'cache_dir', CACHE_DIR),
+            "snapshots",
+            f"{api}-{revision}.pickle"
+        )
+
+    def _load_api_snapshot(self, snapshot_path, discovery_doc):
+        """
+        Loads the dereferenced API schemas and field tables from the snapshot.
+
+        Args:
+            snapshot_path (str): Path of the snapshot.
+            discovery_doc (dict): Discovery document the snapshot has to
+                                  match.
+
+        Returns:
+            bool: `True` if a matching snapshot was loaded, `False` otherwise.
+        """
+        if not os.path.exists(snapshot_path):
+            return False
+
+        self.log.debug(f"Loading API schemas snapshot {snapshot_path}")
+        try:
+            with open(snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.log.warning(f"API schemas snapshot {snapshot_path} is"
+                             " broken! Ignoring it.")
+            return False
+
+        if (snapshot.get("format") != API_SNAPSHOT_FORMAT
+                or snapshot.get("etag") != discovery_doc.get("etag")
+                or snapshot.get("max_depth") != SCHEMA_MAX_REF_DEPTH):
+            self.log.debug("API schemas snapshot is outdated")
+            return False
+
+        self.api_schemas = snapshot["schemas"]
+        self.api_field_tables = snapshot["fields"]
+        return bool(self.api_schemas)
+
+    def _save_api_snapshot(self, snapshot_path, discovery_doc):
+        """
+        Saves the dereferenced API schemas and field tables to the snapshot.
+
+        Args:
+            snapshot_path (str): Path of the snapshot.
+            discovery_doc (dict): Discovery document of the API.
+        """
+        snapshot = {
+            "format": API_SNAPSHOT_FORMAT,
+            "revision": discovery_doc.get("revision"),
+            "etag": discovery_doc.get("etag"),
+            "max_depth": SCHEMA_MAX_REF_DEPTH,
+            "schemas": self.api_schemas,
+            "fields": self.api_field_tables,
+        }
+        self.log.debug(f"Saving API schemas snapshot {snapshot_path}")
+        try:
+            write_atomic(
+                snapshot_path,
+                pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        except OSError as e:
+            self.log.warning(f"Cannot save API schemas snapshot: {e}")
+
     def get_aws_api_component_schema(self, component, schema_path,
                                      save_file=False):
         """
@@ -146,22 +285,20 @@ class DiffApiParser:
             self.log.error(f"Azure schema path {schema_path} does not exist!")
             return False
 
-        with open(schema_path, "r") as f:
-            self.log.debug("Loading Azure API schemas from json file:"
-                           f" {schema_path}")
-            ref_component_api_schema = json.load(f)
+        if not hasattr(self, 'azure_schema_store'):
+            self.azure_schema_store = DiffAzureSchemaStore(self.log)
 
-        api_schema = jsonref.JsonRef.replace_refs(
-                ref_component_api_schema,
-                jsonschema=True
-            )
         try:
             self.component_api_schema = (
-                api_schema["resourceDefinitions"][component]
+                self.azure_schema_store.get_definition(schema_path, component)
             )
         except KeyError:
             self.log.error(f"Resource definitions for {component} not found!")
             return False
+        except (OSError, json.decoder.JSONDecodeError,
+                DiffSchemaResolverError) as e:
+            self.log.error(f"Cannot load Azure schema {schema_path}: {e}")
+            return False
 
         if not self.component_api_schema:
             self.log.error(f"{component} API schema is empty!")
@@ -228,118 +365,15 @@ class DiffApiParser:
                 json.dump(self.component_api_schema, f, indent=2)
         return True
 
-    def _get_api_field(self, key_origin, value_origin):
-        """
-        Recursively extracts API field keys from a given schema and appends
-        them to `self.api_field_list`.
-
-        Args:
-            key_origin (str): The key path of the current field being processed
-                              (used for nested fields).
-            value_origin (dict): The current level of the schema to process,
-                                 typically a dictionary containing
-                                 "properties" or "items" keys with their
-                                 respective values.
-        """
-        nested = False
-        key_appendix = ''
-        if key_origin != '':
-            key_appendix = key_origin + '.'
-
-        try:
-            for key, value in value_origin["properties"].items():
-                if key != "properties":
-                    self._get_api_field(key_appendix+key, value)
-                else:
-                    self._get_api_field(key_appendix, value)
-            nested = True
-        except KeyError:
-            pass
-
-        try:
-            for key, value in value_origin["items"]["properties"].items():
-                self._get_api_field(key_appendix+key, value)
-            nested = True
-        except KeyError:
-            pass
-
-        if not nested and key_origin not in self.api_field_list:
-            try:
-                if "[Output Only]" in value_origin["description"]:
-                    self.api_output_only.append(key_origin)
-                elif "Output only." in value_origin["description"]:
-                    self.api_output_only.append(key_origin)
-                else:
-                    self.api_field_list.append(key_origin)
-            except KeyError:
-                self.api_field_list.append(key_origin)
-
-    def _get_azure_api_field(self, key_origin, value_origin):
-        """
-        Recursively extracts azure API field keys from a given schema and
-        appends them to `self.api_field_list`.
-
-        Args:
-            key_origin (str): The key path of the current field being processed
-                              (used for nested fields).
-            value_origin (dict): The current level of the schema to process,
-                                 typically a dictionary containing
-                                 "properties" or "items" keys with their
-                                 respective values.
-        """
-        nested = False
-        key_appendix = ''
-        if not value_origin:
-            return
-        if key_origin != '':
-            key_appendix = key_origin + '.'
-
-        try:
-            for key, value in value_origin["properties"].items():
-                if key != "properties":
-                    self._get_azure_api_field(key_appendix+key, value)
-                else:
-                    self._get_azure_api_field(key_appendix, value)
-            nested = True
-        except KeyError:
-            pass
-
-        try:
-            for key, value in value_origin["oneOf"][0]["properties"].items():
-                if key != "properties":
-                    self._get_azure_api_field(key_appendix+key, value)
-                else:
-                    self._get_azure_api_field(key_appendix, value)
-            nested = True
-        except KeyError:
-            pass
-
-        try:
-            for key, value in (
-                value_origin["items"]["oneOf"][0]["properties"].items()
-            ):
-                self._get_azure_api_field(key_appendix+key, value)
-            nested = True
-        except KeyError:
-            pass
-
-        if not nested and key_origin not in self.api_field_list:
-            try:
-                if "[Output Only]" in value_origin["description"]:
-                    self.api_output_only.append(key_origin)
-                elif "Output only." in value_origin["description"]:
-                    self.api_output_only.append(key_origin)
-                else:
-                    self.api_field_list.append(key_origin)
-            except KeyError:
-                self.api_field_list.append(key_origin)
-
-    def get_api_fields(self, azure=False):
+    def get_api_fields(self, azure=False, component=None):
         """
         Retrieves the API fields from the component API schema.
 
         Args:
             azure (bool): If True, process the schema as an Azure API schema.
+            component (str, optional): Name of the component. If its fields
+                                       are known from the API field tables,
+                                       the schema is not walked again.
 
         Returns:
             bool:
@@ -356,12 +390,24 @@ class DiffApiParser:
             self.log.error("API component schema not found!")
             return False
 
-        self.api_field_list = []
-        self.api_output_only = []
-        if azure:
-            self._get_azure_api_field('', self.component_api_schema)
+        if component and component in getattr(self, 'api_field_tables', {}):
+            field_list, output_only = self.api_field_tables[component]
+            self.api_field_list = list(field_list)
+            self.api_output_only = list(output_only)
         else:
-            self._get_api_field('', self.component_api_schema)
+            if azure:
+                fields = iter_azure_api_fields(self.component_api_schema)
+            else:
+                fields = DiffApiFieldWalker().iter_fields(
+                    self.component_api_schema
+                )
+            self.api_field_list = []
+            self.api_output_only = []
+            for path, is_output_only, _ in fields:
+                if is_output_only:
+                    self.api_output_only.append(path)
+                else:
+                    self.api_field_list.append(path)
 
         if not self.api_field_list:
             self.log.error("Failed to get API component fields!")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from diff_field_path import FIELD_PATHS
+
+
+def _is_output_only(schema):
+    description = schema.get("description")
+    if description is None:
+        return False
+    return "[Output Only]" in description or "Output only." in description
+
+
+def _nested_properties(schema):
+    """
+    Returns the `properties` and `items.properties` dictionaries of the
+    schema.
+    """
+    nested = []
+    properties = schema.get("properties")
+    if isinstance(properties, dict):
+        nested.append(properties)
+    items = schema.get("items")
+    if isinstance(items, dict) and isinstance(items.get("properties"), dict):
+        nested.append(items["properties"])
+    return nested
+
+
+def _nested_schemas(schema, nested):
+    """
+    Yields `(key, value, collapsed)` of the nested schemas, where `collapsed`
+    tells if the key is a `properties` key of the `properties` dictionary,
+    which does not add a key to the path of the field.
+    """
+    properties = schema.get("properties")
+    for nested_properties in nested:
+        for key, value in nested_properties.items():
+            if isinstance(value, dict):
+                yield (key, value,
+                       key == "properties" and nested_properties is properties)
+
+
+def _leaf(root, schema):
+    return (root, _is_output_only(schema), schema)
+
+
+class _DiffApiFieldFrame:
+    """
+    Schema object whose fields are being collected by `DiffApiFieldWalker`.
+    """
+    __slots__ = ("schema", "nested", "children", "prefix", "entries",
+                 "complete")
+
+    def __init__(self, schema, nested):
+        self.schema = schema
+        self.nested = nested
+        self.children = _nested_schemas(schema, nested)
+        self.prefix = None
+        self.entries = []
+        self.complete = True
+
+    def add(self, table, result):
+        entries, complete = result
+        self.complete = self.complete and complete
+        paths = table.extend(self.prefix, [path for path, _, _ in entries])
+        self.entries.extend((path, output_only, node)
+                            for path, (_, output_only, node)
+                            in zip(paths, entries))
+
+
+class DiffApiFieldWalker:
+    """
+    Extracts the fields of Google API discovery document schemas.
+
+    A field is every schema without nested `properties` (or
+    `items.properties`), named by the dot separated path of the property
+    keys. Fields described as `[Output Only]` or `Output only.` are output
+    only fields.
+
+    Dereferenced schemas share the objects of the referenced schemas (e.g.
+    `NetworkInterface` or `AttachedDisk` under many compute resources), so
+    the fields of every schema object are collected once, relative to the
+    object, and reused with a different prefix wherever the object appears.
+    The work is proportional to the number of unique schema objects, not to
+    the number of expanded paths.
+
+    The fields of a schema object are kept as paths of a
+    `DiffFieldPathTable` relative to the object, so a nested field is not
+    rebuilt as a string at every level above it. The dotted string of
+    a path is built once, when the path is added to the table.
+
+    The schemas are walked with an explicit stack, so the depth of a schema
+    is not limited by the recursion limit. A schema object that is reached
+    again while its own fields are being collected (a self-referential
+    schema) is treated as a field, so cyclic schemas are walked once. Fields
+    collected below such a cut depend on the path they were reached from and
+    are not memoized.
+    """
+    def __init__(self, table=FIELD_PATHS):
+        """
+        Args:
+            table (DiffFieldPathTable, optional): Table of the field paths.
+                                                  Defaults to the table
+                                                  shared by the process.
+        """
+        self.table = table
+        self._memo = {}
+        self._in_progress = set()
+
+    def _visit(self, schema, stack):
+        """
+        Returns the known fields of the schema or pushes a frame collecting
+        them onto the stack and returns `None`.
+        """
+        memo = self._memo.get(id(schema))
+        if memo is not None:
+            return memo[1], True
+        if id(schema) in self._in_progress:
+            return [_leaf(self.table.root, schema)], False
+        nested = _nested_properties(schema)
+        if not nested:
+            entries = [_leaf(self.table.root, schema)]
+            self._memo[id(schema)] = (schema, entries)
+            return entries, True
+        self._in_progress.add(id(schema))
+        stack.append(_DiffApiFieldFrame(schema, nested))
+        return None
+
+    def _entries(self, schema):
+        """
+        Returns the fields of a nested schema relative to its path.
+
+        Args:
+            schema (dict): The nested schema.
+
+        Returns:
+            tuple: List of `(path, output_only, node)` tuples, where `path`
+                   is the `DiffFieldPath` of the field relative to the
+                   schema, and a flag telling if no cycle was cut below the
+                   schema.
+        """
+        stack = []
+        result = self._visit(schema, stack)
+        try:
+            while stack:
+                frame = stack[-1]
+                if result is not None:
+                    frame.add(self.table, result)
+                    result = None
+                child = next(frame.children, None)
+                if child is None:
+                    stack.pop()
+                    self._in_progress.discard(id(frame.schema))
+                    if frame.complete:
+                        self._memo[id(frame.schema)] = (frame.schema,
+                                                        frame.entries)
+                    result = frame.entries, frame.complete
+                    continue
+                key, value, collapsed = child
+                frame.prefix = self.table.root.child("" if collapsed
+                                                     else key)
+                result = self._visit(value, stack)
+        finally:
+            for frame in stack:
+                self._in_progress.discard(id(frame.schema))
+        return result
+
+    def iter_fields(self, schema):
+        """
+        Yields the fields of a component schema in the order of the schema
+        properties. Every field is yielded once.
+
+        Args:
+            schema (dict): Dereferenced schema of the component.
+
+        Yields:
+            tuple: `(path, is_output_only, node)` of the field, where `node`
+                   is the schema of the field.
+        """
+        root = self.table.root
+        seen = set()
+        stack = []
+        try:
+            if _nested_properties(schema):
+                self._in_progress.add(id(schema))
+                stack.append(_DiffApiFieldFrame(
+                    schema, _nested_properties(schema)
+                ))
+            else:
+                yield "", _is_output_only(schema), schema
+            while stack:
+                child = next(stack[-1].children, None)
+                if child is None:
+                    self._in_progress.discard(id(stack.pop().schema))
+                    continue
+                key, value, collapsed = child
+                if not collapsed:
+                    entries, _ = self._entries(value)
+                    entries = zip(
+                        self.table.extend(root.child(key),
+                                          [path for path, _, _ in entries]),
+                        entries
+                    )
+                    entries = ((path, output_only, node)
+                               for path, (_, output_only, node) in entries)
+                elif (id(value) in self._in_progress
+                        or not _nested_properties(value)):
+                    entries = [_leaf(root, value)]
+                else:
+                    # The `properties` key of a component schema is walked
+                    # like the component schema itself.
+                    self._in_progress.add(id(value))
+                    stack.append(_DiffApiFieldFrame(
+                        value, _nested_properties(value)
+                    ))
+                    continue
+                for path, output_only, node in entries:
+                    path = path.path
+                    if path not in seen:
+                        seen.add(path)
+                        yield path, output_only, node
+        finally:
+            for frame in stack:
+                self._in_progress.discard(id(frame.schema))
+
+    def component_fields(self, schema):
+        """
+        Returns the fields of a component schema.
+
+        Args:
+            schema (dict): Dereferenced schema of the component.
+
+        Returns:
+            tuple: Descriptions of the fields keyed by the field (in the
+                   order of the schema properties) and the list of the
+                   output only fields.
+        """
+        fields = {}
+        output_only = []
+        for path, is_output_only, node in self.iter_fields(schema):
+            if is_output_only:
+                output_only.append(path)
+            else:
+                fields[path] = node.get("description")
+        return fields, output_only
+
+
+def _first_variant_properties(schema):
+    """
+    Returns the `properties` dictionary of the first `oneOf` variant of the
+    schema or `None`.
+    """
+    one_of = schema.get("oneOf") if isinstance(schema, dict) else None
+    if not isinstance(one_of, list) or not one_of:
+        return None
+    properties = (one_of[0].get("properties")
+                  if isinstance(one_of[0], dict) else None)
+    return properties if isinstance(properties, dict) else None
+
+
+def _azure_nested_properties(schema):
+    """
+    Returns the `properties`, `oneOf[0].properties` and
+    `items.oneOf[0].properties` dictionaries of an Azure API schema, each
+    with a flag telling if its `properties` key is collapsed.
+    """
+    nested = []
+    if isinstance(schema.get("properties"), dict):
+        nested.append((schema["properties"], True))
+    variant = _first_variant_properties(schema)
+    if variant is not None:
+        nested.append((variant, True))
+    items_variant = _first_variant_properties(schema.get("items"))
+    if items_variant is not None:
+        nested.append((items_variant, False))
+    return nested
+
+
+def _azure_nested_schemas(root, path, nested):
+    if not path.path:
+        path = root
+    for properties, collapsible in nested:
+        for key, value in properties.items():
+            if not isinstance(value, dict):
+                continue
+            if not collapsible or key != "properties":
+                yield path.child(key), value
+            else:
+                yield (path if path is root else path.child("")), value
+
+
+def iter_azure_api_fields(schema, table=FIELD_PATHS):
+    """
+    Yields the fields of a dereferenced Azure API schema in the order of the
+    schema properties. Every field is yielded once.
+
+    Besides `properties`, the first `oneOf` variant of a schema and of its
+    `items` is walked. The schema is walked with an explicit stack; a schema
+    object reached again below itself is treated as a field.
+
+    Args:
+        schema (dict): Dereferenced schema of the component.
+        table (DiffFieldPathTable, optional): Table of the field paths.
+
+    Yields:
+        tuple: `(path, is_output_only, node)` of the field, where `node` is
+               the schema of the field.
+    """
+    seen = set()
+    in_progress = set()
+    stack = [(None, iter([(table.root, schema)]))]
+    while stack:
+        child = next(stack[-1][1], None)
+        if child is None:
+            in_progress.discard(stack.pop()[0])
+            continue
+        path, node = child
+        if not node:
+            continue
+        nested = _azure_nested_properties(node)
+        if nested and id(node) not in in_progress:
+            in_progress.add(id(node))
+            stack.append((id(node),
+                          _azure_nested_schemas(table.root, path, nested)))
+        elif path.path not in seen:
+            seen.add(path.path)
+            yield path.path, _is_output_only(node), node
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import hashlib
+import json
+import os
+import pickle
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from diff_common import write_atomic
+from diff_config import (
+    CACHE_DIR,
+    AWS_SCHEMA_CACHE_FORMAT,
+    AWS_SCHEMA_LOAD_WORKERS,
+    SCHEMA_MAX_REF_DEPTH
+)
+from diff_engine import DiffFieldExtractor
+from diff_schema_resolver import (
+    DiffLazyRef,
+    DiffSchemaResolver,
+    DiffSchemaResolverError,
+    json_pointer_lookup
+)
+
+
+@dataclass
+class DiffAwsSchema:
+    """
+    AWS CloudFormation resource schema loaded by `DiffAwsSchemaLoader`.
+
+    Attributes:
+        name (str): Name of the schema file without the extension.
+        type_name (str): CloudFormation type name (e.g. "AWS::EC2::EIP").
+        api_fields (tuple): `(api_field_list, api_output_only)` of the
+                            schema.
+        schema (dict): Resolved schema or `None` if the fields were taken
+                       from the cache.
+    """
+    name: str
+    type_name: str
+    api_fields: tuple
+    schema: dict = None
+
+
+class DiffAwsSchemaLoader:
+    """
+    Bulk loader of AWS CloudFormation resource schemas.
+
+    The schema directory is scanned once. A manifest with the size, mtime,
+    digest and `typeName` of every file is kept in
+    `<cache_dir>/aws/manifest.json`, so unchanged files are not read to
+    find their type name. The requested files are parsed in a thread pool
+    and the extracted field lists are cached per file digest in
+    `<cache_dir>/aws/fields/<sha256>.pickle`.
+    """
+    def __init__(self, log, schema_dir, cache_dir=CACHE_DIR,
+                 max_workers=AWS_SCHEMA_LOAD_WORKERS):
+        self.log = log
+        self.schema_dir = os.path.abspath(schema_dir)
+        self.aws_dir = os.path.join(cache_dir, "aws")
+        self.fields_dir = os.path.join(self.aws_dir, "fields")
+        self.manifest_path = os.path.join(self.aws_dir, "manifest.json")
+        self.max_workers = max_workers
+        self.manifest = {}
+
+    def _load_manifest(self):
+        """
+        Loads the manifest entries of the schema directory.
+
+        Returns:
+            dict: Manifest entries keyed by the file name. Empty if the
+                  manifest does not exist or cannot be decoded.
+        """
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, json.decoder.JSONDecodeError):
+            return {}
+        if manifest.get("format") != AWS_SCHEMA_CACHE_FORMAT:
+            return {}
+        return manifest.get("directories", {}).get(self.schema_dir, {})
+
+    def _save_manifest(self):
+        """
+        Saves the manifest entries of the schema directory. Entries of other
+        directories are kept.
+        """
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("format") != AWS_SCHEMA_CACHE_FORMAT:
+                raise ValueError
+        except (OSError, ValueError):
+            manifest = {"format": AWS_SCHEMA_CACHE_FORMAT, "directories": {}}
+
+        manifest["directories"][self.schema_dir] = self.manifest
+        try:
+            write_atomic(
+                self.manifest_path,
+                json.dumps(manifest, indent=2, sort_keys=True).encode()
+            )
+        except OSError as e:
+            self.log.warning(f"Cannot save AWS schemas manifest: {e}")
+
+    def scan(self):
+        """
+        Scans the schema directory and updates the manifest. Entries of
+        files with unchanged size and mtime are reused.
+
+        Returns:
+            dict: Manifest entries keyed by the file name without the
+                  `.json` extension.
+        """
+        previous = self._load_manifest()
+        self.manifest = {}
+        with os.scandir(self.schema_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                name = entry.name[:-len(".json")]
+                cached = previous.get(name, {})
+                if (cached.get("size") == stat.st_size
+                        and cached.get("mtime") == stat.st_mtime_ns):
+                    self.manifest[name] = cached
+                    continue
+                self.manifest[name] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "digest": None,
+                    "type_name": None,
+                }
+        self.log.debug(f"Found {len(self.manifest)} AWS schema files in"
+                       f" {self.schema_dir}")
+        return self.manifest
+
+    def _fields_path(self, digest):
+        return os.path.join(self.fields_dir, f"{digest}.pickle")
+
+    def _load_fields(self, digest):
+        """
+        Loads the cached fields of the schema file.
+
+        Args:
+            digest (str): SHA-256 digest of the file.
+
+        Returns:
+            dict: The cache entry or `None` if it is not usable.
+        """
+        try:
+            with open(self._fields_path(digest), "rb") as f:
+                cached = pickle.load(f)
+        except Exception:
+            # A broken pickle may raise almost any exception (e.g.
+            # `AttributeError` or `ValueError`); it is a cache miss.
+            return None
+        if (not isinstance(cached, dict)
+                or cached.get("format") != AWS_SCHEMA_CACHE_FORMAT
+                or cached.get("max_depth") != SCHEMA_MAX_REF_DEPTH):
+            return None
+        return cached
+
+    def _save_fields(self, digest, type_name, api_fields):
+        try:
+            write_atomic(self._fields_path(digest), pickle.dumps({
+                "format": AWS_SCHEMA_CACHE_FORMAT,
+                "max_depth": SCHEMA_MAX_REF_DEPTH,
+                "type_name": type_name,
+                "api_fields": api_fields,
+            }, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            self.log.warning(f"Cannot cache AWS schema fields: {e}")
+
+    def _load_schema(self, name):
+        """
+        Loads a single schema file and extracts its fields.
+
+        Args:
+            name (str): Name of the schema file without the extension.
+
+        Returns:
+            DiffAwsSchema: The loaded schema.
+
+        Raises:
+            OSError: The schema file cannot be read.
+            ValueError: The file is not valid JSON or has no fields.
+            DiffSchemaResolverError: A reference cannot be resolved.
+        """
+        path = os.path.join(self.schema_dir, f"{name}.json")
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        cached = self._load_fields(digest)
+        if cached:
+            return DiffAwsSchema(name, cached["type_name"],
+                                 cached["api_fields"]), digest
+
+        document = json.loads(content)
+        resolver = DiffSchemaResolver(
+            json_pointer_lookup(document, (document.get("$id"),)),
+            external=DiffLazyRef
+        )
+        schema = resolver.resolve(document)
+
+        extractor = DiffFieldExtractor()
+        extractor.component_api_schema = schema
+        if not extractor.get_api_fields():
+            raise ValueError(f"No fields found in {path}")
+        api_fields = (extractor.api_field_list, extractor.api_output_only)
+
+        type_name = document.get("typeName")
+        self._save_fields(digest, type_name, api_fields)
+        return DiffAwsSchema(name, type_name, api_fields, schema), digest
+
+    def load(self, names):
+        """
+        Loads the requested schemas in parallel.
+
+        Args:
+            names (iterable): Names of the schema files without the
+                              extension.
+
+        Returns:
+            dict: `DiffAwsSchema` objects keyed by the name. Schemas that
+                  do not exist or cannot be loaded are omitted.
+        """
+        if not self.manifest:
+            self.scan()
+
+        wanted = []
+        for name in dict.fromkeys(names):
+            if name not in self.manifest:
+                self.log.error(f"AWS schema {name} does not exist in"
+                               f" {self.schema_dir}!")
+                continue
+            wanted.append(name)
+
+        schemas = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                name: executor.submit(self._load_schema, name)
+                for name in wanted
+            }
+            for name, future in futures.items():
+                try:
+                    schema, digest = future.result()
+                except (OSError, ValueError, DiffSchemaResolverError) as e:
+                    self.log.error(f"Cannot load AWS schema {name}: {e}")
+                    continue
+                self.manifest[name]["digest"] = digest
+                self.manifest[name]["type_name"] = schema.type_name
+                schemas[name] = schema
+
+        self._save_manifest()
+        return schemas
+
+    def find_type(self, type_name):
+        """
+        Returns the names of the schema files of the CloudFormation type
+        known from the manifest.
+
+        Args:
+            type_name (str): CloudFormation type name (e.g. "AWS::EC2::EIP").
+
+        Returns:
+            list: Names of the schema files without the extension.
+        """
+        return [
+            name for name, entry in self.manifest.items()
+            if entry.get("type_name") == type_name
+        ]
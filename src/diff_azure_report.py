@@ -5,12 +5,18 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
-import csv
 import os
 
 from datetime import datetime
-from diff_common import DiffCommon, BLUE, BOLD, RED, GREEN, YELLOW, CYAN, ENDC
+from diff_common import DiffCommon
 from diff_api_parser import DiffApiParser
+from diff_report_sink import DiffReportSink, STREAM_FORMATS
+from diff_engine import (
+    DiffComponentJob,
+    profile_slowest_component,
+    run_component_jobs
+)
+from diff_profiler import PROFILE_SUFFIX, DiffProfiler
 from diff_tf_parser import DiffTfParser
 
 
@@ -23,49 +29,59 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
             required=True,
             help="Base path to the API schemas files",
         )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of worker processes comparing components"
+        )
+        parser.add_argument(
+            "--consolidated_report",
+            choices=STREAM_FORMATS,
+            help=("Save all component reports in a single JSON Lines or"
+                  " YAML stream instead of a file per component")
+        )
+        parser.add_argument(
+            "--history",
+            action="store_true",
+            help=("Append the results of the run to the history database"
+                  " in the cache directory")
+        )
         self._cmd_input = parser.parse_args()
+        self.cwd = os.getcwd()
         self.tf_config_path = self._cmd_input.terraform_config
         self.api = self._cmd_input.api
-        self.base_api_schema_path = self._cmd_input.base_api_schema_path
+        self.base_api_schema_path = os.path.abspath(
+            self._cmd_input.base_api_schema_path
+        )
         self.save_file = self._cmd_input.save_file
+        self.cache_dir = os.path.abspath(self._cmd_input.cache_dir)
+        self.refresh_tf_cache = self._cmd_input.refresh_tf_cache
+        self.jobs = self._cmd_input.jobs
+        self.consolidated_report = self._cmd_input.consolidated_report
+        self.history = self._cmd_input.history
         self.verbose = self._cmd_input.verbose
         self.diff_log(verbose=self.verbose)
+        self.profiler = DiffProfiler(self.log,
+                                     enabled=self._cmd_input.profile,
+                                     stats=self._cmd_input.profile_stats)
 
-    def azure_component_diff_report(self, directory=None):
+    def build_azure_component_job(self):
         """
-        Generates a difference report for a specific component's API and
-        Terraform schemas. The function compares the fields between the two
-        schemas and logs the differences. It identifies implemented, missing,
-        excluded, and specific fields for the API and Terraform, providing
-        a detailed comparison report.
+        Collects the API schema, the Terraform schemas and the configuration
+        of the current component into a comparison job.
 
-        Args:
-        directory (str, optional): Directory to save the generated diff report.
-            Defaults to None, in which case the report will be saved in
-            a current directory.
+        Returns:
+            DiffComponentJob: The comparison job or `None` if the schemas
+                              cannot be retrieved.
         """
-        if not hasattr(self, 'log'):
-            print("Error: Logger not found!")
-            return False
-
         self.log.info(f"Getting {self.component} API Schema")
         if not self.get_azure_api_component_schema(self.api_component,
                                                    self.api_schema_path,
                                                    self.save_file):
-            self.log.error(
-                f"Cannot get API {self.component} schema! Exiting..."
-            )
-            os.chdir(self.cwd)
-            exit(1)
-
-        self.log.info(f"Getting {self.component} API Schema fields")
-        if not self.get_api_fields(azure=True):
-            self.log.error(
-                f"Cannot get API {self.component} schema fields! "
-                "Exiting..."
-            )
-            os.chdir(self.cwd)
-            exit(1)
+            self.log.error(f"Cannot get API {self.component} schema!")
+            return None
 
         self.log.info(f"Getting {self.component} Terraform Schema")
         related_resources = {self.component: None}
@@ -85,124 +101,27 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
             ):
                 self.log.error("Could not get Terraform "
                                f"schema for {resource}")
-            tf_schemas.update({resource: self.component_tf_schema})
+                continue
+            tf_schemas.update(
+                {resource: (prepend, self.component_tf_schema)}
+            )
             if not prepend:
                 main_component = self.tf_resource_name
 
         if main_component:
             self.tf_resource_name = main_component
         if not tf_schemas:
-            self.log.error(
-                f"Cannot get Terraform {self.component} schema! Exiting..."
-            )
-            os.chdir(self.cwd)
-            exit(1)
-
-        self.log.info(f"Getting {self.component} Terraform Schema fields")
-        tf_fields = []
-        for resource, schema in tf_schemas.items():
-            self.component_tf_schema = schema
-            if not self.get_tf_fields(prepend=related_resources[resource]):
-                self.log.error(
-                    f"Cannot get Terraform {resource} schema fields! "
-                    "Exiting..."
-                )
-                os.chdir(self.cwd)
-                exit(1)
-            tf_fields = list(set(tf_fields + self.tf_field_list))
-        self.tf_field_list = tf_fields.copy()
-
-        self.log.debug(f"{self.component} Output Only API fields:"
-                       f" {self.api_output_only}")
-        self.log.debug(f"{self.component} API fields: {self.api_field_list}")
-        self.log.debug(f"{self.component} TF fields: {self.tf_field_list}")
-
-        api_implemented = []
-        excluded = []
-        api_missing = self.api_field_list.copy()
-        tf_specific = self.tf_field_list.copy()
-
-        self.log.debug("Substring mapping")
-        for field in self.tf_field_list:
-            mapped_field = self.check_mapping(field)
-            if (mapped_field in self.api_field_list and
-                    mapped_field not in api_implemented):
-                api_implemented.append(mapped_field)
-                api_missing.remove(mapped_field)
-                tf_specific.remove(field)
-
-        self.log.debug("Exact mapping")
-        for field in self.api_field_list:
-            try:
-                mapped_field = (
-                    self.yaml_config[self.component]["ExactMapping"][field]
-                )
-                if mapped_field in api_implemented:
-                    continue
-                if mapped_field in tf_specific:
-                    api_missing.remove(field)
-                    api_implemented.append(field)
-                    tf_specific.remove(mapped_field)
-            except KeyError:
-                pass
-
-        self.log.debug("Excluding fields specified in config")
-        try:
-            for field in self.yaml_config[self.component]["Exclude"]:
-                if field in api_missing:
-                    api_missing.remove(field)
-                    excluded.append(field)
-        except KeyError:
-            pass
-
-        self.log.debug("Excluding output only API fields")
-        for field in self.api_output_only:
-            if field not in excluded:
-                excluded.append(field)
-
-        self.log.info(f"{BOLD}{GREEN}API fields implemented in the "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in api_implemented:
-            self.log.info(f"{GREEN}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{RED}API fields missing in the "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in api_missing:
-            self.log.info(f"{RED}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{YELLOW}Fields excluded form comparison:{ENDC}")
-        for field in excluded:
-            self.log.info(f"{YELLOW}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{BLUE}Fields specific for "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in tf_specific:
-            self.log.info(f"{BLUE}{field}{ENDC}")
-
-        self.total_fields_number = (len(api_implemented) + len(api_missing) +
-                                    len(excluded))
-        self.gap_fields_number = len(api_implemented) + len(api_missing)
-        self.eliminated_gaps = len(api_implemented)
-        self.remaining_gaps = len(api_missing)
-
-        self.log.info(f"{BOLD}{BLUE}All fields per {self.component} resource:"
-                      f" {self.total_fields_number}{ENDC}")
-        self.log.info(f"{BOLD}{CYAN}Gap Fields:"
-                      f" {self.gap_fields_number}{ENDC}")
-        self.log.info(f"{BOLD}{GREEN}Eliminated Gaps:"
-                      f" {self.eliminated_gaps}{ENDC}")
-        self.log.info(f"{BOLD}{RED}Remaining Gaps:"
-                      f" {self.remaining_gaps}{ENDC}")
-
-        os.chdir(self.cwd)
-
-        if not self.save_new_report(api_implemented, api_missing, tf_specific,
-                                    excluded, directory=directory):
-            self.log.error(f"Cannot create new diff {self.component} report! "
-                           "Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
-        return True
+            self.log.error(f"Cannot get Terraform {self.component} schema!")
+            return None
+
+        return DiffComponentJob(
+            component=self.component,
+            tf_resource_name=self.tf_resource_name,
+            api_schema=self.component_api_schema,
+            tf_schemas=tf_schemas,
+            mapping=self.get_component_mapping(self.component),
+            azure=True
+        )
 
     def generate_azure_diff_report(self):
         """
@@ -220,16 +139,28 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
             self.log.error("Cannot get YAML config! Exiting...")
             exit(1)
 
-        self.log.info("Changing directory to terraform config place")
-        if not self.change_to_tf_dir():
-            self.log.error("Cannot change workspace directory! Exiting...")
+        self.log.info("Checking terraform config place")
+        if not self.check_tf_dir():
+            self.log.error("Cannot use terraform config directory!"
+                           " Exiting...")
             exit(1)
 
         self.log.info("Getting Terraform Schemas")
-        if not self.get_tf_schemas():
-            self.log.error("Cannot get Terraform schemas! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
+        tf_resources = set()
+        for component in self.yaml_config["Resources"].values():
+            tf_resources.add(component)
+            try:
+                for resource in (
+                    self.yaml_config[component]["RelatedResources"]
+                ):
+                    tf_resources.add(resource)
+            except KeyError:
+                pass
+        with self.profiler.stage("tf_schemas") as stage:
+            if not self.get_tf_schemas(resources=tf_resources):
+                self.log.error("Cannot get Terraform schemas! Exiting...")
+                exit(1)
+            stage.count(resources=len(tf_resources))
         tf_provider_version = (
             self.terraform_versions["provider_selections"]
                                    ["registry.terraform.io/hashicorp/azurerm"]
@@ -243,9 +174,9 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
 
         reports_dir = os.path.join(self.cwd, f"{self.date}-azure-reports"
                                    f"-v{tf_provider_version}")
-        csv_report = os.path.join(reports_dir,
-                                  f"{self.date}-azure-report"
-                                  f"-v{tf_provider_version}.csv")
+        report_base = os.path.join(reports_dir,
+                                   f"{self.date}-azure-report"
+                                   f"-v{tf_provider_version}")
         if os.path.exists(reports_dir):
             self.log.error("Global reports path exist! Check the"
                            " content of this path. Exiting...")
@@ -253,13 +184,8 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
         else:
             os.makedirs(reports_dir)
 
-        with open(csv_report, mode="w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["Date", "Provider Version", "Resource Name",
-                             "Total Fields", "Gap Fields", "Eliminated Gaps",
-                             "Remaining Gaps"])
-
-        self.log.debug("Create reports each component")
+        self.log.debug("Compare fields of each component")
+        jobs = []
         for api_component, tf_component in (
             self.yaml_config["Resources"].items()
         ):
@@ -269,19 +195,61 @@ class DiffAzureReport(DiffCommon, DiffApiParser, DiffTfParser):
                 self.base_api_schema_path,
                 self.yaml_config["ApiSchemas"][api_component]
             )
-            self.azure_component_diff_report(directory=reports_dir)
-            total_fields_number += self.total_fields_number
-            total_api_missing += self.remaining_gaps
-            total_api_implemented += self.eliminated_gaps
-            with open(csv_report, mode="a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow([csv_date,
-                                 self.tf_provider_version,
-                                 self.tf_resource_name,
-                                 self.total_fields_number,
-                                 self.gap_fields_number,
-                                 self.eliminated_gaps,
-                                 self.remaining_gaps])
+            with self.profiler.stage("build", component=self.component):
+                job = self.build_azure_component_job()
+            if not job:
+                self.log.error(f"Cannot compare {self.component} component!"
+                               " Exiting...")
+                exit(1)
+            jobs.append(job)
+        with self.profiler.stage("compare") as stage:
+            results = run_component_jobs(jobs, max_workers=self.jobs,
+                                         profiler=self.profiler)
+            stage.count(components=len(jobs))
+
+        self.log.debug("Create reports each component")
+        self.report_sink = DiffReportSink(
+            self.log,
+            report_base,
+            stream_format=self.consolidated_report
+        )
+        with self.profiler.stage("reports"), self.report_sink:
+            for result in results:
+                if result.error:
+                    self.log.error(f"{result.error} Exiting...")
+                    exit(1)
+                with self.profiler.stage("write",
+                                         component=result.component):
+                    if not self.apply_component_result(
+                        result,
+                        directory=reports_dir
+                    ):
+                        self.log.error("Cannot create new diff"
+                                       f" {self.component} report!"
+                                       " Exiting...")
+                        exit(1)
+                total_fields_number += self.total_fields_number
+                total_api_missing += self.remaining_gaps
+                total_api_implemented += self.eliminated_gaps
+                self.report_sink.add_row([csv_date,
+                                          self.tf_provider_version,
+                                          self.tf_resource_name,
+                                          self.total_fields_number,
+                                          self.gap_fields_number,
+                                          self.eliminated_gaps,
+                                          self.remaining_gaps])
+
+        if self.history and not self.save_history("azure", self.api,
+                                                  reports_dir, results):
+            self.log.error("Cannot add the run to the history! Exiting...")
+            exit(1)
+
+        if not profile_slowest_component(self.profiler, jobs, report_base):
+            self.log.error("Cannot save profile statistics! Exiting...")
+            exit(1)
+        if not self.profiler.save(f"{report_base}{PROFILE_SUFFIX}"):
+            self.log.error("Cannot save timing report! Exiting...")
+            exit(1)
 
         total_api_specific_fields = (
             total_fields_number - total_api_missing - total_api_implemented
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import json
+import jsonref
+import os
+
+from functools import lru_cache
+from diff_schema_resolver import (
+    DiffLazyRef,
+    DiffSchemaResolver,
+    DiffSchemaResolverError,
+    json_pointer_lookup
+)
+
+
+class DiffAzureSchemaStore:
+    """
+    Per-run store of Azure Resource Manager API schema files.
+
+    Every schema file is parsed once per `(path, mtime)`, so resources
+    sharing an `ApiSchemas` version folder share the parsed document.
+    References are resolved only for the requested resource definitions;
+    definitions resolved for one resource are reused by the others.
+    References to other documents are replaced with `DiffLazyRef` objects,
+    so they are downloaded only if they are accessed, and every document is
+    downloaded at most once per run.
+    """
+    def __init__(self, log):
+        self.log = log
+        self._documents = {}
+        self._definitions = {}
+        self._loader = lru_cache(maxsize=None)(jsonref.jsonloader)
+
+    def _external_ref(self, ref):
+        """
+        Creates a lazy reference to another document.
+
+        Args:
+            ref (str): The reference.
+
+        Returns:
+            DiffLazyRef: Lazy reference loaded on first access.
+        """
+        if ref.startswith("#"):
+            raise DiffSchemaResolverError(f"Cannot resolve reference {ref}")
+        return DiffLazyRef(ref, loader=self._loader)
+
+    def _load(self, schema_path):
+        """
+        Loads the schema file, unless it was already loaded and did not
+        change since.
+
+        Args:
+            schema_path (str): Path of the schema file.
+
+        Returns:
+            tuple: The document and its reference resolver.
+        """
+        key = (os.path.abspath(schema_path),
+               os.stat(schema_path).st_mtime_ns)
+        if key in self._documents:
+            return self._documents[key]
+
+        with open(schema_path, "r") as f:
+            self.log.debug("Loading Azure API schemas from json file:"
+                           f" {schema_path}")
+            document = json.load(f)
+
+        for old_key in [k for k in self._documents if k[0] == key[0]]:
+            del self._documents[old_key]
+
+        base_uris = (document.get("id"), document.get("$id"))
+        resolver = DiffSchemaResolver(
+            json_pointer_lookup(document, base_uris),
+            external=self._external_ref
+        )
+        self._documents[key] = (document, resolver)
+        return self._documents[key]
+
+    def get_definition(self, schema_path, component):
+        """
+        Returns the resolved resource definition of the component.
+
+        Args:
+            schema_path (str): Path of the schema file.
+            component (str): Name of the resource definition.
+
+        Returns:
+            dict: The resolved resource definition.
+
+        Raises:
+            OSError: The schema file cannot be read.
+            json.decoder.JSONDecodeError: The file is not valid JSON.
+            KeyError: The resource definition does not exist.
+            DiffSchemaResolverError: A reference cannot be resolved.
+        """
+        document, resolver = self._load(schema_path)
+        key = (os.path.abspath(schema_path), component)
+        definition = document["resourceDefinitions"][component]
+        cached = self._definitions.get(key)
+        if cached is not None and cached[0] is document:
+            return cached[1]
+
+        resolved = resolver.resolve(definition)
+        self._definitions[key] = (document, resolved)
+        return resolved
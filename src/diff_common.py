@@ -8,13 +8,20 @@
 import argparse
 import logging
 import os
+import secrets
+import stat
 import yaml
 
+from diff_history import FIELD_STATUSES, DiffHistory, DiffHistoryError
+from diff_mapping import DiffMapping, compile_mappings
 from diff_config import (
     YAML_CONFIG_PATH,
     AWS_YAML_CONFIG_PATH,
     AZURE_YAML_CONFIG_PATH,
-    API_URLS
+    API_URLS,
+    CACHE_DIR,
+    DISCOVERY_CACHE_TTL,
+    HISTORY_DB_NAME
 )
 
 BOLD = "\033[1m"
@@ -25,11 +32,91 @@ BLUE = "\033[34m"
 CYAN = "\033[36m"
 ENDC = '\033[0m'
 
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def create_temp_file(path):
+    """
+    Creates a temporary file next to the path, so it can replace the path.
+    The file gets the permissions of the existing destination file or the
+    default permissions of a newly created file. The process umask is not
+    changed, so the threads creating other files are not affected.
+
+    Args:
+        path (str): Destination file path.
+
+    Returns:
+        tuple: File descriptor and path of the temporary file.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = None
+    while True:
+        tmp_path = os.path.join(os.path.dirname(path),
+                                f"tmp{secrets.token_hex(4)}.tmp")
+        try:
+            # Unlike `mkstemp`, the default mode 0o666 is reduced by the
+            # umask by the system.
+            fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL,
+                         0o666)
+            break
+        except FileExistsError:
+            continue
+    if mode is not None:
+        os.chmod(tmp_path, mode)
+    return fd, tmp_path
+
+
+def write_atomic(path, data):
+    """
+    Writes bytes to the path through a temporary file and a rename, so
+    readers never see partially written files.
+
+    Args:
+        path (str): Destination file path.
+        data (bytes): Content of the file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = create_temp_file(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def discovery_url(value):
+    """
+    Parses an `API=URL` discovery document URL override.
+
+    Returns:
+        tuple: Name of the API and the URL.
+
+    Raises:
+        argparse.ArgumentTypeError: The value is not a known API and a URL.
+    """
+    api, _, url = value.partition("=")
+    if api not in API_URLS or not url:
+        raise argparse.ArgumentTypeError(
+            f"expected API=URL with one of {', '.join(API_URLS)},"
+            f" got {value!r}"
+        )
+    return api, url
+
 
 class DiffCommon:
-    def diff_cmdline(self):
+    def diff_cmdline(self, multi_api=False):
         """
         Method parses commandline input and shows help message if needed.
+
+        Args:
+            multi_api (bool, optional): Accept a list of APIs or `all` in
+                                        the `--api` option.
         """
         description = (
             "Tool creates report describing differences between Google Cloud"
@@ -43,19 +130,52 @@ class DiffCommon:
             help="Path to the terraform config main.tf file",
             required=True
         )
-        parser.add_argument(
-            "-a",
-            "--api",
-            choices=API_URLS.keys(),
-            default="compute",
-            help="The Google API that will be analyzed"
-        )
+        if multi_api:
+            parser.add_argument(
+                "-a",
+                "--api",
+                nargs="+",
+                choices=[*API_URLS.keys(), "all"],
+                default=["compute"],
+                help=("The Google APIs that will be analyzed, `all` for all"
+                      " Google APIs with Terraform resources")
+            )
+        else:
+            parser.add_argument(
+                "-a",
+                "--api",
+                choices=API_URLS.keys(),
+                default="compute",
+                help="The Google API that will be analyzed"
+            )
         parser.add_argument(
             "-s",
             "--save_file",
             action="store_true",
             help="Save API and Terraform component schemas as a JSON files"
         )
+        parser.add_argument(
+            "--cache_dir",
+            default=CACHE_DIR,
+            help="Directory of the cached documents and schemas"
+        )
+        parser.add_argument(
+            "--refresh_tf_cache",
+            action="store_true",
+            help="Ignore the cached Terraform schemas and refresh them"
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help=("Save a JSON timing report of the run stages and"
+                  " components next to the report")
+        )
+        parser.add_argument(
+            "--profile_stats",
+            action="store_true",
+            help=("Also save cProfile statistics of the slowest component"
+                  " comparison (implies --profile)")
+        )
         parser.add_argument(
             "-v",
             "--verbose",
@@ -64,6 +184,38 @@ class DiffCommon:
         )
         return parser
 
+    def diff_discovery_cmdline(self, parser):
+        """
+        Adds the options of the discovery documents cache to the parser of
+        a driver reading Google API discovery documents.
+
+        Args:
+            parser (argparse.ArgumentParser): Parser of the driver.
+        """
+        parser.add_argument(
+            "--cache_ttl",
+            type=int,
+            default=DISCOVERY_CACHE_TTL,
+            help=(
+                "Seconds after which a cached discovery document is"
+                " revalidated"
+            )
+        )
+        parser.add_argument(
+            "--discovery_url",
+            action="append",
+            type=discovery_url,
+            default=[],
+            metavar="API=URL",
+            help=("Download the discovery document of the API from the URL"
+                  " (e.g. a local mirror)")
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Use only cached discovery documents"
+        )
+
     def diff_log(self, verbose=False):
         """
         Method creates logging system for the tool.
@@ -107,37 +259,62 @@ class DiffCommon:
         else:
             yaml_config_path = YAML_CONFIG_PATH
 
+        if not os.path.isabs(yaml_config_path):
+            yaml_config_path = os.path.join(
+                getattr(self, "cwd", None) or os.getcwd(),
+                yaml_config_path
+            )
+
         with open(yaml_config_path, "r") as yaml_config:
             self.yaml_config = yaml.safe_load(yaml_config)
         if not self.yaml_config:
             self.log.error("Getting YAML config failed!")
             return False
+        self.component_mappings = compile_mappings(self.yaml_config)
         return True
 
-    def change_to_tf_dir(self):
+    def check_tf_dir(self):
         """
-        Changes the current working directory to the Terraform configuration
-        directory specified by `tf_config_path`.
+        Resolves the Terraform configuration directory specified by
+        `tf_config_path` against the output directory `cwd`. The process
+        working directory is never changed; Terraform commands are run in
+        `tf_config_path` and reports are written under `cwd`, so several
+        reports can be generated in one process at the same time.
 
         Returns:
-            bool: True if the directory was successfully changed and 'main.tf'
-                       was found,
+            bool: True if 'main.tf' was found in the directory,
                   False if 'main.tf' was not found in the specified directory.
         """
+        if not getattr(self, "cwd", None):
+            self.cwd = os.getcwd()
+
         if not os.path.isabs(self.tf_config_path):
             self.tf_config_path = os.path.join(
-                os.getcwd(),
+                self.cwd,
                 self.tf_config_path
             )
 
         if not os.path.exists(os.path.join(self.tf_config_path, "main.tf")):
             self.log.error("Wrong main.tf terraform path!")
             return False
-
-        self.cwd = os.getcwd()
-        os.chdir(self.tf_config_path)
         return True
 
+    def get_component_mapping(self, component):
+        """
+        Returns the compiled mapping settings of the component.
+
+        Args:
+            component (str): Name of the component in the YAML configuration.
+
+        Returns:
+            DiffMapping: Compiled settings. Empty if the component has no
+                         mapping settings.
+        """
+        mappings = getattr(self, "component_mappings", {})
+        if component not in mappings:
+            return DiffMapping()
+        return mappings[component]
+
     def check_mapping(self, field: str):
         """
         Checks if the given field is mapped in the YAML configuration and
@@ -150,31 +327,77 @@ class DiffCommon:
             str: The fully mapped field (or original field if no mapping is
                  found).
         """
-        mapped_field = ''
-        split_filed = field.split(".")
-        for i, subfield in enumerate(split_filed):
-            try:
-                mapped_part = (
-                    self.yaml_config[self.component]["Mapping"][subfield]
-                )
-                split_filed[i] = mapped_part
-            except KeyError:
-                pass
-
-        if len(split_filed) == 1:
-            return split_filed[0]
-
-        for subfield in split_filed:
-            if mapped_field:
-                mapped_field += f'.{subfield}'
-            else:
-                mapped_field = subfield
-        return mapped_field
+        return self.get_component_mapping(self.component).translate(field)
+
+    def apply_component_result(self, result, directory=None):
+        """
+        Logs the comparison result of a component, stores its counters in
+        the report attributes and saves the component YAML report.
+
+        Args:
+            result (DiffComponentResult): Result of the comparison.
+            directory (str, optional): Directory to save the generated diff
+                report. Defaults to None, in which case the report will be
+                saved in a current directory.
+
+        Returns:
+            bool: True if the report was saved, False otherwise.
+        """
+        self.component = result.component
+        self.tf_resource_name = result.tf_resource_name
+        self.api_field_list = result.api_field_list
+        self.api_output_only = result.api_output_only
+        self.tf_field_list = result.tf_field_list
+
+        self.log.debug(f"{self.component} Output Only API fields:"
+                       f" {self.api_output_only}")
+        self.log.debug(f"{self.component} API fields: {self.api_field_list}")
+        self.log.debug(f"{self.component} TF fields: {self.tf_field_list}")
+
+        self.log.info(f"{BOLD}{GREEN}API fields implemented in the "
+                      f"Terraform {self.component} component{ENDC}")
+        for field in result.api_implemented:
+            self.log.info(f"{GREEN}{field}{ENDC}")
+
+        self.log.info(f"{BOLD}{RED}API fields missing in the "
+                      f"Terraform {self.component} component{ENDC}")
+        for field in result.api_missing:
+            self.log.info(f"{RED}{field}{ENDC}")
+
+        self.log.info(f"{BOLD}{YELLOW}Fields excluded form comparison:{ENDC}")
+        for field in result.excluded:
+            self.log.info(f"{YELLOW}{field}{ENDC}")
+
+        self.log.info(f"{BOLD}{BLUE}Fields specific for "
+                      f"Terraform {self.component} component{ENDC}")
+        for field in result.tf_specific:
+            self.log.info(f"{BLUE}{field}{ENDC}")
+
+        self.total_fields_number = result.total_fields_number
+        self.gap_fields_number = result.gap_fields_number
+        self.eliminated_gaps = result.eliminated_gaps
+        self.remaining_gaps = result.remaining_gaps
+
+        self.log.info(f"{BOLD}{BLUE}All fields per {self.component} resource:"
+                      f" {self.total_fields_number}{ENDC}")
+        self.log.info(f"{BOLD}{CYAN}Gap Fields:"
+                      f" {self.gap_fields_number}{ENDC}")
+        self.log.info(f"{BOLD}{GREEN}Eliminated Gaps:"
+                      f" {self.eliminated_gaps}{ENDC}")
+        self.log.info(f"{BOLD}{RED}Remaining Gaps:"
+                      f" {self.remaining_gaps}{ENDC}")
+
+        return self.save_new_report(result.api_implemented,
+                                    result.api_missing,
+                                    result.tf_specific,
+                                    result.excluded,
+                                    directory=directory)
 
     def save_new_report(self, api_implemented, api_missing, tf_specific,
                         excluded, directory=None):
         """
-        Saves the generated difference report to a YAML file.
+        Saves the generated difference report to a YAML file, or to the
+        consolidated stream of the active `report_sink` if it has one.
 
         Args:
             api_implemented (list): List of API fields that are implemented
@@ -185,6 +408,8 @@ class DiffCommon:
                                 component.
             excluded (list): List of fields explicitly excluded from the
                              comparison.
+            directory (str, optional): Directory to save the report.
+                                       Defaults to `cwd`.
 
         Returns:
             bool: True if the report file is successfully saved and exists,
@@ -202,17 +427,59 @@ class DiffCommon:
             "excluded": excluded,
         }
 
+        sink = getattr(self, "report_sink", None)
+        if sink and sink.stream_format:
+            sink.add_report(self.component, self.yaml_report)
+            return True
+
         file_name = (f"{self.component}_{self.api}_diff_report_"
                      f"{self.date}-{self.tf_provider_version}.yaml")
-        if directory and not os.path.exists(directory):
+        if not directory:
+            directory = self.cwd
+        if not os.path.isdir(directory):
             return False
-        elif directory:
-            file_name = os.path.join(directory, file_name)
+        file_name = os.path.join(directory, file_name)
         self.log.debug(
-            f"Saving {self.component} schema to json file {file_name}"
+            f"Saving {self.component} report to yaml file {file_name}"
+        )
+        try:
+            write_atomic(
+                file_name,
+                yaml.dump(self.yaml_report, Dumper=YamlDumper).encode()
+            )
+        except OSError as e:
+            self.log.error(f"Cannot save {file_name}: {e}")
+            return False
+        return True
+
+    def save_history(self, kind, api, report_dir, results):
+        """
+        Appends the results of the run to the history database in the
+        cache directory.
+
+        Args:
+            kind (str): Kind of the report (`global`, `aws` or `azure`).
+            api (str): Name of the analyzed API.
+            report_dir (str): Path of the report directory.
+            results (list): `DiffComponentResult` objects of the run.
+
+        Returns:
+            bool: True if the run was added, False otherwise.
+        """
+        path = os.path.join(getattr(self, 'cache_dir', CACHE_DIR),
+                            HISTORY_DB_NAME)
+        components = (
+            (result.component, result.tf_resource_name,
+             {category: getattr(result, category)
+              for category in FIELD_STATUSES})
+            for result in results
         )
-        with open(file_name, "w") as f:
-            yaml.dump(self.yaml_report, f)
-        if not os.path.exists(file_name):
+        try:
+            with DiffHistory(self.log, path) as history:
+                history.add_run(kind, api, self.tf_provider_version,
+                                self.date, report_dir, components)
+        except DiffHistoryError as e:
+            self.log.error(f"{e}")
             return False
+        self.log.info(f"Run added to the history {path}")
         return True
@@ -5,6 +5,8 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
+import os
+
 API_URLS = {
     "compute": "https://www.googleapis.com/discovery/v1/apis/compute/v1/rest",
     "compute-beta": (
@@ -71,3 +73,28 @@ TF_RESOURCES = {
 YAML_CONFIG_PATH = "./gcpdiff/config.yaml"
 AWS_YAML_CONFIG_PATH = "./gcpdiff/aws_config.yaml"
 AZURE_YAML_CONFIG_PATH = "./gcpdiff/azure_config.yaml"
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "gcpdiff"
+)
+DISCOVERY_CACHE_TTL = 24 * 60 * 60
+DISCOVERY_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+DISCOVERY_CACHE_MAX_SIZE = 512 * 1024 * 1024
+DISCOVERY_REQUEST_TIMEOUT = 60
+DISCOVERY_REQUEST_RETRIES = 3
+DISCOVERY_RETRY_BACKOFF = 0.5
+DISCOVERY_FETCH_WORKERS = 8
+SCHEMA_MAX_REF_DEPTH = 32
+API_SNAPSHOT_FORMAT = 1
+TF_STREAM_CHUNK_SIZE = 1024 * 1024
+TF_SCHEMA_CACHE_FORMAT = 1
+AWS_SCHEMA_CACHE_FORMAT = 1
+AWS_SCHEMA_LOAD_WORKERS = 8
+INCREMENTAL_STATE_FORMAT = 3
+HISTORY_FORMAT = 1
+HISTORY_DB_NAME = "history.sqlite"
+PROFILE_REPORT_FORMAT = 1
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_RELOAD_INTERVAL = 5
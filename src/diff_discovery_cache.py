@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import hashlib
+import json
+import os
+import requests
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from diff_common import write_atomic
+from diff_config import (
+    CACHE_DIR,
+    DISCOVERY_CACHE_TTL,
+    DISCOVERY_CACHE_MAX_AGE,
+    DISCOVERY_CACHE_MAX_SIZE,
+    DISCOVERY_FETCH_WORKERS,
+    DISCOVERY_REQUEST_RETRIES,
+    DISCOVERY_REQUEST_TIMEOUT,
+    DISCOVERY_RETRY_BACKOFF
+)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def discovery_session(pool_size=DISCOVERY_FETCH_WORKERS):
+    """
+    Creates an HTTP session for downloading discovery documents. The
+    connections are pooled and reused, gzip encoded responses are requested
+    and failed connections, 429 and 5xx responses are retried with
+    exponential backoff.
+
+    Args:
+        pool_size (int, optional): Number of pooled connections per host.
+
+    Returns:
+        requests.Session: The session.
+    """
+    retry = Retry(
+        total=DISCOVERY_REQUEST_RETRIES,
+        backoff_factor=DISCOVERY_RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip"
+    return session
+
+
+class DiffDiscoveryCache:
+    """
+    On-disk, content-addressed cache for Google API discovery documents.
+
+    Documents are stored under `<cache_dir>/discovery/objects/<sha256>.json`
+    and `<cache_dir>/discovery/index.json` maps every API name to the
+    revision, digest and HTTP validators (ETag, Last-Modified) of its
+    newest document. Plain `<cache_dir>/discovery/<api>.json` files are
+    accepted as seed documents, so a stub directory can be used without
+    network access.
+    """
+    def __init__(self, log, cache_dir=CACHE_DIR, ttl=DISCOVERY_CACHE_TTL,
+                 max_age=DISCOVERY_CACHE_MAX_AGE,
+                 max_size=DISCOVERY_CACHE_MAX_SIZE, offline=False):
+        self.log = log
+        self.discovery_dir = os.path.join(cache_dir, "discovery")
+        self.objects_dir = os.path.join(self.discovery_dir, "objects")
+        self.index_path = os.path.join(self.discovery_dir, "index.json")
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size = max_size
+        self.offline = offline
+        self.index = self._load_index()
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        The pooled HTTP session of the cache, created on first use.
+        """
+        if self._session is None:
+            self._session = discovery_session()
+        return self._session
+
+    def _load_index(self):
+        """
+        Loads the cache index from disk.
+
+        Returns:
+            dict: Index entries keyed by API name. Empty if the index does
+                  not exist or cannot be decoded.
+        """
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.decoder.JSONDecodeError):
+            self.log.warning("Discovery cache index is broken! Ignoring it.")
+            return {}
+
+    def _save_index(self):
+        """
+        Saves the cache index to disk.
+        """
+        try:
+            write_atomic(
+                self.index_path,
+                json.dumps(self.index, indent=2, sort_keys=True).encode()
+            )
+        except OSError as e:
+            self.log.warning(f"Cannot save discovery cache index: {e}")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.json")
+
+    def _load_object(self, api, entry):
+        """
+        Loads the cached discovery document described by the index entry.
+
+        Args:
+            api (str): Name of the API.
+            entry (dict): Index entry of the API.
+
+        Returns:
+            dict: Discovery document or `None` if it cannot be loaded.
+        """
+        path = self._object_path(entry["digest"])
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        if hashlib.sha256(content).hexdigest() != entry["digest"]:
+            self.log.warning(f"Cached {api} discovery doc is corrupted!")
+            # The download is stored under the same digest, so the broken
+            # object must not be kept in its place.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            discovery_doc = json.loads(content)
+        except json.decoder.JSONDecodeError:
+            return None
+
+        entry["used"] = time.time()
+        self.log.debug(f"Using cached {api} discovery doc revision "
+                       f"{entry.get('revision')}")
+        return discovery_doc
+
+    def _load_seed(self, api):
+        """
+        Loads a seed discovery document `<cache_dir>/discovery/<api>.json`.
+
+        Args:
+            api (str): Name of the API.
+
+        Returns:
+            dict: Discovery document or `None` if there is no seed file.
+        """
+        seed_path = os.path.join(self.discovery_dir, f"{api}.json")
+        if not os.path.exists(seed_path):
+            return None
+        self.log.debug(f"Using seed {api} discovery doc {seed_path}")
+        with open(seed_path, "r") as f:
+            try:
+                return json.load(f)
+            except json.decoder.JSONDecodeError:
+                self.log.error(f"Seed {api} discovery doc is not valid JSON!")
+                return None
+
+    def _store(self, api, url, content, response):
+        """
+        Stores a downloaded discovery document and updates the index.
+
+        Args:
+            api (str): Name of the API.
+            url (str): URL of the discovery document.
+            content (bytes): Raw document content.
+            response (requests.Response): Response with the HTTP validators.
+
+        Returns:
+            dict: Decoded discovery document or `None` if the content is not
+                  a valid JSON document.
+        """
+        try:
+            discovery_doc = json.loads(content)
+        except json.decoder.JSONDecodeError:
+            self.log.error("Response does not contain the JSON file!")
+            return None
+
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+        try:
+            if not os.path.exists(object_path):
+                write_atomic(object_path, content)
+        except OSError as e:
+            self.log.warning(f"Cannot cache {api} discovery doc: {e}")
+            return discovery_doc
+
+        now = time.time()
+        self.index[api] = {
+            "url": url,
+            "revision": discovery_doc.get("revision"),
+            "digest": digest,
+            "size": len(content),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked": now,
+            "used": now,
+        }
+        self.log.debug(f"Cached {api} discovery doc revision "
+                       f"{discovery_doc.get('revision')} as {digest}")
+        self.evict(keep=api)
+        self._save_index()
+        return discovery_doc
+
+    def _lookup(self, api, url):
+        """
+        Looks up the cached discovery document of the API.
+
+        Args:
+            api (str): Name of the API.
+            url (str): URL of the discovery document.
+
+        Returns:
+            tuple: Index entry and cached document of the API (`None` if
+                   not cached) and a flag telling if the cached document is
+                   the result, i.e. it is fresh or the cache is offline.
+        """
+        entry = self.index.get(api)
+        if entry and entry.get("url") != url:
+            entry = None
+
+        cached_doc = None
+        if entry:
+            cached_doc = self._load_object(api, entry)
+            if cached_doc is None:
+                entry = None
+
+        if self.offline:
+            if cached_doc is None:
+                cached_doc = self._load_seed(api)
+            if cached_doc is None:
+                self.log.error(f"No cached {api} discovery doc available in"
+                               " offline mode!")
+            else:
+                self._save_index()
+            return entry, cached_doc, True
+
+        if (cached_doc is not None
+                and time.time() - entry["checked"] < self.ttl):
+            self._save_index()
+            return entry, cached_doc, True
+        return entry, cached_doc, False
+
+    def _fetch(self, url, entry):
+        """
+        Downloads the discovery document, conditionally if it is cached. The
+        method does not touch the cache, so it can run in worker threads.
+
+        Args:
+            url (str): URL of the discovery document.
+            entry (dict): Index entry of the cached document or `None`.
+
+        Returns:
+            requests.Response: Response of the server.
+
+        Raises:
+            requests.RequestException: The document cannot be downloaded.
+        """
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.log.debug(f"Trying to get discovery doc from: {url}")
+        return self.session.get(url, headers=headers,
+                                timeout=DISCOVERY_REQUEST_TIMEOUT)
+
+    def _update(self, api, url, entry, cached_doc, response=None,
+                error=None):
+        """
+        Updates the cache with the result of a download.
+
+        Args:
+            api (str): Name of the API.
+            url (str): URL of the discovery document.
+            entry (dict): Index entry of the cached document or `None`.
+            cached_doc (dict): Cached document or `None`.
+            response (requests.Response, optional): Response of the server.
+            error (requests.RequestException, optional): Error of the
+                                                         download.
+
+        Returns:
+            dict: Discovery document or `None` if it is not available.
+        """
+        if error is not None:
+            if cached_doc is None:
+                self.log.error(f"Cannot download {api} discovery doc:"
+                               f" {error}")
+                return None
+            self.log.warning(f"Cannot revalidate {api} discovery doc, using"
+                             f" the cached one: {error}")
+            return cached_doc
+
+        if response.status_code == 304 and cached_doc is not None:
+            self.log.debug(f"Cached {api} discovery doc is up to date")
+            entry["checked"] = time.time()
+            self._save_index()
+            return cached_doc
+
+        if response.status_code != 200:
+            if cached_doc is None:
+                self.log.error(f"Getting {api} discovery doc failed with"
+                               f" HTTP status {response.status_code}!")
+                return None
+            self.log.warning(f"Getting {api} discovery doc failed with HTTP"
+                             f" status {response.status_code}, using the"
+                             " cached one")
+            return cached_doc
+
+        return self._store(api, url, response.content, response)
+
+    def get_discovery_doc(self, api, url):
+        """
+        Returns the discovery document of the API. A cached document is used
+        as long as it is fresh; afterwards it is revalidated with a
+        conditional request. In offline mode only the cache is used.
+
+        Args:
+            api (str): Name of the API.
+            url (str): URL of the discovery document.
+
+        Returns:
+            dict: Discovery document or `None` if it is not available.
+        """
+        entry, cached_doc, done = self._lookup(api, url)
+        if done:
+            return cached_doc
+        try:
+            response = self._fetch(url, entry)
+        except requests.RequestException as e:
+            return self._update(api, url, entry, cached_doc, error=e)
+        return self._update(api, url, entry, cached_doc, response)
+
+    def get_discovery_docs(self, urls, max_workers=DISCOVERY_FETCH_WORKERS):
+        """
+        Returns the discovery documents of several APIs. Documents that are
+        not fresh in the cache are downloaded concurrently by at most
+        `max_workers` threads sharing the pooled session. Documents are
+        yielded as soon as they are available, cached ones first, so a
+        document can be processed while the others are still downloading.
+        The cache itself is only updated by the consuming thread.
+
+        Args:
+            urls (dict): URLs of the discovery documents keyed by the API.
+            max_workers (int, optional): Number of concurrent downloads.
+
+        Yields:
+            tuple: Name of the API and its discovery document (`None` if it
+                   is not available).
+        """
+        cached = []
+        pending = {}
+        for api, url in urls.items():
+            entry, cached_doc, done = self._lookup(api, url)
+            if done:
+                cached.append((api, cached_doc))
+            else:
+                pending[api] = (url, entry, cached_doc)
+
+        if not pending:
+            yield from cached
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(pending)))
+        ) as executor:
+            futures = {
+                executor.submit(self._fetch, url, entry): api
+                for api, (url, entry, _) in pending.items()
+            }
+            yield from cached
+            for future in as_completed(futures):
+                api = futures[future]
+                url, entry, cached_doc = pending[api]
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    yield api, self._update(api, url, entry, cached_doc,
+                                            error=e)
+                    continue
+                yield api, self._update(api, url, entry, cached_doc,
+                                        response)
+
+    def evict(self, keep=None):
+        """
+        Removes cache entries that were not used for longer than `max_age`
+        and the least recently used documents until the cache fits into
+        `max_size`. Documents not referenced by the index are removed first.
+
+        Args:
+            keep (str, optional): API name whose entry is never evicted.
+        """
+        now = time.time()
+        for api, entry in list(self.index.items()):
+            if api != keep and now - entry.get("used", 0) > self.max_age:
+                self.log.debug(f"Evicting expired {api} discovery doc")
+                del self.index[api]
+
+        if not os.path.exists(self.objects_dir):
+            return
+
+        referenced = {
+            entry["digest"]: entry.get("used", 0)
+            for entry in self.index.values()
+        }
+        objects = []
+        for file_name in os.listdir(self.objects_dir):
+            if not file_name.endswith(".json"):
+                continue
+            path = os.path.join(self.objects_dir, file_name)
+            digest = file_name[:-len(".json")]
+            used = referenced.get(digest)
+            objects.append((used is not None, used or 0, digest, path,
+                            os.path.getsize(path)))
+
+        total_size = sum(size for *_, size in objects)
+        keep_digest = self.index.get(keep, {}).get("digest")
+        for is_referenced, _, digest, path, size in sorted(objects):
+            if is_referenced and total_size <= self.max_size:
+                break
+            if digest == keep_digest:
+                continue
+            self.log.debug(f"Evicting cached discovery doc {digest}")
+            os.remove(path)
+            total_size -= size
+            for api, entry in list(self.index.items()):
+                if entry["digest"] == digest:
+                    del self.index[api]
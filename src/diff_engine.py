@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from diff_api_parser import DiffApiParser
+from diff_mapping import DiffMapping
+from diff_profiler import PROFILE_STATS_SUFFIX, DiffProfileRecord, measure
+from diff_tf_parser import DiffTfParser
+
+
+@dataclass
+class DiffComponentJob:
+    """
+    Input of a single component comparison.
+
+    Attributes:
+        component (str): Name of the compared component.
+        tf_resource_name (str): Name of the main Terraform resource.
+        api_schema (dict): API schema of the component.
+        tf_schemas (dict): Terraform schemas of the component and its related
+                           resources, keyed by the resource name. Values are
+                           `(prepend, schema)` tuples.
+        mapping (DiffMapping): Compiled mapping settings of the component.
+        api_fields (tuple, optional): Precomputed `(api_field_list,
+                                      api_output_only)` of the API schema.
+        azure (bool): Process the API schema as an Azure API schema.
+        aws (bool): Convert Terraform fields to PascalCase.
+    """
+    component: str
+    tf_resource_name: str
+    api_schema: dict
+    tf_schemas: dict
+    mapping: DiffMapping = field(default_factory=DiffMapping)
+    api_fields: tuple = None
+    azure: bool = False
+    aws: bool = False
+
+
+@dataclass
+class DiffComponentResult:
+    """
+    Result of a single component comparison.
+    """
+    component: str
+    tf_resource_name: str
+    api_field_list: list = field(default_factory=list)
+    api_output_only: list = field(default_factory=list)
+    tf_field_list: list = field(default_factory=list)
+    api_implemented: list = field(default_factory=list)
+    api_missing: list = field(default_factory=list)
+    tf_specific: list = field(default_factory=list)
+    excluded: list = field(default_factory=list)
+    error: str = None
+
+    @property
+    def total_fields_number(self):
+        return (len(self.api_implemented) + len(self.api_missing) +
+                len(self.excluded))
+
+    @property
+    def gap_fields_number(self):
+        return len(self.api_implemented) + len(self.api_missing)
+
+    @property
+    def eliminated_gaps(self):
+        return len(self.api_implemented)
+
+    @property
+    def remaining_gaps(self):
+        return len(self.api_missing)
+
+
+class DiffFieldExtractor(DiffApiParser, DiffTfParser):
+    """
+    Extracts API and Terraform fields outside of the report drivers.
+    """
+    def __init__(self):
+        self.log = logging.getLogger(__name__)
+
+
+def match_fields(api_field_list, api_output_only, tf_field_list, mapping):
+    """
+    Matches API fields with Terraform fields using the component mapping.
+
+    Membership checks and removals are done on sets, so the matching is
+    linear in the number of fields. The returned lists keep the order of
+    the input lists: `api_implemented` in the order the fields were matched,
+    `api_missing` and `tf_specific` in the order of `api_field_list` and
+    `tf_field_list`. Both field lists are expected to contain no duplicates.
+
+    Args:
+        api_field_list (list): API fields of the component.
+        api_output_only (list): Output only API fields of the component.
+        tf_field_list (list): Terraform fields of the component.
+        mapping (DiffMapping): Compiled mapping settings of the component.
+
+    Returns:
+        tuple: `api_implemented`, `api_missing`, `tf_specific` and
+               `excluded` field lists.
+    """
+    exact_mapping = mapping.exact
+
+    api_implemented = []
+    excluded = []
+    api_missing = set(api_field_list)
+    tf_specific = set(tf_field_list)
+    implemented = set()
+
+    for tf_field, mapped_field in zip(tf_field_list,
+                                      mapping.translate_all(tf_field_list)):
+        if mapped_field in api_missing and mapped_field not in implemented:
+            api_implemented.append(mapped_field)
+            implemented.add(mapped_field)
+            api_missing.discard(mapped_field)
+            tf_specific.discard(tf_field)
+
+    if exact_mapping:
+        for api_field in api_field_list:
+            mapped_field = exact_mapping.get(api_field)
+            if mapped_field is None or mapped_field in implemented:
+                continue
+            if mapped_field in tf_specific and api_field in api_missing:
+                api_missing.discard(api_field)
+                api_implemented.append(api_field)
+                implemented.add(api_field)
+                tf_specific.discard(mapped_field)
+
+    excluded_set = set()
+    for excluded_field in mapping.exclude:
+        if excluded_field in api_missing:
+            api_missing.discard(excluded_field)
+            excluded.append(excluded_field)
+            excluded_set.add(excluded_field)
+
+    for output_only_field in api_output_only:
+        if output_only_field not in excluded_set:
+            excluded.append(output_only_field)
+            excluded_set.add(output_only_field)
+
+    return (api_implemented,
+            [field for field in api_field_list if field in api_missing],
+            [field for field in tf_field_list if field in tf_specific],
+            excluded)
+
+
+def compare_component(job):
+    """
+    Compares API and Terraform fields of a single component. The function
+    does not depend on any report driver state, so it can run in a worker
+    process.
+
+    Args:
+        job (DiffComponentJob): Input of the comparison.
+
+    Returns:
+        DiffComponentResult: Result of the comparison. `error` is set if
+                             the fields cannot be retrieved.
+    """
+    result = DiffComponentResult(job.component, job.tf_resource_name)
+    extractor = DiffFieldExtractor()
+
+    if job.api_fields:
+        api_field_list, api_output_only = job.api_fields
+        result.api_field_list = list(api_field_list)
+        result.api_output_only = list(api_output_only)
+    else:
+        extractor.component_api_schema = job.api_schema
+        if not extractor.get_api_fields(azure=job.azure):
+            result.error = (f"Cannot get API {job.component} schema fields!")
+            return result
+        result.api_field_list = extractor.api_field_list
+        result.api_output_only = extractor.api_output_only
+
+    tf_fields = {}
+    for resource, (prepend, schema) in job.tf_schemas.items():
+        extractor.component_tf_schema = schema
+        if not extractor.get_tf_fields(prepend=prepend, aws=job.aws):
+            result.error = f"Cannot get Terraform {resource} schema fields!"
+            return result
+        tf_fields.update(dict.fromkeys(extractor.tf_field_list))
+    result.tf_field_list = list(tf_fields)
+
+    (result.api_implemented, result.api_missing, result.tf_specific,
+     result.excluded) = match_fields(result.api_field_list,
+                                     result.api_output_only,
+                                     result.tf_field_list,
+                                     job.mapping)
+    return result
+
+
+def profile_component(job):
+    """
+    Compares a single component and measures the comparison.
+
+    Args:
+        job (DiffComponentJob): Input of the comparison.
+
+    Returns:
+        tuple: `DiffComponentResult` of the comparison and its
+               `DiffProfileRecord`.
+    """
+    with measure(DiffProfileRecord("compare")) as record:
+        result = compare_component(job)
+    record.count(api_fields=len(result.api_field_list),
+                 api_output_only=len(result.api_output_only),
+                 tf_fields=len(result.tf_field_list),
+                 tf_resources=len(job.tf_schemas),
+                 api_implemented=len(result.api_implemented),
+                 api_missing=len(result.api_missing))
+    return result, record
+
+
+def run_component_jobs(jobs, max_workers=1, profiler=None):
+    """
+    Runs the component comparisons, in parallel worker processes if more
+    than one worker is requested.
+
+    Args:
+        jobs (list): `DiffComponentJob` objects.
+        max_workers (int, optional): Number of worker processes.
+        profiler (DiffProfiler, optional): Profiler of the run. If enabled,
+                                           every comparison is measured in
+                                           the process running it.
+
+    Returns:
+        list: `DiffComponentResult` objects in the order of the jobs.
+    """
+    if not profiler or not profiler.enabled:
+        if max_workers <= 1 or len(jobs) <= 1:
+            return [compare_component(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(compare_component, jobs))
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        profiled = [profile_component(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            profiled = list(executor.map(profile_component, jobs))
+    results = []
+    for result, record in profiled:
+        profiler.add_component_record(result.component, record)
+        results.append(result)
+    return results
+
+
+def profile_slowest_component(profiler, jobs, base_path):
+    """
+    Dumps cProfile statistics of the comparison of the slowest component to
+    `<base_path>-<component>.pstats`, if requested by the profiler.
+
+    Args:
+        profiler (DiffProfiler): Profiler of the run.
+        jobs (list): `DiffComponentJob` objects of the run.
+        base_path (str): Path of the statistics file without the component
+                         and the extension.
+
+    Returns:
+        bool: `True` if the statistics were dumped or are not requested,
+              `False` otherwise.
+    """
+    if not profiler or not profiler.stats:
+        return True
+    jobs = {job.component: job for job in jobs}
+    for component in profiler.hottest_components(len(profiler.components)):
+        if component in jobs:
+            return profiler.dump_stats(
+                f"{base_path}-{component}{PROFILE_STATS_SUFFIX}",
+                compare_component,
+                jobs[component]
+            )
+    return True
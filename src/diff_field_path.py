@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import threading
+
+_lock = threading.Lock()
+
+
+class DiffFieldPath:
+    """
+    Node of `DiffFieldPathTable`: a field path stored as its parent path and
+    its last segment. The dotted string of the path is built once, from the
+    string of the parent path, when the path is created and is shared by
+    every field list containing the path.
+    """
+    __slots__ = ("parent", "segment", "children", "path")
+
+    def __init__(self, parent, segment):
+        self.parent = parent
+        self.segment = segment
+        self.children = {}
+        if parent is None or parent.parent is None:
+            self.path = segment
+        else:
+            self.path = f"{parent.path}.{segment}"
+
+    def child(self, segment):
+        """
+        Returns the path extended by the segment.
+
+        Args:
+            segment (str): The appended segment.
+
+        Returns:
+            DiffFieldPath: The interned path.
+        """
+        node = self.children.get(segment)
+        if node is not None:
+            return node
+        # Paths are created once, so only their creation is serialized for
+        # the walkers running in threads (e.g. the AWS schema loader).
+        with _lock:
+            return self.children.setdefault(segment,
+                                            DiffFieldPath(self, segment))
+
+
+class DiffFieldPathTable:
+    """
+    Table of interned field paths.
+
+    Field paths are nodes of a tree of segments, so a path is created once
+    however many schemas, components or Terraform resources contain it, and
+    extending a path by a segment is a dictionary lookup instead of a string
+    concatenation. Paths are compared and hashed by identity. The field
+    walkers build the paths in the table and yield their dotted strings, so
+    equal fields of different components share one string.
+
+    Relative paths (e.g. the fields of a shared schema object relative to
+    the object) are paths of the same table, appended to another path with
+    `extend`.
+    """
+    def __init__(self):
+        self.root = DiffFieldPath(None, "")
+
+    def clear(self):
+        """
+        Drops every path of the table, e.g. when a long running process
+        drops the schemas the paths were built from. The strings of the
+        paths stay valid; the paths are interned again when the fields are
+        walked next. Must not be called while fields are being walked.
+        """
+        self.root = DiffFieldPath(None, "")
+
+    def lookup(self, path):
+        """
+        Returns the interned path of the dotted string.
+
+        Args:
+            path (str): The field (in dot notation). An empty string is the
+                        root path.
+
+        Returns:
+            DiffFieldPath: The interned path.
+        """
+        node = self.root
+        if path:
+            for segment in path.split("."):
+                node = node.child(segment)
+        return node
+
+    def extend(self, node, relatives):
+        """
+        Appends the relative paths to the path.
+
+        Args:
+            node (DiffFieldPath): The path.
+            relatives (list): Relative paths.
+
+        Returns:
+            list: The extended paths, in the order of `relatives`.
+        """
+        if node is self.root:
+            return relatives
+        extended = {self.root: node}
+        result = []
+        for relative in relatives:
+            if relative is self.root:
+                result.append(node)
+                continue
+            parent = extended.get(relative.parent)
+            if parent is None:
+                parent = self._extend(extended, relative.parent)
+            result.append(parent.child(relative.segment))
+        return result
+
+    def _extend(self, extended, relative):
+        pending = []
+        while relative not in extended:
+            pending.append(relative)
+            relative = relative.parent
+        node = extended[relative]
+        for relative in reversed(pending):
+            node = node.child(relative.segment)
+            extended[relative] = node
+        return node
+
+
+FIELD_PATHS = DiffFieldPathTable()
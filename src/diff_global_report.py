@@ -6,22 +6,350 @@
 #
 
 import os
-import csv
 
 from datetime import datetime
+from diff_config import API_URLS, TF_RESOURCES
+from diff_report_sink import CSV_HEADER, DiffReportSink, STREAM_FORMATS
+from diff_engine import profile_slowest_component, run_component_jobs
+from diff_incremental import (
+    STATE_SUFFIX,
+    DiffIncrementalState,
+    component_input_digest,
+    find_previous_state,
+    run_input_digest,
+    schema_digest
+)
+from diff_profiler import PROFILE_SUFFIX, DiffProfiler
 from diff_report import DiffReport
+from diff_tf_index import DiffTfPrefixSelection, strip_api_prefix
+
+
+class DiffGlobalReportError(Exception):
+    """
+    Error of the global report of a single API.
+    """
 
 
 class DiffGlobalReport(DiffReport):
     def __init__(self):
-        self._cmd_input = self.diff_cmdline().parse_args()
+        parser = self.diff_cmdline(multi_api=True)
+        self.diff_discovery_cmdline(parser)
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of worker processes comparing components"
+        )
+        parser.add_argument(
+            "--consolidated_report",
+            choices=STREAM_FORMATS,
+            help=("Save all component reports in a single JSON Lines or"
+                  " YAML stream instead of a file per component")
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=("Reuse the results of the previous global report for"
+                  " components whose inputs did not change")
+        )
+        parser.add_argument(
+            "--history",
+            action="store_true",
+            help=("Append the results of the run to the history database"
+                  " in the cache directory")
+        )
+        self._cmd_input = parser.parse_args()
+        self.cwd = os.getcwd()
         self.tf_config_path = self._cmd_input.terraform_config
-        self.api = self._cmd_input.api
+        self.apis = (list(TF_RESOURCES) if "all" in self._cmd_input.api
+                     else list(dict.fromkeys(self._cmd_input.api)))
+        self.api = self.apis[0]
+        self.discovery_urls = {**API_URLS,
+                               **dict(self._cmd_input.discovery_url)}
         self.save_file = self._cmd_input.save_file
+        self.cache_dir = os.path.abspath(self._cmd_input.cache_dir)
+        self.cache_ttl = self._cmd_input.cache_ttl
+        self.offline = self._cmd_input.offline
+        self.refresh_tf_cache = self._cmd_input.refresh_tf_cache
+        self.jobs = self._cmd_input.jobs
+        self.consolidated_report = self._cmd_input.consolidated_report
+        self.history = self._cmd_input.history
+        self.incremental = self._cmd_input.incremental
+        self.shared_tf_schemas = False
+        self.tf_schema_digests = {}
         self.verbose = self._cmd_input.verbose
         self.diff_log(verbose=self.verbose)
+        self.profiler = DiffProfiler(self.log,
+                                     enabled=self._cmd_input.profile,
+                                     stats=self._cmd_input.profile_stats)
+
+    def component_digest(self, component, tf_resources):
+        """
+        Computes the input digest of the component from its own inputs: the
+        API field table of the component, the Terraform schemas of its
+        resources and its configuration section. A Terraform schema is
+        hashed once per run, however many components use it.
+
+        Args:
+            component (str): Name of the API component.
+            tf_resources (list): Names of the Terraform resources of the
+                                 component and its related resources.
+
+        Returns:
+            str: SHA-256 digest of the inputs of the component.
+        """
+        api_fields = self.api_field_tables.get(component)
+        if api_fields is None:
+            api_fields = self.api_schemas.get(component)
+
+        provider = self._tf_provider(self.api)
+        resource_schemas = (self.terraform_schemas["provider_schemas"]
+                            [provider]["resource_schemas"])
+        tf_digests = {}
+        for resource in tf_resources:
+            digest = self.tf_schema_digests.get((provider, resource))
+            if digest is None:
+                digest = schema_digest(resource_schemas.get(resource))
+                self.tf_schema_digests[(provider, resource)] = digest
+            tf_digests[resource] = digest
+        return component_input_digest(
+            component,
+            schema_digest(api_fields),
+            tf_digests,
+            self.yaml_config.get(strip_api_prefix(component))
+        )
+
+    def run_incremental_jobs(self, components):
+        """
+        Runs the comparisons of the components whose inputs changed since
+        the previous global report. Results of the other components are
+        taken from the state of the previous report, without building their
+        comparison jobs. Without the `--incremental` option all components
+        are compared and no input digest is computed.
+
+        Args:
+            components (dict): Names of the Terraform resources of the
+                               compared components keyed by the component.
+
+        Returns:
+            tuple: `DiffComponentResult` objects in the order of the
+                   components, the `DiffComponentJob` objects of the
+                   compared components and the `DiffIncrementalState` of
+                   this run or `None` without the `--incremental` option.
+
+        Raises:
+            DiffGlobalReportError: If a comparison job cannot be built.
+        """
+        results = dict.fromkeys(components)
+        digests = {}
+        inputs = None
+        previous = DiffIncrementalState(self.log)
+        if self.incremental:
+            inputs = run_input_digest(self.api_revision,
+                                      self.tf_schemas_digest,
+                                      self.yaml_config)
+            previous_path = find_previous_state(os.path.join(
+                self.cwd,
+                f"*-global-reports-{self.api}-v*",
+                f"*-global-report-{self.api}-v*{STATE_SUFFIX}"
+            ))
+            if not previous_path:
+                self.log.warning("No previous global report state found!"
+                                 " Comparing all components.")
+            elif previous.load(previous_path):
+                self.log.info(f"Using previous report state {previous_path}")
+            # Neither the discovery document nor the lock file changed, so
+            # the stored digests are current and no schema is hashed.
+            unchanged = inputs is not None and previous.inputs == inputs
+            if unchanged:
+                self.log.info("Inputs of the previous report did not change")
+            with self.profiler.stage("digests"):
+                for component, tf_resources in components.items():
+                    digest = previous.digest(component) if unchanged else None
+                    if digest is None:
+                        digest = self.component_digest(component,
+                                                       tf_resources)
+                    digests[component] = digest
+                    results[component] = previous.get(component, digest)
+
+        jobs = []
+        with self.profiler.stage("build_jobs"):
+            for component, result in results.items():
+                if result is not None:
+                    continue
+                self.component = component
+                with self.profiler.stage("build", component=component):
+                    job = self.build_component_job(
+                        tf_component=strip_api_prefix(component)
+                    )
+                if not job:
+                    raise DiffGlobalReportError(
+                        f"Cannot compare {component} component!"
+                    )
+                jobs.append(job)
+
+        self.log.info(f"Comparing {len(jobs)} of {len(components)}"
+                      " components")
+        self.recomputed = set()
+        with self.profiler.stage("compare") as stage:
+            for result in run_component_jobs(jobs, max_workers=self.jobs,
+                                             profiler=self.profiler):
+                results[result.component] = result
+                self.recomputed.add(result.component)
+            stage.count(components=len(components),
+                        recomputed=len(self.recomputed))
+
+        state = None
+        if self.incremental:
+            state = DiffIncrementalState(self.log, inputs)
+            for component, result in results.items():
+                state.add(digests[component], result)
+        return list(results.values()), jobs, state
+
+    def match_tf_resources(self, components):
+        """
+        Matches the API components with the Terraform resources of the
+        analyzed API and their related resources.
+
+        Args:
+            components (iterable): Names of the API components.
+
+        Returns:
+            tuple: Names of the Terraform resources of the matched
+                   components keyed by the component, in the order of the
+                   main and the related resources, and the list of the
+                   components without a matching Terraform resource.
+        """
+        matching_schemas = {}
+        not_matching_api = []
+        for component in components:
+            origin_component = component
+            component = strip_api_prefix(component)
+            self.log.debug(f"Trying to match {component} with Terraform"
+                           " resource")
+            related_resources = {component: None}
+            try:
+                related_resources.update(
+                    self.yaml_config[component]["RelatedResources"]
+                )
+            except KeyError:
+                pass
+
+            tf_schemas = []
+            for resource in related_resources:
+                if not self.has_tf_component_schema(resource, self.api):
+                    self.log.debug("Could not get Terraform "
+                                   f"schema for {resource}")
+                    continue
+                tf_schemas.append(
+                    self.get_tf_resource_name(resource, self.api)
+                )
+
+            if not tf_schemas:
+                self.log.debug("Could not get matching Terraform resource for"
+                               f" {origin_component}")
+                not_matching_api.append(origin_component)
+                continue
+            matching_schemas.update(
+                {origin_component: tf_schemas}
+            )
+        return matching_schemas, not_matching_api
+
+    def load_shared_tf_schemas(self):
+        """
+        Loads the Terraform schemas of the resources of all requested APIs
+        with a single `get_tf_schemas` call. The global reports of the APIs
+        use the loaded schemas instead of getting them for every API.
+
+        Raises:
+            DiffGlobalReportError: If the schemas cannot be loaded.
+        """
+        self.log.info(f"Getting Terraform schemas of {len(self.apis)} APIs")
+        with self.profiler.stage("shared_tf_schemas") as stage:
+            if not self.check_tf_dir():
+                raise DiffGlobalReportError(
+                    "Cannot use terraform config directory!"
+                )
+            if not self.get_tf_schemas(resources=DiffTfPrefixSelection(
+                TF_RESOURCES[api] for api in self.apis
+            )):
+                raise DiffGlobalReportError("Cannot get Terraform schema!")
+            self.tf_schema_digests = {}
+            stage.count(resources=sum(
+                len(provider_schema.get("resource_schemas", {}))
+                for provider_schema in (
+                    self.terraform_schemas["provider_schemas"].values()
+                )
+            ))
+        self.shared_tf_schemas = True
 
-    def generate_global_report(self):
+    def generate_global_reports(self):
+        """
+        Generates the global reports of all requested APIs in one process.
+        The discovery documents of the APIs are downloaded concurrently and
+        the report of an API is generated as soon as its document is
+        available, while the other documents are still downloading. The
+        Terraform schemas are loaded once, when the first document arrives,
+        and shared by all reports. Besides the report directory of every
+        API, a combined CSV summary of all APIs is saved in the current
+        directory. An API whose report fails is skipped and the summary of
+        the other APIs is still saved before the process exits with an
+        error.
+        """
+        if len(self.apis) == 1:
+            try:
+                self.generate_global_report()
+            except DiffGlobalReportError as e:
+                self.log.error(f"{e} Exiting...")
+                exit(1)
+            return
+
+        date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        summary_base = os.path.join(self.cwd,
+                                    f"{date}-global-reports-summary")
+        header = CSV_HEADER
+        if self.incremental:
+            header = CSV_HEADER + ["Recomputed"]
+
+        self.log.info(f"Getting discovery docs of {len(self.apis)} APIs")
+        failed = []
+        discovery_docs = self.get_discovery_cache().get_discovery_docs(
+            {api: self.discovery_urls[api] for api in self.apis}
+        )
+        with DiffReportSink(self.log, summary_base,
+                            header=["API"] + header) as summary:
+            for api, discovery_doc in discovery_docs:
+                if discovery_doc is None:
+                    self.log.error(f"Cannot get {api} discovery doc!"
+                                   " Skipping...")
+                    failed.append(api)
+                    continue
+                self.log.info(f"Generating {api} global report")
+                self.api = api
+                self.profiler = DiffProfiler(self.log,
+                                             enabled=self.profiler.enabled,
+                                             stats=self.profiler.stats)
+                try:
+                    if not self.shared_tf_schemas:
+                        self.load_shared_tf_schemas()
+                    rows = self.generate_global_report(
+                        discovery_doc=discovery_doc
+                    )
+                except DiffGlobalReportError as e:
+                    self.log.error(f"{e} Skipping {api}...")
+                    failed.append(api)
+                    continue
+                for row in rows:
+                    summary.add_row([api] + row)
+        self.log.info(f"Summary of all APIs saved to {summary.csv_path}")
+
+        if failed:
+            self.log.error(f"Cannot generate global reports of {failed}!"
+                           " Exiting...")
+            exit(1)
+
+    def generate_global_report(self, discovery_doc=None):
         """
         Generates a global report by comparing API schemas with Terraform
         schemas for each component, and summarizes the differences. The
@@ -40,76 +368,85 @@ class DiffGlobalReport(DiffReport):
            report.
         6. Saves the reports in a directory named with the current date and
            time.
+
+        Args:
+            discovery_doc (dict, optional): Already downloaded discovery
+                                            document of the API.
+
+        Returns:
+            list: Rows of the CSV summary report.
+
+        Raises:
+            DiffGlobalReportError: If the report of the API cannot be
+                                   generated.
         """
         time_now = datetime.now()
         self.date = time_now.strftime("%Y-%m-%d_%H-%M-%S")
         csv_date = time_now.strftime("%-m/%-d/%Y")
-        self.log.info("Getting YAML config")
-        if not self.load_config_diff_report():
-            self.log.error("Cannot get YAML config! Exiting...")
-            exit(1)
+        with self.profiler.stage("config"):
+            self.log.info("Getting YAML config")
+            if not self.load_config_diff_report():
+                raise DiffGlobalReportError("Cannot get YAML config!")
 
-        self.log.info("Changing directory to terraform config place")
-        if not self.change_to_tf_dir():
-            self.log.error("Cannot change workspace directory! Exiting...")
-            exit(1)
+            self.log.info("Checking terraform config place")
+            if not self.check_tf_dir():
+                raise DiffGlobalReportError(
+                    "Cannot use terraform config directory!"
+                )
 
         self.log.info("Getting API Schemas")
-        if not self.get_api_schemas(api=self.api):
-            self.log.error("Cannot get API schemas! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
+        with self.profiler.stage("api_schemas") as stage:
+            if not self.get_api_schemas(api=self.api,
+                                        discovery_doc=discovery_doc):
+                raise DiffGlobalReportError("Cannot get API schemas!")
+            stage.count(components=len(self.api_schemas))
 
         api_schemas_list = []
         for component in self.api_schemas:
+            if component == "KeyRing":
+                continue
             api_schemas_list.append(component)
 
         self.log.info("Getting Matching Terraform Resources")
-        matching_schemas = {}
-        not_matching_api = []
-        if not self.get_tf_schemas():
-            self.log.error("Cannot get Terraform schema! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
-
-        for component in api_schemas_list:
-            if component == "KeyRing":
-                continue
-            origin_component = component
-            if "GoogleCloudApigeeV1" in component:
-                component = component.split("GoogleCloudApigeeV1")[-1]
-            if "GoogleCloudAiplatformV1beta1" in component:
-                component = component.split("GoogleCloudAiplatformV1beta1")[-1]
-            self.log.debug(f"Trying to match {component} with Terraform"
-                           " resource")
-            related_resources = {component: None}
-            try:
-                related_resources.update(
-                    self.yaml_config[component]["RelatedResources"]
+        matched_resources = set()
+        with self.profiler.stage("tf_schemas") as stage:
+            tf_resources = self.get_tf_resources_for_components(
+                [strip_api_prefix(component)
+                 for component in api_schemas_list],
+                self.api
+            )
+            if not self.shared_tf_schemas:
+                if not self.get_tf_schemas(resources=tf_resources):
+                    raise DiffGlobalReportError(
+                        "Cannot get Terraform schema!"
+                    )
+                self.tf_schema_digests = {}
+            if not self.build_tf_resource_index(self.api):
+                raise DiffGlobalReportError(
+                    "Cannot index Terraform resources!"
                 )
-            except KeyError:
-                pass
+            if not self.get_tf_provider_version(self.api):
+                raise DiffGlobalReportError(
+                    "Cannot get Terraform provider version!"
+                )
+            stage.count(resources=len(tf_resources))
 
-            tf_schemas = {}
-            for resource, _ in related_resources.items():
-                if not self.get_tf_component_schema(
-                    resource,
-                    self.api,
-                    save_file=self.save_file
-                ):
-                    self.log.debug("Could not get Terraform "
-                                   f"schema for {resource}")
-                    continue
-                tf_schemas.update({resource: self.component_tf_schema})
+        matching_schemas, not_matching_api = self.match_tf_resources(
+            api_schemas_list
+        )
+        for tf_schemas in matching_schemas.values():
+            matched_resources.update(tf_schemas)
 
-            if not tf_schemas:
-                self.log.debug("Could not get matching Terraform resource for"
-                               f" {origin_component}")
-                not_matching_api.append(origin_component)
-                continue
-            matching_schemas.update(
-                {origin_component: tf_schemas}
-            )
+        self.log.info("API schemas without matching Terraform resource:"
+                      f" {len(not_matching_api)}")
+        self.log.debug(f"{not_matching_api}")
+        unmatched_resources = self.tf_resource_index.unmatched_resources(
+            matched_resources
+        )
+        self.log.info("Terraform resources without matching API schema:"
+                      f" {len(unmatched_resources)}")
+        for resource in unmatched_resources:
+            self.log.info(f"{resource}")
 
         self.log.debug("Create directory for component reports and "
                        "csv report file")
@@ -119,39 +456,71 @@ class DiffGlobalReport(DiffReport):
 
         reports_dir = os.path.join(self.cwd, f"{self.date}-global-reports-"
                                    f"{self.api}-v{self.tf_provider_version}")
-        csv_report = os.path.join(reports_dir,
-                                  f"{self.date}-global-report-"
-                                  f"{self.api}-v"
-                                  f"{self.tf_provider_version}.csv")
+        report_base = os.path.join(reports_dir,
+                                   f"{self.date}-global-report-"
+                                   f"{self.api}-v"
+                                   f"{self.tf_provider_version}")
         if os.path.exists(reports_dir):
-            self.log.error("Global reports path exist! Check the"
-                           " content of this path. Exiting...")
-            exit(1)
+            raise DiffGlobalReportError("Global reports path exist! Check the"
+                                        " content of this path.")
         else:
             os.makedirs(reports_dir)
 
-        with open(csv_report, mode="w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["Date", "Provider Version", "Resource Name",
-                             "Total Fields", "Gap Fields", "Eliminated Gaps",
-                             "Remaining Gaps"])
+        self.log.debug("Compare fields of each component")
+        results, jobs, state = self.run_incremental_jobs(matching_schemas)
 
         self.log.debug("Create reports each component")
-        for component in matching_schemas.keys():
-            self.component = component
-            self.component_diff_report(directory=reports_dir)
-            total_fields_number += self.total_fields_number
-            total_api_missing += self.remaining_gaps
-            total_api_implemented += self.eliminated_gaps
-            with open(csv_report, mode="a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow([csv_date,
-                                 self.tf_provider_version,
-                                 self.tf_resource_name,
-                                 self.total_fields_number,
-                                 self.gap_fields_number,
-                                 self.eliminated_gaps,
-                                 self.remaining_gaps])
+        header = CSV_HEADER
+        if self.incremental:
+            header = CSV_HEADER + ["Recomputed"]
+        self.report_sink = DiffReportSink(
+            self.log,
+            report_base,
+            stream_format=self.consolidated_report,
+            header=header
+        )
+        rows = []
+        with self.profiler.stage("reports"), self.report_sink:
+            for result in results:
+                if result.error:
+                    raise DiffGlobalReportError(result.error)
+                with self.profiler.stage("write", component=result.component):
+                    if not self.apply_component_result(result,
+                                                       directory=reports_dir):
+                        raise DiffGlobalReportError(
+                            f"Cannot create new diff {result.component}"
+                            " report!"
+                        )
+                total_fields_number += self.total_fields_number
+                total_api_missing += self.remaining_gaps
+                total_api_implemented += self.eliminated_gaps
+                row = [csv_date,
+                       self.tf_provider_version,
+                       self.tf_resource_name,
+                       self.total_fields_number,
+                       self.gap_fields_number,
+                       self.eliminated_gaps,
+                       self.remaining_gaps]
+                if self.incremental:
+                    row.append("yes" if result.component in self.recomputed
+                               else "no")
+                self.report_sink.add_row(row)
+                rows.append(row)
+        if state and not state.save(f"{report_base}{STATE_SUFFIX}"):
+            raise DiffGlobalReportError(
+                "Cannot save the global report state!"
+            )
+
+        if self.history and not self.save_history("global", self.api,
+                                                  reports_dir, results):
+            raise DiffGlobalReportError(
+                "Cannot add the run to the history!"
+            )
+
+        if not profile_slowest_component(self.profiler, jobs, report_base):
+            raise DiffGlobalReportError("Cannot save profile statistics!")
+        if not self.profiler.save(f"{report_base}{PROFILE_SUFFIX}"):
+            raise DiffGlobalReportError("Cannot save timing report!")
 
         total_api_specific_fields = (
             total_fields_number - total_api_missing - total_api_implemented
@@ -164,10 +533,11 @@ class DiffGlobalReport(DiffReport):
                       f"{total_api_specific_fields}")
         self.log.info(f"Total api implemented: {total_api_implemented}")
         self.log.info(f"Total api missing: {total_api_missing}")
+        return rows
 
 
 if __name__ == "__main__":
     dr = DiffGlobalReport()
 
-    dr.generate_global_report()
+    dr.generate_global_reports()
     exit(0)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import os
+import re
+import sqlite3
+
+from diff_config import HISTORY_FORMAT
+
+FIELD_STATUSES = {
+    "api_implemented": "implemented",
+    "api_missing": "missing",
+    "tf_specific": "tf_specific",
+    "excluded": "excluded",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    api TEXT NOT NULL,
+    provider_version TEXT NOT NULL,
+    date TEXT NOT NULL,
+    report_dir TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS runs_api_provider_version
+    ON runs (api, provider_version);
+CREATE TABLE IF NOT EXISTS components (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    component TEXT NOT NULL,
+    tf_resource_name TEXT,
+    total_fields INTEGER NOT NULL,
+    gap_fields INTEGER NOT NULL,
+    eliminated_gaps INTEGER NOT NULL,
+    remaining_gaps INTEGER NOT NULL,
+    PRIMARY KEY (run_id, component)
+);
+CREATE TABLE IF NOT EXISTS fields (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    api TEXT NOT NULL,
+    component TEXT NOT NULL,
+    field TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fields_api_component_field
+    ON fields (api, component, field);
+CREATE INDEX IF NOT EXISTS fields_run_id ON fields (run_id);
+"""
+
+
+def version_key(version):
+    """
+    Returns the sort key of a provider version like `6-10-0` or `6.10.0`.
+    """
+    return tuple(int(part) if part.isdigit() else -1
+                 for part in re.split(r"[-.]", version))
+
+
+class DiffHistoryError(Exception):
+    pass
+
+
+class DiffHistory:
+    """
+    Append-only SQLite store of the report results.
+
+    Every report run is stored with the status of every field of every
+    component, so questions like "when did the field become implemented" or
+    "how did the gaps change over the provider versions" are answered by
+    indexed queries instead of parsing the report directories. Runs are
+    never updated; a run is written in a single transaction, so a failed
+    run leaves no partial data.
+    """
+    def __init__(self, log, path):
+        """
+        Args:
+            log (logging.Logger): Logger of the driver.
+            path (str): Path of the SQLite database.
+
+        Raises:
+            DiffHistoryError: The database cannot be opened or has an
+                              unknown format.
+        """
+        self.log = log
+        self.path = path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+            self.db = sqlite3.connect(path)
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, HISTORY_FORMAT):
+                self.db.close()
+                raise DiffHistoryError(f"Unknown history format {version}"
+                                       f" of {path}")
+            self.db.executescript(SCHEMA)
+            self.db.execute(f"PRAGMA user_version = {HISTORY_FORMAT}")
+        except (OSError, sqlite3.Error) as e:
+            raise DiffHistoryError(f"Cannot open history {path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self.db.close()
+
+    def has_run(self, report_dir):
+        """
+        Checks if the report directory was already added.
+
+        Args:
+            report_dir (str): Path of the report directory.
+
+        Returns:
+            bool: `True` if the run exists, `False` otherwise.
+        """
+        row = self.db.execute(
+            "SELECT 1 FROM runs WHERE report_dir = ?",
+            (os.path.abspath(report_dir),)
+        ).fetchone()
+        return row is not None
+
+    def add_run(self, kind, api, provider_version, date, report_dir,
+                components):
+        """
+        Adds a report run.
+
+        Args:
+            kind (str): Kind of the report (`global`, `aws` or `azure`).
+            api (str): Name of the analyzed API.
+            provider_version (str): Terraform provider version.
+            date (str): Date of the run (`%Y-%m-%d_%H-%M-%S`).
+            report_dir (str): Path of the report directory.
+            components (iterable): `(component, tf_resource_name, report)`
+                                   tuples, where `report` holds the field
+                                   lists keyed by the report category.
+
+        Returns:
+            int: Identifier of the run.
+
+        Raises:
+            DiffHistoryError: The run cannot be added.
+        """
+        try:
+            with self.db:
+                run_id = self.db.execute(
+                    "INSERT INTO runs (kind, api, provider_version, date,"
+                    " report_dir) VALUES (?, ?, ?, ?, ?)",
+                    (kind, api, provider_version, date,
+                     os.path.abspath(report_dir))
+                ).lastrowid
+                for component, tf_resource_name, report in components:
+                    self._add_component(run_id, api, component,
+                                        tf_resource_name, report)
+        except sqlite3.Error as e:
+            raise DiffHistoryError(f"Cannot add run {report_dir}: {e}")
+        self.log.debug(f"Added run {report_dir} to history {self.path}")
+        return run_id
+
+    def _add_component(self, run_id, api, component, tf_resource_name,
+                       report):
+        implemented = len(report.get("api_implemented") or [])
+        missing = len(report.get("api_missing") or [])
+        excluded = len(report.get("excluded") or [])
+        self.db.execute(
+            "INSERT INTO components VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, component, tf_resource_name,
+             implemented + missing + excluded, implemented + missing,
+             implemented, missing)
+        )
+        self.db.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?, ?, ?)",
+            ((run_id, api, component, field, status)
+             for category, status in FIELD_STATUSES.items()
+             for field in report.get(category) or [])
+        )
+
+    def field_history(self, api, field, component=None):
+        """
+        Returns the status of the field in every run.
+
+        Args:
+            api (str): Name of the API.
+            field (str): The field (in dot notation).
+            component (str, optional): Name of the component. Defaults to
+                                       None, in which case all components
+                                       are searched.
+
+        Returns:
+            list: `(date, provider_version, component, status)` tuples
+                  ordered by the date.
+        """
+        where = "f.api = ? AND f.field = ?"
+        params = [api, field]
+        if component:
+            where += " AND f.component = ?"
+            params.append(component)
+        query = ("SELECT r.date, r.provider_version, f.component, f.status"
+                 " FROM fields f JOIN runs r ON r.id = f.run_id"
+                 f" WHERE {where} ORDER BY r.date, f.component")
+        return self.db.execute(query, params).fetchall()
+
+    def first_implemented(self, api, field, component=None):
+        """
+        Returns the runs in which the field became implemented.
+
+        Args:
+            api (str): Name of the API.
+            field (str): The field (in dot notation).
+            component (str, optional): Name of the component.
+
+        Returns:
+            dict: `(date, provider_version)` of the first run with the field
+                  implemented after it was not, keyed by the component.
+        """
+        previous = {}
+        implemented = {}
+        for date, version, name, status in self.field_history(
+            api, field, component
+        ):
+            if (status == "implemented" and name not in implemented
+                    and previous.get(name) != "implemented"):
+                implemented[name] = (date, version)
+            previous[name] = status
+        return implemented
+
+    def gap_trend(self, api, last=30):
+        """
+        Returns the gap totals of the most recent run of each of the last
+        provider versions.
+
+        Args:
+            api (str): Name of the API.
+            last (int, optional): Number of provider versions.
+
+        Returns:
+            list: `(provider_version, date, components, total_fields,
+                  gap_fields, eliminated_gaps, remaining_gaps)` tuples
+                  ordered by the provider version.
+        """
+        rows = self.db.execute(
+            "SELECT r.provider_version, r.date, COUNT(c.component),"
+            " SUM(c.total_fields), SUM(c.gap_fields),"
+            " SUM(c.eliminated_gaps), SUM(c.remaining_gaps)"
+            " FROM runs r JOIN components c ON c.run_id = r.id"
+            " WHERE r.api = ? GROUP BY r.id ORDER BY r.date",
+            (api,)
+        ).fetchall()
+        latest = {}
+        for row in rows:
+            latest[row[0]] = row
+        versions = sorted(latest, key=version_key)[-last:]
+        return [latest[version] for version in versions]
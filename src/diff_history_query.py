@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import argparse
+import json
+import os
+import re
+import yaml
+
+from diff_common import DiffCommon, YamlLoader
+from diff_config import CACHE_DIR, HISTORY_DB_NAME
+from diff_history import DiffHistory, DiffHistoryError
+
+REPORT_DIR_PATTERN = re.compile(
+    r"^(?P<date>\d{4}-\d\d-\d\d_\d\d-\d\d-\d\d)"
+    r"-(?P<kind>global|aws|azure)-reports"
+    r"-(?:(?P<api>.+)-)?v(?P<version>[\d-]+)$"
+)
+COMPONENT_REPORT_PATTERN = re.compile(
+    r"^(?P<component>.+)_(?P<api>[^_]+)_diff_report_"
+    r"\d{4}-\d\d-\d\d_\d\d-\d\d-\d\d-.+\.yaml$"
+)
+
+
+class DiffHistoryQuery(DiffCommon):
+    def __init__(self):
+        description = (
+            "Tool queries the history of the global, AWS and Azure reports."
+        )
+        parser = argparse.ArgumentParser(description=description)
+        parser.add_argument(
+            "--cache_dir",
+            default=CACHE_DIR,
+            help="Directory of the history database"
+        )
+        parser.add_argument(
+            "-v",
+            "--verbose",
+            action="store_true",
+            help="Increase logs verbosity level"
+        )
+        commands = parser.add_subparsers(dest="command", required=True)
+
+        ingest = commands.add_parser(
+            "ingest",
+            help="Add existing report directories to the history"
+        )
+        ingest.add_argument(
+            "report_dirs",
+            nargs="+",
+            help="Report directories (<date>-global-reports-<api>-v<version>)"
+        )
+
+        field = commands.add_parser(
+            "field",
+            help="Show when the field became implemented"
+        )
+        field.add_argument("-a", "--api", required=True,
+                           help="Name of the API (`aws` for AWS reports)")
+        field.add_argument("-c", "--component",
+                           help="Name of the component")
+        field.add_argument("field", help="The field (in dot notation)")
+
+        trend = commands.add_parser(
+            "trend",
+            help="Show the gap trend over the provider versions"
+        )
+        trend.add_argument("-a", "--api", required=True,
+                           help="Name of the API (`aws` for AWS reports)")
+        trend.add_argument("-n", "--last", type=int, default=30,
+                           help="Number of the last provider versions")
+
+        self._cmd_input = parser.parse_args()
+        self.history_path = os.path.join(
+            os.path.abspath(self._cmd_input.cache_dir),
+            HISTORY_DB_NAME
+        )
+        self.verbose = self._cmd_input.verbose
+        self.diff_log(verbose=self.verbose)
+
+    def load_report_dir(self, report_dir):
+        """
+        Loads the component reports of a report directory, either from the
+        YAML file of every component or from the consolidated stream.
+
+        Args:
+            report_dir (str): Path of the report directory.
+
+        Returns:
+            dict: `kind`, `api`, `version`, `date` and `components` (list of
+                  `(component, tf_resource_name, report)` tuples) of the
+                  run or `None` if the directory is not a report directory.
+        """
+        match = REPORT_DIR_PATTERN.match(
+            os.path.basename(os.path.normpath(report_dir))
+        )
+        if not match:
+            self.log.error(f"{report_dir} is not a report directory!")
+            return None
+        run = match.groupdict()
+        if run["kind"] == "aws":
+            run["api"] = "aws"
+
+        components = []
+        for file_name in sorted(os.listdir(report_dir)):
+            path = os.path.join(report_dir, file_name)
+            if file_name.endswith(".jsonl"):
+                with open(path, "r") as f:
+                    documents = [json.loads(line) for line in f
+                                 if line.strip()]
+            elif (file_name.endswith(".yaml")
+                    and not COMPONENT_REPORT_PATTERN.match(file_name)):
+                with open(path, "r") as f:
+                    documents = list(yaml.load_all(f, Loader=YamlLoader))
+            elif file_name.endswith(".yaml"):
+                file_match = COMPONENT_REPORT_PATTERN.match(file_name)
+                with open(path, "r") as f:
+                    report = yaml.load(f, Loader=YamlLoader) or {}
+                report["component"] = file_match.group("component")
+                if not run["api"]:
+                    run["api"] = file_match.group("api")
+                documents = [report]
+            else:
+                continue
+            for report in documents:
+                components.append((report.pop("component"), None, report))
+
+        if not run["api"]:
+            self.log.error(f"Cannot find the API of {report_dir}!")
+            return None
+        run["components"] = components
+        return run
+
+    def ingest(self, history, report_dirs):
+        """
+        Adds the report directories to the history. Directories that are
+        already in the history are skipped.
+        """
+        for report_dir in report_dirs:
+            if history.has_run(report_dir):
+                self.log.info(f"{report_dir} is already in the history")
+                continue
+            run = self.load_report_dir(report_dir)
+            if not run:
+                return False
+            history.add_run(run["kind"], run["api"], run["version"],
+                            run["date"], report_dir, run["components"])
+            self.log.info(f"Added {report_dir} with"
+                          f" {len(run['components'])} components")
+        return True
+
+    def show_field(self, history, api, field, component=None):
+        """
+        Prints the status of the field in every run and the runs in which
+        it became implemented.
+        """
+        rows = history.field_history(api, field, component)
+        if not rows:
+            self.log.info(f"Field {field} not found in the {api} history")
+            return True
+        for date, version, name, status in rows:
+            print(f"{date}  v{version}  {name}  {status}")
+        for name, (date, version) in history.first_implemented(
+            api, field, component
+        ).items():
+            print(f"{name}.{field} implemented since {date} (v{version})")
+        return True
+
+    def show_trend(self, history, api, last):
+        """
+        Prints the gap totals of the last provider versions.
+        """
+        print("Provider Version,Date,Components,Total Fields,Gap Fields,"
+              "Eliminated Gaps,Remaining Gaps")
+        for row in history.gap_trend(api, last):
+            print(",".join(str(value) for value in row))
+        return True
+
+    def run(self):
+        args = self._cmd_input
+        try:
+            with DiffHistory(self.log, self.history_path) as history:
+                if args.command == "ingest":
+                    return self.ingest(history, args.report_dirs)
+                if args.command == "field":
+                    return self.show_field(history, args.api, args.field,
+                                           args.component)
+                return self.show_trend(history, args.api, args.last)
+        except DiffHistoryError as e:
+            self.log.error(f"{e}")
+            return False
+
+
+if __name__ == "__main__":
+    dr = DiffHistoryQuery()
+
+    if not dr.run():
+        exit(1)
+    exit(0)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+
+from diff_common import write_atomic
+from diff_config import INCREMENTAL_STATE_FORMAT, SCHEMA_MAX_REF_DEPTH
+from diff_engine import DiffComponentResult
+
+STATE_SUFFIX = ".inputs.json"
+
+
+def schema_digest(schema):
+    """
+    Computes the digest of a JSON serializable schema.
+
+    Args:
+        schema (object): The schema (e.g. a Terraform resource schema).
+
+    Returns:
+        str: SHA-256 digest of the schema.
+    """
+    content = json.dumps(schema, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def component_input_digest(component, api_digest, tf_digests, config):
+    """
+    Computes the digest of everything the comparison of a component depends
+    on: the API fields of the component, the Terraform schemas of the
+    component and its related resources, and the YAML configuration section
+    of the component. The schemas are given as their digests, so a schema
+    shared by many components is hashed once.
+
+    Args:
+        component (str): Name of the component.
+        api_digest (str): Digest of the API fields of the component.
+        tf_digests (dict): Digests of the Terraform schemas of the component
+                           and its related resources keyed by the Terraform
+                           resource name.
+        config (dict): YAML configuration section of the component or `None`.
+
+    Returns:
+        str: SHA-256 digest of the inputs.
+    """
+    return schema_digest({
+        "format": INCREMENTAL_STATE_FORMAT,
+        "max_depth": SCHEMA_MAX_REF_DEPTH,
+        "component": component,
+        "api": api_digest,
+        "tf": tf_digests,
+        "config": config,
+    })
+
+
+def run_input_digest(api_version, tf_version, config):
+    """
+    Computes the digest of all inputs of a report run from the versions of
+    the whole API and Terraform schemas. Equal digests mean that no input
+    of any component changed, so the component digests need not be
+    computed.
+
+    Args:
+        api_version (tuple): Revision and etag of the discovery document.
+        tf_version (str): Digest of the Terraform lock file the schemas were
+                          loaded for or `None`.
+        config (dict): The YAML configuration.
+
+    Returns:
+        str: SHA-256 digest of the inputs or `None` if a version is not
+             known.
+    """
+    if not api_version or not any(api_version) or not tf_version:
+        return None
+    return schema_digest({
+        "format": INCREMENTAL_STATE_FORMAT,
+        "max_depth": SCHEMA_MAX_REF_DEPTH,
+        "api": api_version,
+        "tf": tf_version,
+        "config": config,
+    })
+
+
+def find_previous_state(pattern):
+    """
+    Returns the most recent state file matching the glob pattern. Report
+    directories start with the date, so the last name is the most recent.
+
+    Args:
+        pattern (str): Glob pattern of the state files.
+
+    Returns:
+        str: Path of the state file or `None` if there is none.
+    """
+    paths = sorted(glob.glob(pattern))
+    return paths[-1] if paths else None
+
+
+class DiffIncrementalState:
+    """
+    Input digests and comparison results of the components of a report.
+
+    The state is saved next to the CSV report as `<report>.inputs.json`.
+    A following run loads it and reuses the results of the components whose
+    input digest did not change.
+    """
+    def __init__(self, log, inputs=None):
+        """
+        Args:
+            log (logging.Logger): Logger of the driver.
+            inputs (str, optional): Digest of all inputs of the run (see
+                                    `run_input_digest`).
+        """
+        self.log = log
+        self.inputs = inputs
+        self.components = {}
+
+    def load(self, path):
+        """
+        Loads the state saved by a previous run.
+
+        Args:
+            path (str): Path of the state file.
+
+        Returns:
+            bool: `True` if the state was loaded, `False` otherwise.
+        """
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.decoder.JSONDecodeError) as e:
+            self.log.warning(f"Cannot load previous report state {path}:"
+                             f" {e}")
+            return False
+        if state.get("format") != INCREMENTAL_STATE_FORMAT:
+            self.log.warning(f"Previous report state {path} has unknown"
+                             " format! Ignoring it.")
+            return False
+        self.inputs = state.get("inputs")
+        self.components = state.get("components", {})
+        return True
+
+    def digest(self, component):
+        """
+        Returns the stored input digest of the component.
+
+        Args:
+            component (str): Name of the component.
+
+        Returns:
+            str: The digest or `None` if the component is not stored.
+        """
+        return self.components.get(component, {}).get("digest")
+
+    def get(self, component, digest):
+        """
+        Returns the stored result of the component if its inputs did not
+        change.
+
+        Args:
+            component (str): Name of the component.
+            digest (str): Input digest of the component in this run.
+
+        Returns:
+            DiffComponentResult: The stored result or `None`.
+        """
+        entry = self.components.get(component)
+        if not entry or entry.get("digest") != digest:
+            return None
+        try:
+            return DiffComponentResult(**entry["result"])
+        except (KeyError, TypeError):
+            return None
+
+    def add(self, digest, result):
+        """
+        Stores the result of the component.
+
+        Args:
+            digest (str): Input digest of the component.
+            result (DiffComponentResult): Result of the comparison.
+        """
+        self.components[result.component] = {
+            "digest": digest,
+            "result": dataclasses.asdict(result),
+        }
+
+    def save(self, path):
+        """
+        Saves the state next to the report.
+
+        Args:
+            path (str): Path of the state file.
+
+        Returns:
+            bool: `True` if the state was saved, `False` otherwise.
+        """
+        state = {
+            "format": INCREMENTAL_STATE_FORMAT,
+            "inputs": self.inputs,
+            "components": self.components,
+        }
+        try:
+            write_atomic(path, json.dumps(state).encode())
+        except OSError as e:
+            self.log.error(f"Cannot save report state {path}: {e}")
+            return False
+        self.log.debug(f"Saved report state {os.path.basename(path)}")
+        return True
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from types import MappingProxyType
+
+
+class DiffMapping:
+    """
+    Compiled `Mapping`, `ExactMapping` and `Exclude` settings of a single
+    component of the YAML configuration.
+
+    `Mapping` translates single segments of dotted Terraform field paths to
+    API names. Translated paths are memoized per prefix, so a path shares the
+    translation of its parent path with all its siblings. That makes the
+    translation of a whole component (and of its related resources sharing
+    the same prefixes) a single pass over the path segments.
+
+    The settings are read-only. Only the memo of translated paths changes,
+    and it is dropped when the object is pickled for a worker process.
+    """
+    __slots__ = ("segments", "exact", "exclude", "_paths")
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict, optional): YAML configuration section of the
+                                     component.
+        """
+        config = config or {}
+        self.segments = MappingProxyType(dict(config.get("Mapping") or {}))
+        self.exact = MappingProxyType(dict(config.get("ExactMapping") or {}))
+        self.exclude = tuple(config.get("Exclude") or ())
+        self._paths = {"": ""}
+
+    def __reduce__(self):
+        return (self.__class__, ({
+            "Mapping": dict(self.segments),
+            "ExactMapping": dict(self.exact),
+            "Exclude": list(self.exclude),
+        },))
+
+    def __bool__(self):
+        return bool(self.segments or self.exact or self.exclude)
+
+    def translate(self, field):
+        """
+        Translates the Terraform field path using the segment mapping.
+
+        Args:
+            field (str): The field (in dot notation) to translate.
+
+        Returns:
+            str: The translated field (or the original field if no segment
+                 is mapped).
+        """
+        if not self.segments:
+            return field
+
+        translated = self._paths.get(field)
+        if translated is not None:
+            return translated
+
+        parent, _, segment = field.rpartition(".")
+        segment = self.segments.get(segment, segment)
+        if parent:
+            translated = f"{self.translate(parent)}.{segment}"
+        else:
+            translated = segment
+        self._paths[field] = translated
+        return translated
+
+    def translate_all(self, fields):
+        """
+        Translates all Terraform field paths of a component.
+
+        Args:
+            fields (iterable): Fields (in dot notation) to translate.
+
+        Returns:
+            list: Translated fields in the order of `fields`.
+        """
+        if not self.segments:
+            return list(fields)
+        return [self.translate(field) for field in fields]
+
+
+def compile_mappings(yaml_config):
+    """
+    Compiles the mapping settings of every component of the YAML
+    configuration.
+
+    Args:
+        yaml_config (dict): Loaded YAML configuration.
+
+    Returns:
+        dict: `DiffMapping` objects keyed by the component name. Components
+              without any mapping settings are omitted.
+    """
+    mappings = {}
+    for component, config in yaml_config.items():
+        if not isinstance(config, dict):
+            continue
+        mapping = DiffMapping(config)
+        if mapping:
+            mappings[component] = mapping
+    return mappings
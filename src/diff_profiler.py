@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import cProfile
+import json
+import os
+import sys
+import time
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from diff_common import write_atomic
+from diff_config import PROFILE_REPORT_FORMAT
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_SUFFIX = "-profile.json"
+PROFILE_STATS_SUFFIX = ".pstats"
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the process and of its terminated
+    child processes (Terraform, worker processes) in KiB.
+
+    Returns:
+        tuple: Peak RSS of the process and of the children or `None` values
+               if the platform does not report them.
+    """
+    if resource is None:
+        return None, None
+    scale = 1024 if sys.platform == "darwin" else 1
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale)
+
+
+@dataclass
+class DiffProfileRecord:
+    """
+    Wall time, CPU time, peak RSS and counts of a single profiled stage.
+    CPU time covers only the measuring process, so it is lower than the
+    wall time of the stages waiting for Terraform or worker processes. The
+    peak RSS is the peak of the process at the end of the stage, so a stage
+    with a higher peak than the previous ones raised it.
+    """
+    name: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss_kib: int = None
+    counts: dict = field(default_factory=dict)
+
+    def count(self, **counts):
+        """
+        Sets the counts (e.g. number of fields or resources) of the stage.
+        """
+        self.counts.update(counts)
+
+
+@contextmanager
+def measure(record):
+    """
+    Measures the wall time, the CPU time and the peak RSS of the block into
+    the record.
+    """
+    wall_time = time.perf_counter()
+    cpu_time = time.process_time()
+    try:
+        yield record
+    finally:
+        record.wall_time = time.perf_counter() - wall_time
+        record.cpu_time = time.process_time() - cpu_time
+        record.peak_rss_kib, _ = peak_rss()
+
+
+class DiffProfiler:
+    """
+    Timing report of a run.
+
+    The run is split into stages (e.g. fetching and dereferencing the API
+    schemas, running Terraform, comparing the components and writing the
+    reports) and the per-component stages (`build`, `compare`, `write`).
+    Nested stages are named by the path of the enclosing stages, like
+    `api_schemas/dereference`. The report is saved as JSON next to the CSV
+    report of the run. A disabled profiler measures nothing, so the stages
+    can be left in place without cost.
+    """
+    def __init__(self, log, enabled=False, stats=False):
+        """
+        Args:
+            log (logging.Logger): Logger of the driver.
+            enabled (bool, optional): Measure the stages.
+            stats (bool, optional): Dump cProfile statistics of the slowest
+                                    component comparison.
+        """
+        self.log = log
+        self.enabled = enabled or stats
+        self.stats = stats
+        self.stages = []
+        self.components = {}
+        self._active = []
+        self._wall_time = time.perf_counter()
+        self._cpu_time = time.process_time()
+
+    @contextmanager
+    def stage(self, name, component=None):
+        """
+        Measures a stage of the run or, if `component` is set, a stage of
+        the component.
+
+        Args:
+            name (str): Name of the stage.
+            component (str, optional): Name of the component.
+
+        Yields:
+            DiffProfileRecord: Record of the stage, to set its counts.
+        """
+        record = DiffProfileRecord(name)
+        if not self.enabled:
+            yield record
+            return
+
+        if component:
+            self.add_component_record(component, record)
+        else:
+            record.name = "/".join(self._active + [name])
+            self.stages.append(record)
+        self._active.append(name)
+        try:
+            with measure(record):
+                yield record
+        finally:
+            self._active.pop()
+
+    def add_component_record(self, component, record):
+        """
+        Adds a stage record of the component measured elsewhere (e.g. in a
+        worker process).
+        """
+        self.components.setdefault(component, {})[record.name] = record
+
+    def hottest_components(self, number=10):
+        """
+        Returns the names of the components with the longest total wall time
+        of their stages.
+        """
+        return sorted(
+            self.components,
+            key=lambda component: -sum(
+                record.wall_time
+                for record in self.components[component].values()
+            )
+        )[:number]
+
+    def report(self):
+        """
+        Returns the timing report of the run as a dictionary.
+        """
+        peak, children_peak = peak_rss()
+        return {
+            "format": PROFILE_REPORT_FORMAT,
+            "wall_time": time.perf_counter() - self._wall_time,
+            "cpu_time": time.process_time() - self._cpu_time,
+            "peak_rss_kib": peak,
+            "children_peak_rss_kib": children_peak,
+            "stages": [asdict(record) for record in self.stages],
+            "hottest_components": self.hottest_components(),
+            "components": {
+                component: {
+                    name: {key: value
+                           for key, value in asdict(record).items()
+                           if key != "name"}
+                    for name, record in records.items()
+                }
+                for component, records in self.components.items()
+            },
+        }
+
+    def save(self, path):
+        """
+        Saves the timing report of the run.
+
+        Args:
+            path (str): Path of the timing report.
+
+        Returns:
+            bool: `True` if the report was saved or the profiler is
+                  disabled, `False` otherwise.
+        """
+        if not self.enabled:
+            return True
+        try:
+            write_atomic(path,
+                         json.dumps(self.report(), indent=2).encode())
+        except OSError as e:
+            self.log.error(f"Cannot save timing report {path}: {e}")
+            return False
+        self.log.info(f"Timing report saved to {path}")
+        return True
+
+    def dump_stats(self, path, function, *args):
+        """
+        Runs the function under cProfile and dumps the statistics, which
+        can be read with `python3 -m pstats <path>`.
+
+        Args:
+            path (str): Path of the statistics file.
+            function (callable): The profiled function.
+            *args: Arguments of the function.
+
+        Returns:
+            bool: `True` if the statistics were dumped or are not requested,
+                  `False` otherwise.
+        """
+        if not self.stats:
+            return True
+        profile = cProfile.Profile()
+        profile.runcall(function, *args)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            self.log.error(f"Cannot save profile statistics {path}: {e}")
+            return False
+        self.log.info(f"Profile statistics saved to {path}")
+        return True
+
+
+@contextmanager
+def profile_stage(owner, name, component=None):
+    """
+    Measures a stage with the profiler of the driver, if it has one. Used by
+    the parser mixins, which also run outside of the report drivers.
+
+    Args:
+        owner (object): The driver.
+        name (str): Name of the stage.
+        component (str, optional): Name of the component.
+
+    Yields:
+        DiffProfileRecord: Record of the stage.
+    """
+    profiler = getattr(owner, "profiler", None)
+    if profiler is None:
+        yield DiffProfileRecord(name)
+        return
+    with profiler.stage(name, component=component) as record:
+        yield record
@@ -5,19 +5,27 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
-import deepdiff
 import os
 import yaml
 
 from datetime import datetime
-from diff_common import DiffCommon, BLUE, BOLD, RED, GREEN, YELLOW, CYAN, ENDC
+from diff_common import DiffCommon, BLUE, BOLD, GREEN, ENDC
+from diff_config import API_URLS
 from diff_api_parser import DiffApiParser
+from diff_engine import (
+    DiffComponentJob,
+    profile_slowest_component,
+    run_component_jobs
+)
+from diff_profiler import PROFILE_SUFFIX, DiffProfiler
+from diff_report_differ import diff_component_report
 from diff_tf_parser import DiffTfParser
 
 
 class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
     def __init__(self):
         parser = self.diff_cmdline()
+        self.diff_discovery_cmdline(parser)
         parser.add_argument(
             "-c",
             "--component",
@@ -34,12 +42,22 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
         )
         self._cmd_input = parser.parse_args()
         self.component = self._cmd_input.component
+        self.cwd = os.getcwd()
         self.tf_config_path = self._cmd_input.terraform_config
         self.api = self._cmd_input.api
+        self.discovery_urls = {**API_URLS,
+                               **dict(self._cmd_input.discovery_url)}
         self.old_yaml_report_path = self._cmd_input.diff_report
         self.save_file = self._cmd_input.save_file
+        self.cache_dir = os.path.abspath(self._cmd_input.cache_dir)
+        self.cache_ttl = self._cmd_input.cache_ttl
+        self.offline = self._cmd_input.offline
+        self.refresh_tf_cache = self._cmd_input.refresh_tf_cache
         self.verbose = self._cmd_input.verbose
         self.diff_log(verbose=self.verbose)
+        self.profiler = DiffProfiler(self.log,
+                                     enabled=self._cmd_input.profile,
+                                     stats=self._cmd_input.profile_stats)
 
     def load_old_diff_report(self):
         """
@@ -58,7 +76,7 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
 
         if not os.path.isabs(self.old_yaml_report_path):
             self.old_yaml_report_path = os.path.join(
-                os.getcwd(),
+                self.cwd,
                 self.old_yaml_report_path
             )
 
@@ -90,58 +108,76 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
             self.log.error("Cannot get old YAML report! Exiting...")
             return False
 
-        diff = deepdiff.DeepDiff(self.yaml_old_report, self.yaml_report)
+        delta = diff_component_report(self.component, self.yaml_old_report,
+                                      self.yaml_report)
+        implemented = delta.entered("api_implemented")
 
-        if diff:
+        if implemented:
             self.log.info(f"{BOLD}{GREEN}API fields implemented from the last "
                           f"report:{ENDC}")
-            for _, value in diff['iterable_item_added'].items():
-                self.log.info(f"{BOLD}{GREEN}{value}{ENDC}")
+            for field in implemented:
+                self.log.info(f"{BOLD}{GREEN}{field}{ENDC}")
         else:
             self.log.info(f"{BOLD}{BLUE}No new fields implemented from the "
                           f"last report.{ENDC}")
+
+        for (old_category, new_category), fields in delta.moved.items():
+            self.log.info(f"Moved from {old_category} to {new_category}:"
+                          f" {len(fields)}")
+        for category, fields in delta.added.items():
+            self.log.info(f"Added to {category}: {len(fields)}")
+        for category, fields in delta.removed.items():
+            self.log.info(f"Removed from {category}: {len(fields)}")
         return True
 
-    def component_diff_report(self, directory=None):
+    def get_tf_resources_for_components(self, components, api):
         """
-        Generates a difference report for a specific component's API and
-        Terraform schemas. The function compares the fields between the two
-        schemas and logs the differences. It identifies implemented, missing,
-        excluded, and specific fields for the API and Terraform, providing
-        a detailed comparison report.
+        Returns the container of the Terraform resources needed to compare
+        the given components, including their related resources.
 
         Args:
-        directory (str, optional): Directory to save the generated diff report.
-            Defaults to None, in which case the report will be saved in
-            a current directory.
+            components (iterable): Names of the API components.
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            DiffTfResourceSelection: The Terraform resources container.
         """
-        if not hasattr(self, 'log'):
-            print("Error: Logger not found!")
-            return False
+        names = []
+        for component in components:
+            names.append(component)
+            try:
+                names.extend(self.yaml_config[component]["RelatedResources"])
+            except KeyError:
+                pass
+        return self.get_tf_resource_selection(names, api)
+
+    def build_component_job(self, tf_component=None):
+        """
+        Collects the API schema, the Terraform schemas and the configuration
+        of the current component into a comparison job.
+
+        Args:
+            tf_component (str, optional): Name used to find the Terraform
+                resources and the configuration of the component. Defaults
+                to None, in which case `self.component` is used.
 
+        Returns:
+            DiffComponentJob: The comparison job or `None` if the schemas
+                              cannot be retrieved.
+        """
         self.log.info(f"Getting {self.component} API Schema")
         if not self.get_api_component_schema(self.component, self.api,
                                              self.save_file):
-            self.log.error(
-                f"Cannot get API {self.component} schema! Exiting..."
-            )
-            os.chdir(self.cwd)
-            exit(1)
-
-        self.log.info(f"Getting {self.component} API Schema fields")
-        if not self.get_api_fields():
-            self.log.error(
-                f"Cannot get API {self.component} schema fields! "
-                "Exiting..."
-            )
-            os.chdir(self.cwd)
-            exit(1)
+            self.log.error(f"Cannot get API {self.component} schema!")
+            return None
 
         self.log.info(f"Getting {self.component} Terraform Schema")
-        related_resources = {self.component: None}
+        if not tf_component:
+            tf_component = self.component
+        related_resources = {tf_component: None}
         try:
             related_resources.update(
-                self.yaml_config[self.component]["RelatedResources"]
+                self.yaml_config[tf_component]["RelatedResources"]
             )
         except KeyError:
             pass
@@ -156,124 +192,72 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
             ):
                 self.log.error("Could not get Terraform "
                                f"schema for {resource}")
-            tf_schemas.update({resource: self.component_tf_schema})
+                continue
+            tf_schemas.update(
+                {resource: (prepend, self.component_tf_schema)}
+            )
             if not prepend:
                 main_component = self.tf_resource_name
 
         if main_component:
             self.tf_resource_name = main_component
         if not tf_schemas:
-            self.log.error(
-                f"Cannot get Terraform {self.component} schema! Exiting..."
+            self.log.error(f"Cannot get Terraform {self.component} schema!")
+            return None
+
+        return DiffComponentJob(
+            component=self.component,
+            tf_resource_name=self.tf_resource_name,
+            api_schema=self.component_api_schema,
+            tf_schemas=tf_schemas,
+            mapping=self.get_component_mapping(tf_component),
+            api_fields=getattr(self, 'api_field_tables', {}).get(
+                self.component
             )
-            os.chdir(self.cwd)
-            exit(1)
+        )
 
-        self.log.info(f"Getting {self.component} Terraform Schema fields")
-        tf_fields = []
-        for resource, schema in tf_schemas.items():
-            self.component_tf_schema = schema
-            if not self.get_tf_fields(prepend=related_resources[resource]):
-                self.log.error(
-                    f"Cannot get Terraform {resource} schema fields! "
-                    "Exiting..."
-                )
-                os.chdir(self.cwd)
-                exit(1)
-            tf_fields = list(set(tf_fields + self.tf_field_list))
-        self.tf_field_list = tf_fields.copy()
-
-        self.log.debug(f"{self.component} Output Only API fields:"
-                       f" {self.api_output_only}")
-        self.log.debug(f"{self.component} API fields: {self.api_field_list}")
-        self.log.debug(f"{self.component} TF fields: {self.tf_field_list}")
-
-        api_implemented = []
-        excluded = []
-        api_missing = self.api_field_list.copy()
-        tf_specific = self.tf_field_list.copy()
-
-        self.log.debug("Substring mapping")
-        for field in self.tf_field_list:
-            mapped_field = self.check_mapping(field)
-            if (mapped_field in self.api_field_list and
-                    mapped_field not in api_implemented):
-                api_implemented.append(mapped_field)
-                api_missing.remove(mapped_field)
-                tf_specific.remove(field)
-
-        self.log.debug("Exact mapping")
-        for field in self.api_field_list:
-            try:
-                mapped_field = (
-                    self.yaml_config[self.component]["ExactMapping"][field]
-                )
-                if mapped_field in api_implemented:
-                    continue
-                if mapped_field in tf_specific:
-                    api_missing.remove(field)
-                    api_implemented.append(field)
-                    tf_specific.remove(mapped_field)
-            except KeyError:
-                pass
+    def component_diff_report(self, directory=None, result=None):
+        """
+        Generates a difference report for a specific component's API and
+        Terraform schemas. The function compares the fields between the two
+        schemas and logs the differences. It identifies implemented, missing,
+        excluded, and specific fields for the API and Terraform, providing
+        a detailed comparison report.
 
-        self.log.debug("Excluding fields specified in config")
-        try:
-            for field in self.yaml_config[self.component]["Exclude"]:
-                if field in api_missing:
-                    api_missing.remove(field)
-                    excluded.append(field)
-        except KeyError:
-            pass
+        Args:
+        directory (str, optional): Directory to save the generated diff report.
+            Defaults to None, in which case the report will be saved in
+            a current directory.
+        result (DiffComponentResult, optional): Already computed comparison
+            result of the component. Defaults to None, in which case the
+            comparison is run for `self.component`.
+        """
+        if not hasattr(self, 'log'):
+            print("Error: Logger not found!")
+            return False
 
-        self.log.debug("Excluding output only API fields")
-        for field in self.api_output_only:
-            if field not in excluded:
-                excluded.append(field)
-
-        self.log.info(f"{BOLD}{GREEN}API fields implemented in the "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in api_implemented:
-            self.log.info(f"{GREEN}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{RED}API fields missing in the "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in api_missing:
-            self.log.info(f"{RED}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{YELLOW}Fields excluded form comparison:{ENDC}")
-        for field in excluded:
-            self.log.info(f"{YELLOW}{field}{ENDC}")
-
-        self.log.info(f"{BOLD}{BLUE}Fields specific for "
-                      f"Terraform {self.component} component{ENDC}")
-        for field in tf_specific:
-            self.log.info(f"{BLUE}{field}{ENDC}")
-
-        self.total_fields_number = (len(api_implemented) + len(api_missing) +
-                                    len(excluded))
-        self.gap_fields_number = len(api_implemented) + len(api_missing)
-        self.eliminated_gaps = len(api_implemented)
-        self.remaining_gaps = len(api_missing)
-
-        self.log.info(f"{BOLD}{BLUE}All fields per {self.component} resource:"
-                      f" {self.total_fields_number}{ENDC}")
-        self.log.info(f"{BOLD}{CYAN}Gap Fields:"
-                      f" {self.gap_fields_number}{ENDC}")
-        self.log.info(f"{BOLD}{GREEN}Eliminated Gaps:"
-                      f" {self.eliminated_gaps}{ENDC}")
-        self.log.info(f"{BOLD}{RED}Remaining Gaps:"
-                      f" {self.remaining_gaps}{ENDC}")
-
-        os.chdir(self.cwd)
-
-        if not self.save_new_report(api_implemented, api_missing, tf_specific,
-                                    excluded, directory=directory):
-            self.log.error(f"Cannot create new diff {self.component} report! "
-                           "Exiting...")
-            os.chdir(self.cwd)
+        if not result:
+            with self.profiler.stage("build", component=self.component):
+                job = self.build_component_job()
+            if not job:
+                self.log.error(f"Cannot compare {self.component}"
+                               " component! Exiting...")
+                exit(1)
+            self.log.info(f"Comparing {self.component} API and Terraform"
+                          " fields")
+            result, = run_component_jobs([job], profiler=self.profiler)
+            self.component_jobs = [job]
+
+        if result.error:
+            self.log.error(f"{result.error} Exiting...")
             exit(1)
 
+        with self.profiler.stage("write", component=result.component):
+            if not self.apply_component_result(result, directory=directory):
+                self.log.error(f"Cannot create new diff {self.component}"
+                               " report! Exiting...")
+                exit(1)
+
         if (not hasattr(self, "old_yaml_report_path")
                 or not self.old_yaml_report_path):
             return
@@ -281,7 +265,6 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
         if not self._check_new_implemented_fields():
             self.log.error("Cannot compare new report with old report! "
                            "Exiting...")
-            os.chdir(self.cwd)
             exit(1)
 
     def generate_diff_report(self):
@@ -301,32 +284,56 @@ class DiffReport(DiffCommon, DiffApiParser, DiffTfParser):
         6. It prints the results of the comparison in a color-coded format.
         7. It saves the newly generated diff report to a YAML file.
         8. If an old YAML report path is provided, it loads the previous diff
-           report and calculates the differences using `deepdiff`.
+           report and calculates the differences per field category.
         """
         self.date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.log.info("Getting YAML config")
-        if not self.load_config_diff_report():
-            self.log.error("Cannot get YAML config! Exiting...")
-            exit(1)
+        with self.profiler.stage("config"):
+            self.log.info("Getting YAML config")
+            if not self.load_config_diff_report():
+                self.log.error("Cannot get YAML config! Exiting...")
+                exit(1)
 
-        self.log.info("Changing directory to terraform config place")
-        if not self.change_to_tf_dir():
-            self.log.error("Cannot change workspace directory! Exiting...")
-            exit(1)
+            self.log.info("Checking terraform config place")
+            if not self.check_tf_dir():
+                self.log.error("Cannot use terraform config directory!"
+                               " Exiting...")
+                exit(1)
 
         self.log.info("Getting API Schemas")
-        if not self.get_api_schemas(self.api):
-            self.log.error("Cannot get API schemas! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
+        with self.profiler.stage("api_schemas"):
+            if not self.get_api_schemas(self.api):
+                self.log.error("Cannot get API schemas! Exiting...")
+                exit(1)
 
         self.log.info("Getting Terraform Schemas")
-        if not self.get_tf_schemas():
-            self.log.error("Cannot get Terraform schemas! Exiting...")
-            os.chdir(self.cwd)
-            exit(1)
+        with self.profiler.stage("tf_schemas"):
+            tf_resources = self.get_tf_resources_for_components(
+                [self.component],
+                self.api
+            )
+            if not self.get_tf_schemas(resources=tf_resources):
+                self.log.error("Cannot get Terraform schemas! Exiting...")
+                exit(1)
+            if not self.build_tf_resource_index(self.api):
+                self.log.error("Cannot index Terraform resources!"
+                               " Exiting...")
+                exit(1)
 
-        self.component_diff_report()
+        with self.profiler.stage("component"):
+            self.component_diff_report()
+
+        profile_base = os.path.join(
+            self.cwd,
+            f"{self.component}_{self.api}_diff_report_{self.date}"
+            f"-{self.tf_provider_version}"
+        )
+        if not profile_slowest_component(self.profiler, self.component_jobs,
+                                         profile_base):
+            self.log.error("Cannot save profile statistics! Exiting...")
+            exit(1)
+        if not self.profiler.save(f"{profile_base}{PROFILE_SUFFIX}"):
+            self.log.error("Cannot save timing report! Exiting...")
+            exit(1)
 
 
 if __name__ == "__main__":
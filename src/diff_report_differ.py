@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class DiffReportDelta:
+    """
+    Differences between the old and the new report of a single component.
+
+    Attributes:
+        component (str): Name of the component.
+        added (dict): Fields that appeared in a category, keyed by the
+                      category.
+        removed (dict): Fields that disappeared from a category, keyed by
+                        the category.
+        moved (dict): Fields that moved between categories (e.g. from
+                      `api_missing` to `api_implemented`), keyed by
+                      `(old_category, new_category)` tuples.
+    """
+    component: str
+    added: dict = field(default_factory=dict)
+    removed: dict = field(default_factory=dict)
+    moved: dict = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved)
+
+    @property
+    def added_count(self):
+        return sum(len(fields) for fields in self.added.values())
+
+    @property
+    def removed_count(self):
+        return sum(len(fields) for fields in self.removed.values())
+
+    @property
+    def moved_count(self):
+        return sum(len(fields) for fields in self.moved.values())
+
+    def entered(self, category):
+        """
+        Returns the fields that are new in the category, either added to the
+        report or moved from another category.
+
+        Args:
+            category (str): Name of the category.
+
+        Returns:
+            list: The fields in the order of the new report.
+        """
+        fields = list(self.added.get(category, []))
+        for (_, new_category), moved in self.moved.items():
+            if new_category == category:
+                fields.extend(moved)
+        return fields
+
+
+def _categories(report):
+    """
+    Returns the report of a component as fields keyed by the category.
+    Reports that are plain field lists have a single `None` category.
+    """
+    if not report:
+        return {}
+    if isinstance(report, dict):
+        return {category: fields or [] for category, fields in report.items()}
+    return {None: report}
+
+
+def diff_component_report(component, old, new):
+    """
+    Compares the old and the new report of a component.
+
+    Every category is compared as a set, so the comparison is linear in the
+    number of fields. The order of the fields does not matter.
+
+    Args:
+        component (str): Name of the component.
+        old (dict or list): Old report of the component. Either fields keyed
+                            by the category or a single field list.
+        new (dict or list): New report of the component.
+
+    Returns:
+        DiffReportDelta: The differences.
+    """
+    old = _categories(old)
+    new = _categories(new)
+    delta = DiffReportDelta(component)
+
+    leaving = {}
+    for category, fields in old.items():
+        new_fields = set(new.get(category, ()))
+        for old_field in fields:
+            if old_field not in new_fields:
+                leaving.setdefault(old_field, category)
+
+    for category, fields in new.items():
+        old_fields = set(old.get(category, ()))
+        for new_field in fields:
+            if new_field in old_fields:
+                continue
+            old_category = leaving.pop(new_field, None)
+            if old_category is None:
+                delta.added.setdefault(category, []).append(new_field)
+            else:
+                delta.moved.setdefault(
+                    (old_category, category), []
+                ).append(new_field)
+
+    for old_field, category in leaving.items():
+        delta.removed.setdefault(category, []).append(old_field)
+    return delta
+
+
+def diff_reports(old, new):
+    """
+    Compares the old and the new multi-component report.
+
+    Args:
+        old (dict): Old reports keyed by the component name.
+        new (dict): New reports keyed by the component name.
+
+    Returns:
+        dict: `DiffReportDelta` objects of the changed components, keyed by
+              the component name, in the order of the new report followed
+              by the components removed from it.
+    """
+    old = old or {}
+    new = new or {}
+    deltas = {}
+    for component in list(new) + [c for c in old if c not in new]:
+        old_report = old.get(component)
+        new_report = new.get(component)
+        if old_report == new_report:
+            continue
+        delta = diff_component_report(component, old_report, new_report)
+        if delta:
+            deltas[component] = delta
+    return deltas
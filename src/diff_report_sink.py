@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import csv
+import json
+import os
+import yaml
+
+from diff_common import YamlDumper, create_temp_file
+
+CSV_HEADER = ["Date", "Provider Version", "Resource Name", "Total Fields",
+              "Gap Fields", "Eliminated Gaps", "Remaining Gaps"]
+STREAM_FORMATS = ("jsonl", "yaml")
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class DiffReportSink:
+    """
+    Writer of the reports of a single run.
+
+    The summary CSV file and the optional consolidated stream of the
+    component reports are opened once, written through large buffers and
+    renamed into place when the sink is closed, so readers never see
+    partially written files. If a consolidated stream is requested, the
+    component reports are written only to the stream (see
+    `DiffCommon.save_new_report`) and the number of opened files does not
+    depend on the number of components.
+    """
+    def __init__(self, log, base_path, stream_format=None,
+                 header=CSV_HEADER):
+        """
+        Args:
+            log (logging.Logger): Logger of the driver.
+            base_path (str): Path of the summary files without the extension.
+            stream_format (str, optional): Format of the consolidated stream
+                                           of the component reports, `jsonl`
+                                           or `yaml`. Defaults to None, in
+                                           which case every component report
+                                           is saved in a separate YAML file.
+            header (list, optional): Columns of the summary CSV file.
+        """
+        if stream_format and stream_format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown report stream format {stream_format}")
+        self.log = log
+        self.csv_path = f"{base_path}.csv"
+        self.stream_format = stream_format
+        self.stream_path = (f"{base_path}.{stream_format}"
+                            if stream_format else None)
+        self._files = []
+        self._csv_file = self._open(self.csv_path)
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(header)
+        self._stream_file = (self._open(self.stream_path)
+                             if stream_format else None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(commit=exc_type is None)
+        return False
+
+    def _open(self, path):
+        """
+        Opens a buffered temporary file next to the path.
+
+        Args:
+            path (str): Destination path of the file.
+
+        Returns:
+            file: The opened temporary file.
+        """
+        fd, tmp_path = create_temp_file(path)
+        f = os.fdopen(fd, "w", newline="", buffering=WRITE_BUFFER_SIZE)
+        self._files.append((f, tmp_path, path))
+        return f
+
+    def add_row(self, row):
+        """
+        Adds a row to the summary CSV file.
+
+        Args:
+            row (list): Values of the header columns.
+        """
+        self._csv_writer.writerow(row)
+
+    def add_report(self, component, report):
+        """
+        Adds the component report to the consolidated stream.
+
+        Args:
+            component (str): Name of the component.
+            report (dict): The component report.
+        """
+        document = {"component": component}
+        document.update(report)
+        if self.stream_format == "jsonl":
+            self._stream_file.write(json.dumps(document) + "\n")
+        else:
+            self._stream_file.write("---\n")
+            self._stream_file.write(yaml.dump(document, Dumper=YamlDumper))
+
+    def close(self, commit=True):
+        """
+        Closes the files of the sink.
+
+        Args:
+            commit (bool, optional): If `True`, the files are renamed into
+                                     place. Otherwise they are removed.
+        """
+        for f, tmp_path, path in self._files:
+            f.close()
+            if commit:
+                os.replace(tmp_path, path)
+                self.log.debug(f"Saved {path}")
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._files = []
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import jsonref
+
+from diff_config import SCHEMA_MAX_REF_DEPTH
+from urllib.parse import unquote
+
+
+class DiffSchemaResolverError(Exception):
+    """
+    Raised when a `$ref` cannot be resolved.
+    """
+
+
+class DiffLazyRef(dict):
+    """
+    Reference to a schema of another document, loaded on first access.
+
+    Unlike the `jsonref` proxies, the reference can be pickled without
+    loading it, so schemas containing it can be sent to worker processes.
+    """
+    def __init__(self, ref, loader=None):
+        """
+        Args:
+            ref (str): The reference.
+            loader (callable, optional): Function loading the referenced
+                                         document. Defaults to
+                                         `jsonref.jsonloader`.
+        """
+        super().__init__()
+        self.ref = ref
+        self.loader = loader
+        self.loaded = False
+
+    def _load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        target = jsonref.JsonRef(
+            {"$ref": self.ref},
+            loader=self.loader or jsonref.jsonloader,
+            jsonschema=True
+        ).__subject__
+        if isinstance(target, dict):
+            dict.update(self, target)
+
+    def __reduce__(self):
+        return (self.__class__, (self.ref,))
+
+    def __repr__(self):
+        if not self.loaded:
+            return f"DiffLazyRef({self.ref!r})"
+        return super().__repr__()
+
+    def __getitem__(self, key):
+        self._load()
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self._load()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._load()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def get(self, key, default=None):
+        self._load()
+        return super().get(key, default)
+
+    def keys(self):
+        self._load()
+        return super().keys()
+
+    def items(self):
+        self._load()
+        return super().items()
+
+    def values(self):
+        self._load()
+        return super().values()
+
+
+class DiffSchemaResolver:
+    """
+    Inlines `$ref` references of JSON schemas into plain dictionaries.
+
+    A reference is replaced by the referenced schema, like `jsonref` does.
+    Every reference target is resolved only once: fully expanded schemas are
+    shared between all places that reference them. References that close
+    a cycle or exceed `max_depth` nested references are replaced with a leaf
+    schema that keeps only the `$ref`, `type` and `description` keys, so the
+    result never contains cycles.
+    """
+    def __init__(self, lookup, max_depth=SCHEMA_MAX_REF_DEPTH, external=None):
+        """
+        Args:
+            lookup (callable): Function returning the schema referenced by
+                               the given `$ref` string. It raises `KeyError`
+                               for unknown references.
+            max_depth (int, optional): Maximal number of nested references
+                                       that are inlined.
+            external (callable, optional): Function returning the value that
+                                           replaces references unknown to
+                                           `lookup`, e.g. a lazy reference
+                                           to another document. The value
+                                           is not resolved further. If not
+                                           set, unknown references are
+                                           errors.
+        """
+        self.lookup = lookup
+        self.max_depth = max_depth
+        self.external = external
+        self._resolved = {}
+        self._partial = {}
+
+    def resolve(self, schema):
+        """
+        Returns a copy of the schema with all references inlined.
+
+        Args:
+            schema (dict): Schema to resolve.
+
+        Returns:
+            dict: Resolved schema.
+
+        Raises:
+            DiffSchemaResolverError: A reference cannot be resolved.
+        """
+        self._partial = {}
+        resolved, _ = self._resolve(schema, ())
+        return resolved
+
+    def resolve_ref(self, ref):
+        """
+        Returns the schema referenced by `ref` with all references inlined.
+        The reference itself counts as the first level of the cycle
+        detection, so self-references are cut at the top-level schema.
+
+        Args:
+            ref (str): Reference of the schema to resolve.
+
+        Returns:
+            dict: Resolved schema.
+
+        Raises:
+            DiffSchemaResolverError: A reference cannot be resolved.
+        """
+        self._partial = {}
+        resolved, _ = self._resolve_ref(ref, ())
+        return resolved
+
+    def _resolve(self, node, stack):
+        """
+        Recursively resolves the node.
+
+        Args:
+            node: Schema node to resolve.
+            stack (tuple): References that are being resolved on the path
+                           to the node.
+
+        Returns:
+            tuple: The resolved node and a flag telling if the node was
+                   fully expanded (no reference was cut).
+        """
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                return self._resolve_ref(ref, stack)
+            resolved = {}
+            complete = True
+            for key, value in node.items():
+                resolved[key], value_complete = self._resolve(value, stack)
+                complete = complete and value_complete
+            return resolved, complete
+
+        if isinstance(node, list):
+            resolved = []
+            complete = True
+            for item in node:
+                resolved_item, item_complete = self._resolve(item, stack)
+                resolved.append(resolved_item)
+                complete = complete and item_complete
+            return resolved, complete
+
+        return node, True
+
+    def _resolve_ref(self, ref, stack):
+        """
+        Resolves a single reference.
+
+        Fully expanded targets are memoized for the lifetime of the resolver.
+        Targets containing cut references depend on the path they were
+        reached from, so they are memoized only until the next `resolve`
+        call.
+
+        Args:
+            ref (str): Reference to resolve.
+            stack (tuple): References that are being resolved on the path
+                           to the reference.
+
+        Returns:
+            tuple: The resolved target and the completeness flag.
+        """
+        if ref in self._resolved:
+            return self._resolved[ref], True
+        if ref in self._partial:
+            return self._partial[ref], False
+
+        try:
+            target = self.lookup(ref)
+        except KeyError:
+            if self.external is None:
+                raise DiffSchemaResolverError(
+                    f"Cannot resolve reference {ref}"
+                )
+            resolved = self.external(ref)
+            self._resolved[ref] = resolved
+            return resolved, True
+
+        if ref in stack or len(stack) >= self.max_depth:
+            leaf = {"$ref": ref}
+            if isinstance(target, dict):
+                for key in ("type", "description"):
+                    if key in target:
+                        leaf[key] = target[key]
+            return leaf, False
+
+        resolved, complete = self._resolve(target, stack + (ref,))
+        if complete:
+            self._resolved[ref] = resolved
+        else:
+            self._partial[ref] = resolved
+        return resolved, complete
+
+
+def discovery_lookup(discovery_doc):
+    """
+    Creates a lookup function for references of a Google API discovery
+    document. Discovery documents reference schemas by their `id`.
+
+    Args:
+        discovery_doc (dict): Discovery document.
+
+    Returns:
+        callable: Function returning the schema for the given reference.
+    """
+    schemas = discovery_doc.get("schemas", {})
+    schemas_by_id = dict(schemas)
+    for schema in schemas.values():
+        if isinstance(schema, dict) and "id" in schema:
+            schemas_by_id.setdefault(schema["id"], schema)
+    return schemas_by_id.__getitem__
+
+
+def json_pointer_lookup(document, base_uris=()):
+    """
+    Creates a lookup function for local JSON pointer references
+    (`#/definitions/...`) of a JSON schema document.
+
+    Args:
+        document (dict): JSON schema document.
+        base_uris (iterable, optional): URIs of the document. References
+                                        to these URIs are local as well.
+
+    Returns:
+        callable: Function returning the schema for the given reference.
+                  It raises `KeyError` for references to other documents
+                  and for pointers that do not exist.
+    """
+    base_uris = {uri.rstrip("#") for uri in base_uris if uri}
+
+    def lookup(ref):
+        uri, _, fragment = ref.partition("#")
+        if uri and uri not in base_uris:
+            raise KeyError(ref)
+
+        target = document
+        for token in unquote(fragment).split("/")[1:]:
+            token = token.replace("~1", "/").replace("~0", "~")
+            if isinstance(target, list):
+                try:
+                    target = target[int(token)]
+                except (ValueError, IndexError):
+                    raise KeyError(ref)
+            elif isinstance(target, dict):
+                target = target[token]
+            else:
+                raise KeyError(ref)
+        return target
+
+    return lookup
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import asyncio
+import json
+import os
+import signal
+import stat
+import time
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from diff_config import (
+    API_URLS,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_RELOAD_INTERVAL,
+    TF_RESOURCES,
+    YAML_CONFIG_PATH
+)
+from diff_engine import compare_component, run_component_jobs
+from diff_field_path import FIELD_PATHS
+from diff_global_report import DiffGlobalReport
+from diff_profiler import DiffProfiler
+from diff_tf_index import DiffTfPrefixSelection, strip_api_prefix
+
+SERVICE_MAX_REQUEST_LINE = 8192
+
+
+class DiffServiceError(Exception):
+    """
+    Error of a service query, answered with the HTTP status.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class DiffServiceApiState:
+    """
+    Parsed schemas and memoized comparison results of an API kept in memory
+    by the service.
+
+    Attributes:
+        api (str): Name of the API.
+        api_schemas (dict): Dereferenced API schemas keyed by the component.
+        api_field_tables (dict): Field tables of the API schemas.
+        tf_resource_index (DiffTfResourceIndex): Index of the Terraform
+                                                 resources of the API.
+        loaded (float): Monotonic time of loading the API schemas.
+        discovery_digest (str): Digest of the cached discovery document the
+                                schemas were loaded from or `None`.
+        matching (dict): Terraform resources of the matched components, set
+                         by the first global query.
+        results (dict): `DiffComponentResult` objects keyed by the
+                        component.
+    """
+    api: str
+    api_schemas: dict
+    api_field_tables: dict
+    tf_resource_index: object
+    loaded: float
+    discovery_digest: str = None
+    matching: dict = None
+    results: dict = field(default_factory=dict)
+
+
+class DiffService(DiffGlobalReport):
+    """
+    Long-running service answering component and global report queries over
+    HTTP.
+
+    The configuration, the Terraform schemas of all Google APIs and the
+    schemas of the queried APIs are loaded once and kept in memory, so a
+    query compares only the components whose results are not known yet.
+    All driver state is accessed by a single worker thread; the asyncio loop
+    only parses the requests and waits for the worker. Changes of
+    `config.yaml`, of `.terraform.lock.hcl` and of the discovery documents
+    cache are checked periodically and the affected state is reloaded.
+    """
+    def __init__(self):
+        parser = self.diff_cmdline(multi_api=True)
+        self.diff_discovery_cmdline(parser)
+        parser.add_argument(
+            "--host",
+            default=SERVICE_HOST,
+            help="Address the service listens on"
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=SERVICE_PORT,
+            help="Port the service listens on"
+        )
+        parser.add_argument(
+            "--socket",
+            help="Listen on the Unix socket instead of the TCP port"
+        )
+        parser.add_argument(
+            "--reload_interval",
+            type=float,
+            default=SERVICE_RELOAD_INTERVAL,
+            help="Seconds between the checks of the changed files"
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of worker processes comparing components"
+        )
+        self._cmd_input = parser.parse_args()
+        self.cwd = os.getcwd()
+        self.tf_config_path = self._cmd_input.terraform_config
+        self.apis = (list(TF_RESOURCES) if "all" in self._cmd_input.api
+                     else list(dict.fromkeys(self._cmd_input.api)))
+        self.api = self.apis[0]
+        self.discovery_urls = {**API_URLS,
+                               **dict(self._cmd_input.discovery_url)}
+        self.save_file = self._cmd_input.save_file
+        self.cache_dir = os.path.abspath(self._cmd_input.cache_dir)
+        self.cache_ttl = self._cmd_input.cache_ttl
+        self.offline = self._cmd_input.offline
+        self.refresh_tf_cache = self._cmd_input.refresh_tf_cache
+        self.jobs = self._cmd_input.jobs
+        self.host = self._cmd_input.host
+        self.port = self._cmd_input.port
+        self.socket = self._cmd_input.socket
+        self.reload_interval = self._cmd_input.reload_interval
+        self.shared_tf_schemas = False
+        self.api_states = {}
+        self.mtimes = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.verbose = self._cmd_input.verbose
+        self.diff_log(verbose=self.verbose)
+        self.profiler = DiffProfiler(self.log,
+                                     enabled=self._cmd_input.profile)
+
+    def _watched_paths(self):
+        """
+        Returns the files whose changes are reloaded by the service.
+        """
+        config_path = YAML_CONFIG_PATH
+        if not os.path.isabs(config_path):
+            config_path = os.path.join(self.cwd, config_path)
+        return {
+            "config": config_path,
+            "terraform": os.path.join(self.tf_config_path,
+                                      ".terraform.lock.hcl"),
+            "discovery": os.path.join(self.cache_dir, "discovery",
+                                      "index.json"),
+        }
+
+    def _mtime(self, name):
+        try:
+            return os.stat(self._watched_paths()[name]).st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch(self, names=None):
+        """
+        Records the modification times of the watched files.
+
+        Args:
+            names (iterable, optional): Names of the recorded files. Defaults
+                                        to None, in which case all watched
+                                        files are recorded.
+        """
+        for name in names or self._watched_paths():
+            self.mtimes[name] = self._mtime(name)
+
+    def load_config(self):
+        """
+        Loads the YAML configuration. The previous configuration is kept if
+        the new one cannot be loaded.
+
+        Returns:
+            bool: True if the configuration was loaded, False otherwise.
+        """
+        previous = (getattr(self, "yaml_config", None),
+                    getattr(self, "component_mappings", None))
+        try:
+            if self.load_config_diff_report():
+                return True
+        except (OSError, yaml.YAMLError) as e:
+            self.log.error(f"Cannot load YAML config: {e}")
+        self.yaml_config, self.component_mappings = previous
+        return False
+
+    def load_tf_schemas(self):
+        """
+        Loads the Terraform schemas of the resources of all Google APIs.
+
+        The previous schemas are kept if the new ones cannot be loaded.
+
+        Returns:
+            bool: True if the schemas were loaded, False otherwise.
+        """
+        attributes = ("terraform_versions", "terraform_schemas",
+                      "tf_resource_names", "tf_schemas_digest")
+        previous = {name: getattr(self, name, None) for name in attributes}
+        with self.profiler.stage("tf_schemas"):
+            if not self.get_tf_schemas(resources=DiffTfPrefixSelection(
+                TF_RESOURCES.values()
+            )):
+                # The versions are read before the schemas, so a failure
+                # may leave the new versions with the previous schemas.
+                for name, value in previous.items():
+                    setattr(self, name, value)
+                return False
+        self.shared_tf_schemas = True
+        return True
+
+    def load_api(self, api, discovery_doc=None):
+        """
+        Loads the schemas of the API and indexes its Terraform resources.
+
+        Args:
+            api (str): Name of the API.
+            discovery_doc (dict, optional): Already downloaded discovery
+                                            document of the API.
+
+        Returns:
+            DiffServiceApiState: State of the API.
+
+        Raises:
+            DiffServiceError: If the schemas of the API cannot be loaded.
+        """
+        self.log.info(f"Loading {api} API schemas")
+        discovery_mtime = self._mtime("discovery")
+        with self.profiler.stage(f"api_schemas/{api}"):
+            if not self.get_api_schemas(api, discovery_doc=discovery_doc):
+                raise DiffServiceError(HTTPStatus.BAD_GATEWAY,
+                                       f"Cannot get {api} API schemas!")
+        if not self.build_tf_resource_index(api):
+            raise DiffServiceError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                   f"Cannot index {api} Terraform resources!")
+        state = DiffServiceApiState(
+            api,
+            self.api_schemas,
+            self.api_field_tables,
+            self.tf_resource_index,
+            time.monotonic(),
+            self.get_discovery_cache().index.get(api, {}).get("digest")
+        )
+        self.api_states[api] = state
+        # Loading the API may update the discovery documents cache, which
+        # must not be reloaded as an external change. A change made before
+        # the API was loaded is left to `reload_changed`, as are the changes
+        # of the other watched files.
+        if discovery_mtime == self.mtimes.get("discovery"):
+            self._watch(names=("discovery",))
+        return state
+
+    def use_api(self, api):
+        """
+        Sets the driver state to the API, loading it if needed.
+
+        Args:
+            api (str): Name of the API.
+
+        Returns:
+            DiffServiceApiState: State of the API.
+
+        Raises:
+            DiffServiceError: If the API is unknown or cannot be loaded.
+        """
+        if api not in TF_RESOURCES or api not in self.discovery_urls:
+            raise DiffServiceError(HTTPStatus.NOT_FOUND,
+                                   f"Unknown API {api}!")
+        state = self.api_states.get(api) or self.load_api(api)
+        self.api = api
+        self.api_schemas = state.api_schemas
+        self.api_field_tables = state.api_field_tables
+        self.tf_resource_index = state.tf_resource_index
+        if not self.get_tf_provider_version(api):
+            raise DiffServiceError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                   f"Provider version of {api} not known!")
+        return state
+
+    def start(self):
+        """
+        Loads the configuration, the Terraform schemas and the schemas of
+        the requested APIs before the service starts listening.
+
+        Returns:
+            bool: True if the state was loaded, False otherwise.
+        """
+        # The files are recorded before they are loaded, so a change made
+        # while the service starts is reloaded by `reload_changed`.
+        self._watch()
+        self.log.info("Getting YAML config")
+        if not self.load_config():
+            return False
+        self.log.info("Checking terraform config place")
+        if not self.check_tf_dir():
+            return False
+        self.log.info("Getting Terraform schemas")
+        if not self.load_tf_schemas():
+            return False
+
+        self.log.info(f"Getting discovery docs of {len(self.apis)} APIs")
+        for api, discovery_doc in self.get_discovery_cache(
+        ).get_discovery_docs(
+            {api: self.discovery_urls[api] for api in self.apis}
+        ):
+            if discovery_doc is None:
+                self.log.error(f"Cannot get {api} discovery doc!")
+                return False
+            try:
+                self.load_api(api, discovery_doc=discovery_doc)
+            except DiffServiceError as e:
+                self.log.error(f"{e}")
+                return False
+        # The discovery documents were just fetched into the cache.
+        self._watch(names=("discovery",))
+        return True
+
+    def reload_changed(self):
+        """
+        Reloads the state affected by the files changed since the last
+        check. API schemas are dropped if their cached discovery document
+        changed or if they were loaded earlier than the discovery cache TTL,
+        so the next query revalidates the discovery document. The field
+        paths are interned again once API schemas are dropped.
+        """
+        loaded = set(self.api_states)
+        previous = dict(self.mtimes)
+        self._watch()
+        changed = {name for name, mtime in self.mtimes.items()
+                   if previous.get(name) != mtime}
+
+        if "config" in changed:
+            self.log.info("YAML config changed, reloading")
+            if self.load_config():
+                for state in self.api_states.values():
+                    state.matching = None
+                    state.results.clear()
+
+        if "terraform" in changed:
+            self.log.info("Terraform lock file changed, reloading Terraform"
+                          " schemas")
+            if self.load_tf_schemas():
+                self.api_states.clear()
+            else:
+                self.log.error("Cannot reload Terraform schemas! Serving the"
+                               " previous schemas.")
+                # The reload is retried on the next check.
+                self.mtimes["terraform"] = previous.get("terraform")
+
+        if "discovery" in changed:
+            # The index is also rewritten when a cached document is only
+            # used or revalidated, so only the APIs whose document changed
+            # are reloaded.
+            if hasattr(self, "discovery_cache"):
+                del self.discovery_cache
+            index = self.get_discovery_cache().index
+            for api, state in list(self.api_states.items()):
+                if index.get(api, {}).get("digest") != state.discovery_digest:
+                    self.log.info(f"{api} discovery doc changed, reloading")
+                    del self.api_states[api]
+
+        now = time.monotonic()
+        for api, state in list(self.api_states.items()):
+            if now - state.loaded > self.cache_ttl:
+                self.log.info(f"{api} API schemas expired")
+                del self.api_states[api]
+
+        if loaded - self.api_states.keys():
+            # The table would otherwise keep the paths of every schema
+            # revision loaded since the start.
+            FIELD_PATHS.clear()
+
+    def _component_result(self, state, component):
+        """
+        Returns the memoized comparison result of the component of the
+        current API, comparing the component if needed.
+        """
+        result = state.results.get(component)
+        if result:
+            return result
+        if component not in self.api_schemas:
+            raise DiffServiceError(HTTPStatus.NOT_FOUND,
+                                   f"Unknown {self.api} component"
+                                   f" {component}!")
+        self.component = component
+        job = self.build_component_job(tf_component=strip_api_prefix(
+            component
+        ))
+        if not job:
+            raise DiffServiceError(HTTPStatus.NOT_FOUND,
+                                   f"Cannot compare {component} component!")
+        result = compare_component(job)
+        if result.error:
+            raise DiffServiceError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                   result.error)
+        state.results[component] = result
+        return result
+
+    def _match(self, state):
+        """
+        Returns the Terraform resources of the matched components of the
+        current API.
+        """
+        if state.matching is None:
+            state.matching, _ = self.match_tf_resources(
+                component for component in self.api_schemas
+                if component != "KeyRing"
+            )
+        return state.matching
+
+    def _summary(self, result):
+        return {
+            "component": result.component,
+            "tf_resource_name": result.tf_resource_name,
+            "total_fields": result.total_fields_number,
+            "gap_fields": result.gap_fields_number,
+            "eliminated_gaps": result.eliminated_gaps,
+            "remaining_gaps": result.remaining_gaps,
+        }
+
+    def component_report(self, api, component=None, resource=None):
+        """
+        Returns the report of a component, found by its name or by the name
+        of its main Terraform resource.
+
+        Args:
+            api (str): Name of the API.
+            component (str, optional): Name of the API component.
+            resource (str, optional): Name of the Terraform resource.
+
+        Returns:
+            dict: The component report with its field lists.
+        """
+        state = self.use_api(api)
+        if not component:
+            component = next(
+                (name for name, resources in self._match(state).items()
+                 if resources[0] == resource),
+                None
+            )
+            if not component:
+                raise DiffServiceError(HTTPStatus.NOT_FOUND,
+                                       f"No {api} component matches"
+                                       f" {resource}!")
+        result = self._component_result(state, component)
+        report = {"api": api, "provider_version": self.tf_provider_version}
+        report.update(self._summary(result))
+        report.update(
+            api_implemented=result.api_implemented,
+            api_missing=result.api_missing,
+            tf_specific=result.tf_specific,
+            excluded=result.excluded
+        )
+        return report
+
+    def global_report(self, api):
+        """
+        Returns the summary of all components of the API matching Terraform
+        resources.
+
+        Args:
+            api (str): Name of the API.
+
+        Returns:
+            dict: Per-component summaries and their totals.
+        """
+        state = self.use_api(api)
+        matching = self._match(state)
+        jobs = []
+        for component in matching:
+            if component in state.results:
+                continue
+            self.component = component
+            job = self.build_component_job(
+                tf_component=strip_api_prefix(component)
+            )
+            if not job:
+                raise DiffServiceError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       f"Cannot compare {component}"
+                                       " component!")
+            jobs.append(job)
+        for result in run_component_jobs(jobs, max_workers=self.jobs):
+            if result.error:
+                raise DiffServiceError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       result.error)
+            state.results[result.component] = result
+
+        components = [self._summary(state.results[component])
+                      for component in matching]
+        return {
+            "api": api,
+            "provider_version": self.tf_provider_version,
+            "components": components,
+            "totals": {
+                key: sum(summary[key] for summary in components)
+                for key in ("total_fields", "gap_fields", "eliminated_gaps",
+                            "remaining_gaps")
+            },
+        }
+
+    def status(self):
+        """
+        Returns the loaded APIs and, with `--profile`, the timing report of
+        the loads.
+        """
+        status = {
+            "apis": {
+                api: {"components": len(state.api_schemas),
+                      "compared": len(state.results)}
+                for api, state in self.api_states.items()
+            },
+        }
+        if self.profiler.enabled:
+            status["profile"] = self.profiler.report()
+        return status
+
+    def query(self, method, target):
+        """
+        Answers a request. Runs in the worker thread.
+
+        Args:
+            method (str): HTTP method of the request.
+            target (str): Path and query string of the request.
+
+        Returns:
+            tuple: HTTP status and the JSON document of the response.
+        """
+        url = urlsplit(target)
+        params = {key: values[-1]
+                  for key, values in parse_qs(url.query).items()}
+        routes = {
+            ("GET", "/status"): self.status,
+            ("GET", "/component"): lambda: self.component_report(
+                params.get("api", self.apis[0]),
+                component=params.get("component"),
+                resource=params.get("resource")
+            ),
+            ("GET", "/global"): lambda: self.global_report(
+                params.get("api", self.apis[0])
+            ),
+            ("POST", "/reload"): lambda: (self.reload_changed()
+                                          or self.status()),
+        }
+        route = routes.get((method, url.path))
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown {url.path}"}
+        if (url.path == "/component" and not params.get("component")
+                and not params.get("resource")):
+            return (HTTPStatus.BAD_REQUEST,
+                    {"error": "component or resource not set"})
+        try:
+            return HTTPStatus.OK, route()
+        except DiffServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            self.log.exception(f"{method} {target} failed")
+            return (HTTPStatus.INTERNAL_SERVER_ERROR,
+                    {"error": f"Internal error: {e}"})
+
+    async def handle(self, reader, writer):
+        """
+        Handles a single HTTP/1.1 request of the connection.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            request_line = await reader.readline()
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            try:
+                if len(request_line) > SERVICE_MAX_REQUEST_LINE:
+                    raise ValueError
+                method, target, _ = request_line.decode(
+                    "latin-1"
+                ).split(" ", 2)
+            except ValueError:
+                status, document = (HTTPStatus.BAD_REQUEST,
+                                    {"error": "Bad request"})
+            else:
+                started = time.perf_counter()
+                status, document = await loop.run_in_executor(
+                    self.executor, self.query, method, target
+                )
+                self.log.info(f"{method} {target} {status.value}"
+                              f" {(time.perf_counter() - started) * 1000:.1f}"
+                              " ms")
+            body = json.dumps(document).encode()
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch(self):
+        """
+        Checks the watched files every `reload_interval` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await loop.run_in_executor(self.executor, self.reload_changed)
+
+    def _remove_socket(self):
+        """
+        Removes the Unix socket left by a previous service. Other files are
+        never removed.
+        """
+        try:
+            if stat.S_ISSOCK(os.stat(self.socket).st_mode):
+                os.remove(self.socket)
+        except FileNotFoundError:
+            pass
+
+    async def serve(self):
+        """
+        Serves the queries until the process is interrupted or terminated.
+        """
+        if self.socket:
+            self._remove_socket()
+            server = await asyncio.start_unix_server(self.handle,
+                                                     path=self.socket)
+            self.log.info(f"Listening on {self.socket}")
+        else:
+            server = await asyncio.start_server(self.handle, self.host,
+                                                self.port)
+            self.log.info(f"Listening on {self.host}:{self.port}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        watcher = asyncio.create_task(self.watch())
+        async with server:
+            await stop.wait()
+        watcher.cancel()
+        self.executor.shutdown(wait=True)
+        if self.socket:
+            self._remove_socket()
+        self.log.info("Service stopped")
+
+
+if __name__ == "__main__":
+    ds = DiffService()
+
+    if not ds.start():
+        ds.log.error("Cannot start the service! Exiting...")
+        exit(1)
+    asyncio.run(ds.serve())
+    exit(0)
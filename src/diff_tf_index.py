@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import re
+
+API_COMPONENT_PREFIX = re.compile(
+    r"^GoogleCloud[A-Z][A-Za-z]*?V\d+(?:(?:alpha|beta)\d*)?(?=[A-Z])"
+)
+
+
+def strip_api_prefix(component):
+    """
+    Strips the API specific prefix (e.g. `GoogleCloudApigeeV1` or
+    `GoogleCloudAiplatformV1beta1`) from the component name.
+
+    Args:
+        component (str): The name of the API component.
+
+    Returns:
+        str: The component name without the API prefix.
+    """
+    return API_COMPONENT_PREFIX.sub("", component)
+
+
+def normalize_resource_name(name):
+    """
+    Normalizes a camelCase, PascalCase or snake_case name, so the API
+    component and Terraform resource names can be compared directly.
+
+    Args:
+        name (str): The name to normalize.
+
+    Returns:
+        str: Lower case name without underscores.
+    """
+    return name.replace("_", "").lower()
+
+
+class DiffTfResourceSelection:
+    """
+    Container of the Terraform resources matching the given API components.
+    It is used to select the resource schemas that are read from the
+    `terraform providers schema -json` output before the resource names are
+    known.
+    """
+    def __init__(self, components, prefix):
+        """
+        Args:
+            components (iterable): Names of the API components.
+            prefix (str): Terraform resource prefix of the API.
+        """
+        self.prefix = prefix
+        self.keys = {
+            normalize_resource_name(strip_api_prefix(component))
+            for component in components
+        }
+
+    def __contains__(self, resource):
+        if not resource.startswith(self.prefix):
+            return False
+        return (normalize_resource_name(resource[len(self.prefix):])
+                in self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class DiffTfPrefixSelection:
+    """
+    Container of all Terraform resources with one of the given prefixes. It
+    selects the resource schemas of several APIs at once, before their
+    components are known, so the schemas can be read by a single
+    `get_tf_schemas` call and shared by the reports of the APIs.
+    """
+    def __init__(self, prefixes):
+        """
+        Args:
+            prefixes (iterable): Terraform resource prefixes of the APIs.
+        """
+        self.prefixes = tuple(sorted(set(prefixes)))
+
+    def __contains__(self, resource):
+        return resource.startswith(self.prefixes)
+
+    def __len__(self):
+        return len(self.prefixes)
+
+
+class DiffTfResourceIndex:
+    """
+    Index of the Terraform resources of a provider by their normalized
+    names. API components are matched with the resources by a single lookup
+    that ignores the API prefix of the component and the difference between
+    camelCase and snake_case names.
+    """
+    def __init__(self, api, prefix, resource_names):
+        """
+        Args:
+            api (str): Name of the analyzed API.
+            prefix (str): Terraform resource prefix of the API.
+            resource_names (iterable): Names of all resources of the
+                                       provider.
+        """
+        self.api = api
+        self.prefix = prefix
+        self.resource_names = set()
+        self.index = {}
+        for resource in sorted(resource_names):
+            if not resource.startswith(prefix):
+                continue
+            self.resource_names.add(resource)
+            self.index.setdefault(
+                normalize_resource_name(resource[len(prefix):]),
+                resource
+            )
+
+    def lookup(self, component, exact=None):
+        """
+        Returns the Terraform resource matching the API component.
+
+        Args:
+            component (str): Name of the API component.
+            exact (str, optional): Resource name that is preferred if it
+                                   exists, in case several resources have
+                                   the same normalized name.
+
+        Returns:
+            str: Name of the Terraform resource or `None` if there is no
+                 matching resource.
+        """
+        if exact in self.resource_names:
+            return exact
+        return self.index.get(
+            normalize_resource_name(strip_api_prefix(component))
+        )
+
+    def unmatched_resources(self, matched):
+        """
+        Returns the resources of the provider that were not matched with any
+        API component.
+
+        Args:
+            matched (iterable): Names of the matched Terraform resources.
+
+        Returns:
+            list: Sorted names of the unmatched resources.
+        """
+        return sorted(self.resource_names.difference(matched))
@@ -5,13 +5,101 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
+import hashlib
 import json
 import os
+import pickle
 import re
 import subprocess
+import tempfile
 import time
 
-from diff_config import TF_RESOURCES
+from functools import lru_cache
+from diff_common import write_atomic
+from diff_config import CACHE_DIR, TF_RESOURCES, TF_SCHEMA_CACHE_FORMAT
+from diff_field_path import FIELD_PATHS
+from diff_profiler import profile_stage
+from diff_tf_index import DiffTfResourceIndex, DiffTfResourceSelection
+from diff_tf_stream import DiffTfSchemaStream, DiffTfSchemaStreamError
+
+TF_LOCK_PROVIDER_VERSION = re.compile(
+    r'provider\s+"([^"]+)"\s*\{[^}]*?version\s*=\s*"([^"]+)"'
+)
+
+
+@lru_cache(maxsize=None)
+def snake_to_camel(snake):
+    """
+    Converts a snake_case string to camelCase. Terraform schemas repeat the
+    same attribute names in many resources, so the results are cached.
+
+    Args:
+        snake (str): The string in snake_case format to be converted.
+
+    Returns:
+        str: The string converted to camelCase format.
+    """
+    parts = snake.split('_')
+    return parts[0] + ''.join(word.capitalize() for word in parts[1:])
+
+
+def _tf_block_fields(root, path, schema):
+    """
+    Yields `(path, node, is_block)` of the attributes of a Terraform block
+    schema followed by its nested block types, where `path` is
+    a `DiffFieldPath`. Attributes of an object type yield a field for every
+    attribute of the object.
+    """
+    if not path.path:
+        path = root
+    block = schema.get("block", {})
+    for key, value in block.get("attributes", {}).items():
+        key = path.child(snake_to_camel(key))
+        attribute_type = value.get("type")
+        nested = [
+            attribute for attribute in attribute_type
+            if isinstance(attribute, list) and len(attribute) > 1
+            and isinstance(attribute[1], dict)
+        ] if isinstance(attribute_type, list) else []
+        for attribute in nested:
+            for subkey, subtype in attribute[1].items():
+                yield key.child(snake_to_camel(subkey)), subtype, False
+        if not nested:
+            yield key, value, False
+    for key, value in block.get("block_types", {}).items():
+        yield path.child(snake_to_camel(key)), value, True
+
+
+def iter_tf_fields(schema, prefix="", table=FIELD_PATHS):
+    """
+    Yields the fields of a Terraform component schema in the order of the
+    schema. The schema is used as returned by Terraform; its snake_case keys
+    are converted to camelCase on the fly. Nested blocks are walked with an
+    explicit stack and every field is yielded once.
+
+    Args:
+        schema (dict): Terraform schema of the component.
+        prefix (str, optional): Path prepended to the fields.
+        table (DiffFieldPathTable, optional): Table of the field paths.
+
+    Yields:
+        tuple: `(path, is_output_only, node)` of the field, where `node` is
+               the schema of the attribute. Terraform schemas have no output
+               only fields, so `is_output_only` is always `False`.
+    """
+    seen = set()
+    stack = [_tf_block_fields(table.root, table.lookup(prefix), schema)]
+    while stack:
+        field = next(stack[-1], None)
+        if field is None:
+            stack.pop()
+            continue
+        path, node, is_block = field
+        if is_block:
+            stack.append(_tf_block_fields(table.root, path, node))
+        elif path.path not in seen:
+            seen.add(path.path)
+            yield path.path, False, node
 
 
 class DiffTfParser:
@@ -32,7 +120,11 @@ class DiffTfParser:
         self.log.debug("CMD: " + " ".join(cmd_version))
 
         try:
-            p = subprocess.Popen(cmd_version, stdout=subprocess.PIPE)
+            p = subprocess.Popen(
+                cmd_version,
+                stdout=subprocess.PIPE,
+                cwd=self.tf_config_path
+            )
             stdout, __ = p.communicate()
             terraform_version_stdout = stdout.decode("utf-8")
 
@@ -47,10 +139,21 @@ class DiffTfParser:
             return False
         return True
 
-    def get_tf_schemas(self):
+    def get_tf_schemas(self, resources=None):
         """
         Retrieves the Terraform schemas using the
-        `terraform providers schema -json` command.
+        `terraform providers schema -json` command. The schemas are cached
+        per `.terraform.lock.hcl` content, so the command is not run again
+        until the selected providers change.
+
+        Args:
+            resources (container, optional): Names of the Terraform resources
+                                             whose schemas are needed. If
+                                             set, the command output is
+                                             parsed incrementally and only
+                                             these resource schemas are
+                                             kept. Defaults to `None`, which
+                                             keeps the whole output.
 
         Returns:
             bool: `True` if the Terraform schemas are successfully retrieved
@@ -60,16 +163,54 @@ class DiffTfParser:
             print("Error: Logger not found!")
             return False
 
-        self.log.debug("Checking if Terraform is available")
-        if not self._terraform_check():
-            return False
+        cache_path = self._tf_schema_cache_path()
+        # The schemas are identified by the key of their cache, so they do
+        # not have to be hashed to tell if they changed.
+        self.tf_schemas_digest = (
+            os.path.splitext(os.path.basename(cache_path))[0]
+            if cache_path else None
+        )
+        cached = None
+        if cache_path:
+            with profile_stage(self, "tf_cache"):
+                cached = self._load_tf_schema_cache(cache_path)
+                if cached and self._use_tf_schema_cache(cached, resources):
+                    return True
+
+        with profile_stage(self, "terraform"):
+            self.log.debug("Checking if Terraform is available")
+            if not self._terraform_check():
+                return False
+
+            self.log.debug("Trying to get Terraform schemas")
+            cmd_get_schemas = ["terraform", "providers", "schema", "-json"]
+            if resources is not None:
+                if not self._stream_tf_schemas(cmd_get_schemas, resources):
+                    return False
+            elif not self._read_tf_schemas(cmd_get_schemas):
+                return False
+
+        if cache_path:
+            self._save_tf_schema_cache(cache_path, cached,
+                                       complete=resources is None)
+        return True
 
-        self.log.debug("Trying to get Terraform schemas")
-        cmd_get_schemas = ["terraform", "providers", "schema", "-json"]
+    def _read_tf_schemas(self, cmd_get_schemas):
+        """
+        Runs the Terraform schemas command and parses its whole output.
+
+        Args:
+            cmd_get_schemas (list): Terraform schemas command.
+
+        Returns:
+            bool: `True` if the Terraform schemas are successfully retrieved
+                  and parsed, `False` otherwise.
+        """
         p = subprocess.Popen(
             cmd_get_schemas,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+            stderr=subprocess.PIPE,
+            cwd=self.tf_config_path
         )
         stdout, __ = p.communicate()
         terraform_stdout = stdout.decode("utf-8")
@@ -86,9 +227,257 @@ class DiffTfParser:
             return False
 
         self.terraform_schemas = json.loads(terraform_stdout)
+        self.tf_resource_names = {
+            provider: list(provider_schema.get("resource_schemas", {}))
+            for provider, provider_schema in (
+                self.terraform_schemas["provider_schemas"].items()
+            )
+        }
+
+        return True
+
+    def _tf_schema_cache_path(self):
+        """
+        Returns the path of the cached Terraform schemas. The cache is keyed
+        by the hash of `.terraform.lock.hcl` and the provider versions
+        selected in it.
+
+        Returns:
+            str: Path of the cache file or `None` if the lock file does not
+                 exist.
+        """
+        lock_path = os.path.join(self.tf_config_path, ".terraform.lock.hcl")
+        if not os.path.exists(lock_path):
+            self.log.debug("Terraform lock file not found, Terraform schemas"
+                           " will not be cached")
+            return None
+
+        with open(lock_path, "rb") as f:
+            lock_content = f.read()
+        provider_selections = dict(
+            TF_LOCK_PROVIDER_VERSION.findall(lock_content.decode("utf-8"))
+        )
+
+        digest = hashlib.sha256(lock_content)
+        digest.update(
+            json.dumps(provider_selections, sort_keys=True).encode()
+        )
+        return os.path.join(
+            getattr(self, 'cache_dir', CACHE_DIR),
+            "terraform",
+            f"{digest.hexdigest()}.pickle"
+        )
+
+    def _load_tf_schema_cache(self, cache_path):
+        """
+        Loads the cached Terraform schemas.
+
+        Args:
+            cache_path (str): Path of the cache file.
+
+        Returns:
+            dict: The cache entry or `None` if it is not available.
+        """
+        if getattr(self, 'refresh_tf_cache', False):
+            self.log.debug("Refreshing Terraform schemas cache")
+            return None
+
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.log.warning(f"Terraform schemas cache {cache_path} is"
+                             " broken! Ignoring it.")
+            return None
+
+        if cached.get("format") != TF_SCHEMA_CACHE_FORMAT:
+            return None
+        return cached
+
+    def _use_tf_schema_cache(self, cached, resources):
+        """
+        Sets the Terraform versions and schemas from the cache entry if it
+        contains all requested resources.
+
+        Args:
+            cached (dict): The cache entry.
+            resources (container): Names of the requested resources or
+                                   `None` if the whole schema is requested.
+
+        Returns:
+            bool: `True` if the cache entry was used, `False` otherwise.
+        """
+        if not cached["complete"]:
+            if resources is None:
+                return False
+            for provider, resource_names in (
+                cached["tf_resource_names"].items()
+            ):
+                resource_schemas = (
+                    cached["terraform_schemas"]["provider_schemas"]
+                    [provider]["resource_schemas"]
+                )
+                for resource in resource_names:
+                    if (resource in resources
+                            and resource not in resource_schemas):
+                        return False
+
+        self.log.debug("Using cached Terraform schemas")
+        self.terraform_versions = cached["terraform_versions"]
+        self.terraform_schemas = cached["terraform_schemas"]
+        self.tf_resource_names = cached["tf_resource_names"]
+        return True
+
+    def _save_tf_schema_cache(self, cache_path, cached, complete):
+        """
+        Saves the Terraform versions and schemas to the cache. Resource
+        schemas of the previous partial cache entry are kept.
+
+        Args:
+            cache_path (str): Path of the cache file.
+            cached (dict): The previous cache entry or `None`.
+            complete (bool): `True` if all resource schemas were retrieved.
+        """
+        if cached and not complete:
+            for provider, provider_schema in (
+                cached["terraform_schemas"]["provider_schemas"].items()
+            ):
+                resource_schemas = (
+                    self.terraform_schemas["provider_schemas"]
+                    .setdefault(provider, {"resource_schemas": {}})
+                    ["resource_schemas"]
+                )
+                for resource, schema in (
+                    provider_schema["resource_schemas"].items()
+                ):
+                    resource_schemas.setdefault(resource, schema)
+
+        cache_entry = {
+            "format": TF_SCHEMA_CACHE_FORMAT,
+            "complete": complete,
+            "terraform_versions": self.terraform_versions,
+            "terraform_schemas": self.terraform_schemas,
+            "tf_resource_names": self.tf_resource_names,
+        }
+        self.log.debug(f"Saving Terraform schemas cache {cache_path}")
+        try:
+            write_atomic(
+                cache_path,
+                pickle.dumps(cache_entry, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        except OSError as e:
+            self.log.warning(f"Cannot save Terraform schemas cache: {e}")
+
+    def _stream_tf_schemas(self, cmd_get_schemas, resources):
+        """
+        Runs the Terraform schemas command and parses its output
+        incrementally, keeping only the requested resource schemas.
+
+        Args:
+            cmd_get_schemas (list): Terraform schemas command.
+            resources (container): Names of the requested resources.
+
+        Returns:
+            bool: `True` if the Terraform schemas are successfully retrieved
+                  and parsed, `False` otherwise.
+        """
+        with tempfile.TemporaryFile() as stderr:
+            p = subprocess.Popen(
+                cmd_get_schemas,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                cwd=self.tf_config_path
+            )
+            stream = DiffTfSchemaStream(p.stdout, resources)
+            try:
+                terraform_schemas = stream.parse()
+            except DiffTfSchemaStreamError as e:
+                self.log.debug(f"Parsing Terraform schemas failed: {e}")
+                terraform_schemas = None
+            finally:
+                p.stdout.close()
+                p.wait()
+
+            if p.returncode != 0 or terraform_schemas is None:
+                stderr.seek(0)
+                self.log.debug(stderr.read().decode("utf-8", "replace"))
+                self.log.error("Getting Terraform schemas failed!")
+                return False
+
+        if not terraform_schemas.get("provider_schemas"):
+            self.log.error(
+                "No info about Terraform schemas! "
+                "Check if Terraform configuration is available."
+            )
+            return False
+
+        self.terraform_schemas = terraform_schemas
+        self.tf_resource_names = stream.resource_names
+        return True
+
+    def get_tf_resource_selection(self, components, api):
+        """
+        Returns the container of the Terraform resources matching the Google
+        API components. It selects the resource schemas read by
+        `get_tf_schemas` before the resource names are known.
+
+        Args:
+            components (iterable): Names of the API components.
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            DiffTfResourceSelection: The resource container.
+        """
+        return DiffTfResourceSelection(components, TF_RESOURCES[api])
+
+    def build_tf_resource_index(self, api):
+        """
+        Builds `tf_resource_index` of all resources of the Terraform provider
+        of the analyzed API. Once it is built, `get_tf_resource_name` matches
+        the components by a single index lookup.
+
+        Args:
+            api (str): Name of analyzed API that is base for tf resources
 
+        Returns:
+            bool: `True` if the index was built, `False` if the Terraform
+                  schemas are not known.
+        """
+        if not hasattr(self, 'tf_resource_names'):
+            self.log.error("Error: Terraform schemas not set!")
+            return False
+
+        self.tf_resource_index = DiffTfResourceIndex(
+            api,
+            TF_RESOURCES[api],
+            self.tf_resource_names.get(self._tf_provider(api), [])
+        )
         return True
 
+    def get_tf_resource_name(self, component, api):
+        """
+        Returns the Terraform resource name of the Google API component.
+
+        Args:
+            component (str): The name of the component (e.g., "Instance").
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            str: The Terraform resource name (e.g.,
+                 "google_compute_instance").
+        """
+        resource_name = (
+            f"{TF_RESOURCES[api]}"
+            f"{self._camel_to_snake_string(component)}"
+        )
+        index = getattr(self, "tf_resource_index", None)
+        if index is None or index.api != api:
+            return resource_name
+        return index.lookup(component, exact=resource_name) or resource_name
+
     def _camel_to_snake_string(self, camel):
         """
         Method converts camel string into snake case
@@ -111,8 +500,7 @@ class DiffTfParser:
         Returns:
         str: The string converted to camelCase format.
         """
-        parts = snake.split('_')
-        return parts[0] + ''.join(word.capitalize() for word in parts[1:])
+        return snake_to_camel(snake)
 
     def _camel_to_pascal_string(self, camel):
         """
@@ -199,13 +587,11 @@ class DiffTfParser:
             return False
 
         try:
-            self.component_tf_schema = self._snake_to_camel_schema(
-                self.terraform_schemas[
-                    "provider_schemas"][
-                    provider][
-                    "resource_schemas"][
-                    self.tf_resource_name]
-            )
+            self.component_tf_schema = self.terraform_schemas[
+                "provider_schemas"][
+                provider][
+                "resource_schemas"][
+                self.tf_resource_name]
         except KeyError:
             self.log.debug(f"The specified {self.tf_resource_name} not found"
                            " in the schema.")
@@ -221,7 +607,11 @@ class DiffTfParser:
                 f"Saving {component} schema to json file {file_name}"
             )
             with open(file_name, "w") as f:
-                json.dump(self.component_tf_schema, f, indent=2)
+                json.dump(
+                    self._snake_to_camel_schema(self.component_tf_schema),
+                    f,
+                    indent=2
+                )
         return True
 
     def get_azure_tf_component_schema(self, component, save_file=False):
@@ -268,13 +658,11 @@ class DiffTfParser:
             return False
 
         try:
-            self.component_tf_schema = self._snake_to_camel_schema(
-                self.terraform_schemas[
-                    "provider_schemas"][
-                    provider][
-                    "resource_schemas"][
-                    self.tf_resource_name]
-            )
+            self.component_tf_schema = self.terraform_schemas[
+                "provider_schemas"][
+                provider][
+                "resource_schemas"][
+                self.tf_resource_name]
         except KeyError:
             self.log.debug(f"The specified {self.tf_resource_name} not found"
                            " in the schema.")
@@ -290,9 +678,73 @@ class DiffTfParser:
                 f"Saving {component} schema to json file {file_name}"
             )
             with open(file_name, "w") as f:
-                json.dump(self.component_tf_schema, f, indent=2)
+                json.dump(
+                    self._snake_to_camel_schema(self.component_tf_schema),
+                    f,
+                    indent=2
+                )
+        return True
+
+    def _tf_provider(self, api):
+        """
+        Returns the Terraform provider of the analyzed API.
+
+        Args:
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            str: The Terraform provider address.
+        """
+        if "beta" in api:
+            return "registry.terraform.io/hashicorp/google-beta"
+        return "registry.terraform.io/hashicorp/google"
+
+    def get_tf_provider_version(self, api):
+        """
+        Sets `tf_provider_version` to the version of the Terraform provider
+        of the analyzed API.
+
+        Args:
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            bool: `True` if the provider version is known, otherwise `False`.
+        """
+        provider = self._tf_provider(api)
+        try:
+            self.tf_provider_version = (
+                self.terraform_versions["provider_selections"][provider]
+            ).replace(".", "-")
+            self.log.debug(f"{provider} version: {self.tf_provider_version}")
+        except (AttributeError, KeyError):
+            self.log.error(f"The version of {provider} not known!")
+            return False
         return True
 
+    def has_tf_component_schema(self, component, api):
+        """
+        Checks if the Terraform schema of the component is available without
+        retrieving it.
+
+        Args:
+            component (str): The name of the Terraform component
+                             (e.g., "instance").
+            api (str): Name of analyzed API that is base for tf resources
+
+        Returns:
+            bool: `True` if the provider schemas contain the resource,
+                  otherwise `False`.
+        """
+        provider = self._tf_provider(api)
+        try:
+            resource_schemas = (
+                self.terraform_schemas["provider_schemas"][provider]
+                                      ["resource_schemas"]
+            )
+        except (AttributeError, KeyError):
+            return False
+        return self.get_tf_resource_name(component, api) in resource_schemas
+
     def get_tf_component_schema(self, component, api, save_file=False):
         """
         Retrieves and processes the Terraform schema for a specific component.
@@ -326,33 +778,18 @@ class DiffTfParser:
             self.log.error("Error: Terraform schemas not set!")
             return False
 
-        if "beta" in api:
-            provider = "registry.terraform.io/hashicorp/google-beta"
-        else:
-            provider = "registry.terraform.io/hashicorp/google"
-
-        self.tf_resource_name = (
-            f"{TF_RESOURCES[api]}"
-            f"{self._camel_to_snake_string(component)}"
-        )
+        provider = self._tf_provider(api)
+        self.tf_resource_name = self.get_tf_resource_name(component, api)
 
-        try:
-            self.tf_provider_version = (
-                self.terraform_versions["provider_selections"][provider]
-            ).replace(".", "-")
-            self.log.debug(f"{provider} version: {self.tf_provider_version}")
-        except KeyError:
-            self.log.error(f"The version of {provider} not known!")
+        if not self.get_tf_provider_version(api):
             return False
 
         try:
-            self.component_tf_schema = self._snake_to_camel_schema(
-                self.terraform_schemas[
-                    "provider_schemas"][
-                    provider][
-                    "resource_schemas"][
-                    self.tf_resource_name]
-            )
+            self.component_tf_schema = self.terraform_schemas[
+                "provider_schemas"][
+                provider][
+                "resource_schemas"][
+                self.tf_resource_name]
         except KeyError:
             self.log.debug(f"The specified {self.tf_resource_name} not found"
                            " in the schema.")
@@ -368,71 +805,13 @@ class DiffTfParser:
                 f"Saving {component} schema to json file {file_name}"
             )
             with open(file_name, "w") as f:
-                json.dump(self.component_tf_schema, f, indent=2)
+                json.dump(
+                    self._snake_to_camel_schema(self.component_tf_schema),
+                    f,
+                    indent=2
+                )
         return True
 
-    def _get_nested_attributes(self, key, type_list: list):
-        """
-        Extracts nested attributes from a list of types and appends them
-        to the `tf_field_list`.
-
-        Args:
-            key (str): The base key to which nested keys (if any) will
-                       be appended.
-            type_list (list): A list of types, where some elements may
-                              contain nested dictionaries.
-
-        Returns:
-            None: The method directly modifies the `tf_field_list`
-                  by appending keys or nested keys.
-        """
-        nested = False
-
-        for type in type_list:
-            if isinstance(type, list):
-                nested = True
-                for subkey in type[1].keys():
-                    self.tf_field_list.append(key + "." + subkey)
-                continue
-
-        if not nested:
-            self.tf_field_list.append(key)
-
-    def _get_tf_field(self, key_origin, value_origin):
-        """
-        Recursively extracts and appends Terraform field keys to the
-        `tf_field_list`.
-
-        Args:
-            key_origin (str): The base key (prefix) to prepend to the extracted
-                              keys.
-            value_origin (dict): The dictionary containing the Terraform block
-                                 schema, including attributes and nested block
-                                 types.
-
-        Returns:
-            None: The method directly modifies `tf_field_list` by appending
-                  the extracted keys.
-        """
-        key_appendix = ''
-        if key_origin != '':
-            key_appendix = key_origin + '.'
-
-        try:
-            for key, value in value_origin["block"]["attributes"].items():
-                if not isinstance(value["type"], list):
-                    self.tf_field_list.append(key_appendix+key)
-                    continue
-                self._get_nested_attributes(key_appendix+key, value["type"])
-        except KeyError:
-            pass
-
-        try:
-            for key, value in value_origin["block"]["blockTypes"].items():
-                self._get_tf_field(key_appendix+key, value)
-        except KeyError:
-            pass
-
     def get_tf_fields(self, prepend=None, aws=False):
         """
         Extracts Terraform field keys from the component schema and populates
@@ -456,11 +835,10 @@ class DiffTfParser:
             self.log.error("Terraform component schema not found!")
             return False
 
-        self.tf_field_list = []
-        if not prepend:
-            self._get_tf_field('', self.component_tf_schema)
-        else:
-            self._get_tf_field(prepend, self.component_tf_schema)
+        self.tf_field_list = [
+            field for field, _, _
+            in iter_tf_fields(self.component_tf_schema, prepend or '')
+        ]
 
         if aws:
             self.tf_field_list = [
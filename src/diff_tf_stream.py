@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import codecs
+import json
+import re
+
+from diff_config import TF_STREAM_CHUNK_SIZE
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"')
+SCALAR = re.compile(r"[^,}\]\s]+")
+
+
+class DiffTfSchemaStreamError(Exception):
+    """
+    Raised when the Terraform schemas stream is not a valid JSON document.
+    """
+
+
+class DiffTfSchemaStream:
+    """
+    Incremental reader of the `terraform providers schema -json` output.
+
+    The output is read in chunks from a binary stream. Only
+    `provider_schemas[provider].resource_schemas[name]` values of the
+    requested resources are decoded; all other values are skipped without
+    building Python objects for them. The names of all resources of every
+    provider are collected in `resource_names`.
+    """
+    def __init__(self, stream, resources, chunk_size=TF_STREAM_CHUNK_SIZE):
+        """
+        Args:
+            stream (io.BufferedIOBase): Binary stream with the JSON output.
+            resources (container): Names of the resources whose schemas are
+                                   decoded. Any object supporting `in` can
+                                   be used.
+            chunk_size (int, optional): Number of bytes read at once.
+        """
+        self.stream = stream
+        self.resources = resources
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+        self.resource_names = {}
+
+    def _fill(self):
+        """
+        Reads the next chunk into the buffer. The already consumed part of
+        the buffer is dropped, unless it is marked for decoding.
+
+        Returns:
+            bool: `True` if more data was read, `False` at the end of
+                  the stream.
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        try:
+            text = self.decoder.decode(chunk, final=self.eof)
+        except UnicodeDecodeError as e:
+            raise DiffTfSchemaStreamError(f"Invalid UTF-8 data: {e}") from e
+
+        keep = self.pos if self.mark is None else self.mark
+        self.buffer = self.buffer[keep:] + text
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark -= keep
+        return bool(text) or not self.eof
+
+    def _peek(self):
+        """
+        Skips whitespace and returns the next character.
+
+        Returns:
+            str: The next character or an empty string at the end of
+                 the stream.
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _loads(self, text, offset):
+        """
+        Decodes a complete JSON value read from the stream.
+
+        Args:
+            text (str): The JSON value.
+            offset (int): Offset of the value in the buffer.
+
+        Returns:
+            The decoded value.
+        """
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise DiffTfSchemaStreamError(
+                f"Invalid value at offset {offset}: {e}"
+            ) from e
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise DiffTfSchemaStreamError(
+                f"Expected '{char}' at offset {self.pos}"
+            )
+        self.pos += 1
+
+    def _read_string(self):
+        """
+        Reads the JSON string starting at the current position.
+
+        Returns:
+            str: The raw JSON string including the quotes.
+        """
+        if self._peek() != '"':
+            raise DiffTfSchemaStreamError(
+                f"Expected string at offset {self.pos}"
+            )
+        while True:
+            match = STRING.match(self.buffer, self.pos)
+            if match:
+                self.pos = match.end()
+                return match.group()
+            if not self._fill():
+                raise DiffTfSchemaStreamError("Unterminated string")
+
+    def _skip_value(self):
+        """
+        Skips the JSON value starting at the current position.
+        """
+        char = self._peek()
+        if char == '"':
+            self._read_string()
+            return
+
+        if char not in "{[":
+            while True:
+                match = SCALAR.match(self.buffer, self.pos)
+                if not match:
+                    raise DiffTfSchemaStreamError(
+                        f"Unexpected value at offset {self.pos}"
+                    )
+                if match.end() < len(self.buffer) or not self._fill():
+                    self.pos = match.end()
+                    return
+
+        depth = 0
+        while True:
+            match = TOKEN.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise DiffTfSchemaStreamError("Unexpected end of stream")
+                continue
+
+            token = match.group()
+            if token == '"':
+                self.pos = match.start()
+                if not self._fill():
+                    raise DiffTfSchemaStreamError("Unterminated string")
+                continue
+
+            self.pos = match.end()
+            if token in "{[":
+                depth += 1
+            elif token in "}]":
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _decode_value(self):
+        """
+        Decodes the JSON value starting at the current position.
+
+        Returns:
+            The decoded value.
+        """
+        self._peek()
+        self.mark = self.pos
+        try:
+            self._skip_value()
+            return self._loads(self.buffer[self.mark:self.pos], self.mark)
+        finally:
+            self.mark = None
+
+    def _iter_object(self):
+        """
+        Iterates over keys of the JSON object starting at the current
+        position. The caller has to consume the value of every key before
+        asking for the next one.
+
+        Yields:
+            str: Keys of the object.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self._loads(self._read_string(), self.pos)
+            self._expect(":")
+            yield key
+            char = self._peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise DiffTfSchemaStreamError(
+                    f"Expected ',' or '}}' at offset {self.pos - 1}"
+                )
+
+    def _parse_provider(self, provider):
+        """
+        Parses a single provider schema, keeping only the requested
+        resource schemas.
+
+        Args:
+            provider (str): Name of the provider.
+
+        Returns:
+            dict: Provider schema with the `resource_schemas` key only.
+        """
+        resource_names = self.resource_names.setdefault(provider, [])
+        resource_schemas = {}
+        for key in self._iter_object():
+            if key != "resource_schemas":
+                self._skip_value()
+                continue
+            for resource in self._iter_object():
+                resource_names.append(resource)
+                if resource in self.resources:
+                    resource_schemas[resource] = self._decode_value()
+                else:
+                    self._skip_value()
+        return {"resource_schemas": resource_schemas}
+
+    def parse(self):
+        """
+        Parses the whole stream.
+
+        Returns:
+            dict: Terraform schemas with `format_version` and the requested
+                  resource schemas of every provider.
+
+        Raises:
+            DiffTfSchemaStreamError: The stream is not a valid JSON document.
+        """
+        terraform_schemas = {}
+        for key in self._iter_object():
+            if key == "format_version":
+                terraform_schemas[key] = self._decode_value()
+            elif key == "provider_schemas":
+                provider_schemas = {}
+                for provider in self._iter_object():
+                    provider_schemas[provider] = self._parse_provider(
+                        provider
+                    )
+                terraform_schemas[key] = provider_schemas
+            else:
+                self._skip_value()
+
+        if self._peek() != "":
+            raise DiffTfSchemaStreamError(
+                f"Unexpected data at offset {self.pos}"
+            )
+        return terraform_schemas
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import logging
+import os
+import sys
+
+import pytest
+
+# The scripts import each other by module name, like `gcpdiff/src/<script>.py`
+# runs do.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+@pytest.fixture
+def log():
+    return logging.getLogger("gcpdiff-tests")
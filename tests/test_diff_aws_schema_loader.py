@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import json
+import pickle
+
+import pytest
+
+from diff_aws_schema_loader import DiffAwsSchemaLoader
+
+SCHEMA = {
+    "typeName": "AWS::EC2::EIP",
+    "properties": {
+        "Domain": {"type": "string"},
+        "Tags": {"type": "array", "items": {"$ref": "#/definitions/Tag"}},
+        "AllocationId": {"type": "string"},
+    },
+    "definitions": {"Tag": {"type": "object", "properties": {
+        "Key": {"type": "string"},
+        "Value": {"type": "string"},
+    }}},
+}
+FIELDS = (["Domain", "Tags.Key", "Tags.Value", "AllocationId"], [])
+
+
+@pytest.fixture
+def loader(log, tmp_path):
+    schema_dir = tmp_path / "schemas"
+    schema_dir.mkdir()
+    (schema_dir / "aws-ec2-eip.json").write_text(json.dumps(SCHEMA))
+    return DiffAwsSchemaLoader(log, schema_dir, cache_dir=tmp_path / "cache",
+                               max_workers=1)
+
+
+def test_cached_fields(log, loader):
+    schema = loader.load(["aws-ec2-eip"])["aws-ec2-eip"]
+    assert (schema.type_name, schema.api_fields) == ("AWS::EC2::EIP", FIELDS)
+    assert schema.schema is not None
+
+    loader = DiffAwsSchemaLoader(log, loader.schema_dir,
+                                 cache_dir=loader.aws_dir[:-len("/aws")])
+    schema = loader.load(["aws-ec2-eip"])["aws-ec2-eip"]
+    assert (schema.type_name, schema.api_fields) == ("AWS::EC2::EIP", FIELDS)
+    assert schema.schema is None
+    assert loader.find_type("AWS::EC2::EIP") == ["aws-ec2-eip"]
+
+
+@pytest.mark.parametrize("content", (
+    b"",
+    b"not a pickle",
+    pickle.dumps(["format", "max_depth"]),
+    pickle.dumps(None),
+    # Truncated pickle and a pickle of an unknown class.
+    pickle.dumps({"format": 1, "api_fields": ["a"] * 100})[:-20],
+    b"cbuiltins\nNoSuchClass\n.",
+))
+def test_broken_cached_fields(loader, content):
+    loader.load(["aws-ec2-eip"])
+    digest = loader.manifest["aws-ec2-eip"]["digest"]
+    with open(loader._fields_path(digest), "wb") as f:
+        f.write(content)
+
+    # A broken cache entry is a cache miss and is replaced.
+    assert loader._load_fields(digest) is None
+    schema = loader.load(["aws-ec2-eip"])["aws-ec2-eip"]
+    assert schema.api_fields == FIELDS
+    assert schema.schema is not None
+    assert loader._load_fields(digest)["api_fields"] == FIELDS
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import os
+import stat
+
+import pytest
+
+from diff_common import write_atomic
+
+
+@pytest.fixture
+def umask():
+    previous = os.umask(0o027)
+    yield 0o027
+    os.umask(previous)
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_write_atomic_new_file(tmp_path, umask):
+    path = tmp_path / "reports" / "report.yaml"
+    write_atomic(str(path), b"new")
+    assert path.read_bytes() == b"new"
+    assert mode(path) == 0o666 & ~umask
+    assert os.listdir(path.parent) == ["report.yaml"]
+
+
+def test_write_atomic_keeps_mode(tmp_path, umask):
+    path = tmp_path / "report.yaml"
+    path.write_bytes(b"old")
+    os.chmod(path, 0o604)
+    write_atomic(str(path), b"new")
+    assert path.read_bytes() == b"new"
+    assert mode(path) == 0o604
+    assert os.listdir(tmp_path) == ["report.yaml"]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import json
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from diff_discovery_cache import DiffDiscoveryCache
+
+DOCUMENT = {"kind": "discovery#restDescription", "name": "compute",
+            "revision": "20250101", "schemas": {"Instance": {}}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves the discovery document of the stub server with an ETag and
+    answers conditional requests with 304.
+    """
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = f'"{server.document["revision"]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(server.document).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.document = dict(DOCUMENT)
+    server.requests = []
+    server.url = (f"http://127.0.0.1:{server.server_address[1]}"
+                  "/compute.json")
+    thread = threading.Thread(target=server.serve_forever,
+                              kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def objects(cache):
+    return sorted(os.listdir(cache.objects_dir))
+
+
+def test_ttl_hit(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 1
+
+    # A fresh document is read from the disk, also by a new process.
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 1
+    assert cache.index["compute"]["revision"] == "20250101"
+
+
+def test_revalidation_not_modified(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=0)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    checked = cache.index["compute"]["checked"]
+    digest = cache.index["compute"]["digest"]
+
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=0)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 2
+    assert stub.requests[1].get("If-None-Match") == '"20250101"'
+    assert cache.index["compute"]["digest"] == digest
+    assert cache.index["compute"]["checked"] >= checked
+    assert len(objects(cache)) == 1
+
+
+def test_revalidation_modified(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=0)
+    cache.get_discovery_doc("compute", stub.url)
+    digest = cache.index["compute"]["digest"]
+
+    stub.document = dict(DOCUMENT, revision="20250202")
+    assert cache.get_discovery_doc("compute", stub.url) == stub.document
+    assert stub.requests[1].get("If-None-Match") == '"20250101"'
+    assert cache.index["compute"]["revision"] == "20250202"
+    assert cache.index["compute"]["digest"] != digest
+
+
+def test_changed_url_is_not_used(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    cache.get_discovery_doc("compute", stub.url)
+    assert cache.get_discovery_doc("compute", stub.url + "?v=2") == DOCUMENT
+    assert len(stub.requests) == 2
+    assert "If-None-Match" not in stub.requests[1]
+
+
+def test_offline_seed(log, tmp_path):
+    discovery_dir = tmp_path / "discovery"
+    discovery_dir.mkdir()
+    (discovery_dir / "compute.json").write_text(json.dumps(DOCUMENT))
+
+    # The URL is never requested in offline mode.
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, offline=True)
+    assert cache.get_discovery_doc("compute", "http://127.0.0.1:9/") == (
+        DOCUMENT
+    )
+    assert cache.get_discovery_doc("container", "http://127.0.0.1:9/") is None
+
+
+def test_offline_prefers_cached_document(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path)
+    cache.get_discovery_doc("compute", stub.url)
+    (tmp_path / "discovery" / "compute.json").write_text(
+        json.dumps(dict(DOCUMENT, revision="seed"))
+    )
+
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=0, offline=True)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 1
+
+
+def test_corrupted_object(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    cache.get_discovery_doc("compute", stub.url)
+    object_path = cache._object_path(cache.index["compute"]["digest"])
+    with open(object_path, "w") as f:
+        f.write('{"kind": "corrupted"}')
+
+    # The corrupted document is downloaded again, unconditionally.
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 2
+    assert "If-None-Match" not in stub.requests[1]
+    with open(object_path, "r") as f:
+        assert json.load(f) == DOCUMENT
+
+
+def test_corrupted_object_offline_uses_seed(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path)
+    cache.get_discovery_doc("compute", stub.url)
+    os.truncate(cache._object_path(cache.index["compute"]["digest"]), 10)
+    seed = dict(DOCUMENT, revision="seed")
+    (tmp_path / "discovery" / "compute.json").write_text(json.dumps(seed))
+
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, offline=True)
+    assert cache.get_discovery_doc("compute", stub.url) == seed
+
+
+def test_broken_index(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    cache.get_discovery_doc("compute", stub.url)
+    with open(cache.index_path, "w") as f:
+        f.write("{")
+
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    assert cache.index == {}
+    assert cache.get_discovery_doc("compute", stub.url) == DOCUMENT
+    assert len(stub.requests) == 2
+
+
+def test_eviction_keeps_the_stored_document(log, tmp_path, stub):
+    # Every document is larger than the cache and older than its maximum
+    # age, but the one just stored is never evicted.
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=0, max_age=0,
+                               max_size=1)
+    cache.get_discovery_doc("compute", stub.url)
+    assert list(cache.index) == ["compute"]
+    assert len(objects(cache)) == 1
+
+    stub.document = dict(DOCUMENT, revision="20250202")
+    cache.get_discovery_doc("compute-beta", stub.url + "?beta")
+    assert list(cache.index) == ["compute-beta"]
+    assert objects(cache) == [
+        f"{cache.index['compute-beta']['digest']}.json"
+    ]
+
+
+def test_eviction_of_least_recently_used(log, tmp_path, stub):
+    cache = DiffDiscoveryCache(log, cache_dir=tmp_path, ttl=3600)
+    for revision in ("1", "2", "3"):
+        stub.document = dict(DOCUMENT, revision=revision)
+        cache.get_discovery_doc(f"api{revision}", f"{stub.url}?{revision}")
+    size = cache.index["api1"]["size"]
+    now = time.time()
+    cache.index["api1"]["used"] = now - 30
+    cache.index["api2"]["used"] = now - 20
+    cache.index["api3"]["used"] = now - 10
+
+    cache.max_size = 2 * size
+    cache.evict(keep="api1")
+    assert sorted(cache.index) == ["api1", "api3"]
+    assert len(objects(cache)) == 2
+
+    # Objects not referenced by the index are removed first.
+    with open(cache._object_path("0" * 64), "w") as f:
+        f.write("{}")
+    cache.evict()
+    assert sorted(cache.index) == ["api1", "api3"]
+    assert len(objects(cache)) == 2
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from diff_api_walker import DiffApiFieldWalker
+from diff_field_path import DiffFieldPathTable
+
+
+def test_lookup():
+    table = DiffFieldPathTable()
+    path = table.lookup("networkInterfaces.accessConfigs.natIP")
+    assert path.path == "networkInterfaces.accessConfigs.natIP"
+    assert path is table.lookup("networkInterfaces.accessConfigs.natIP")
+    assert path.parent is table.lookup("networkInterfaces.accessConfigs")
+    assert table.lookup("") is table.root
+
+
+def test_extend():
+    table = DiffFieldPathTable()
+    relatives = [table.lookup(path) for path in ("natIP", "", "a.b", "a")]
+    extended = table.extend(table.lookup("accessConfigs"), relatives)
+    assert [path.path for path in extended] == [
+        "accessConfigs.natIP", "accessConfigs", "accessConfigs.a.b",
+        "accessConfigs.a"
+    ]
+    assert extended[2] is table.lookup("accessConfigs.a.b")
+    assert table.extend(table.root, relatives) is relatives
+
+
+def test_clear():
+    table = DiffFieldPathTable()
+    schema = {"properties": {"disk": {"properties": {"size": {}}}}}
+    walker = DiffApiFieldWalker(table)
+    assert [path for path, _, _ in walker.iter_fields(schema)] == [
+        "disk.size"
+    ]
+    disk = table.lookup("disk")
+
+    table.clear()
+    assert table.root.children == {}
+    assert table.lookup("disk") is not disk
+    assert [path for path, _, _ in DiffApiFieldWalker(table).iter_fields(
+        schema
+    )] == ["disk.size"]
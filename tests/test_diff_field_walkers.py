@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import random
+
+import pytest
+
+from diff_api_walker import DiffApiFieldWalker, iter_azure_api_fields
+from diff_field_path import DiffFieldPathTable
+from diff_tf_parser import iter_tf_fields, snake_to_camel
+
+SEEDS = range(40)
+OUTPUT_ONLY = "[Output Only]"
+
+
+def baseline_api_fields(schema, azure=False):
+    """
+    Recursive `_get_api_field` and `_get_azure_api_field` of
+    `DiffApiParser` of the baseline, kept as the reference implementation
+    of the field walkers.
+    """
+    api_field_list = []
+    api_output_only = []
+
+    def walk(key_origin, value_origin):
+        nested = False
+        key_appendix = ''
+        if azure and not value_origin:
+            return
+        if key_origin != '':
+            key_appendix = key_origin + '.'
+
+        try:
+            for key, value in value_origin["properties"].items():
+                if key != "properties":
+                    walk(key_appendix+key, value)
+                else:
+                    walk(key_appendix, value)
+            nested = True
+        except KeyError:
+            pass
+
+        if azure:
+            try:
+                for key, value in (
+                    value_origin["oneOf"][0]["properties"].items()
+                ):
+                    if key != "properties":
+                        walk(key_appendix+key, value)
+                    else:
+                        walk(key_appendix, value)
+                nested = True
+            except KeyError:
+                pass
+
+            try:
+                for key, value in (
+                    value_origin["items"]["oneOf"][0]["properties"].items()
+                ):
+                    walk(key_appendix+key, value)
+                nested = True
+            except KeyError:
+                pass
+        else:
+            try:
+                for key, value in value_origin["items"]["properties"].items():
+                    walk(key_appendix+key, value)
+                nested = True
+            except KeyError:
+                pass
+
+        if not nested and key_origin not in api_field_list:
+            try:
+                if "[Output Only]" in value_origin["description"]:
+                    api_output_only.append(key_origin)
+                elif "Output only." in value_origin["description"]:
+                    api_output_only.append(key_origin)
+                else:
+                    api_field_list.append(key_origin)
+            except KeyError:
+                api_field_list.append(key_origin)
+
+    walk('', schema)
+    return api_field_list, api_output_only
+
+
+def baseline_snake_to_camel_schema(schema):
+    if isinstance(schema, dict):
+        return {
+            snake_to_camel(key): baseline_snake_to_camel_schema(value)
+            for key, value in schema.items()
+        }
+    elif isinstance(schema, list):
+        return [baseline_snake_to_camel_schema(item) for item in schema]
+    else:
+        return schema
+
+
+def baseline_tf_fields(schema, prepend=None):
+    """
+    Recursive `_get_tf_field` of `DiffTfParser` of the baseline, which
+    walked the schema converted to camelCase by `_snake_to_camel_schema`.
+    """
+    tf_field_list = []
+
+    def nested_attributes(key, type_list):
+        nested = False
+        for type in type_list:
+            if isinstance(type, list):
+                nested = True
+                for subkey in type[1].keys():
+                    tf_field_list.append(key + "." + subkey)
+                continue
+        if not nested:
+            tf_field_list.append(key)
+
+    def walk(key_origin, value_origin):
+        key_appendix = ''
+        if key_origin != '':
+            key_appendix = key_origin + '.'
+
+        try:
+            for key, value in value_origin["block"]["attributes"].items():
+                if not isinstance(value["type"], list):
+                    tf_field_list.append(key_appendix+key)
+                    continue
+                nested_attributes(key_appendix+key, value["type"])
+        except KeyError:
+            pass
+
+        try:
+            for key, value in value_origin["block"]["blockTypes"].items():
+                walk(key_appendix+key, value)
+        except KeyError:
+            pass
+
+    walk(prepend or '', baseline_snake_to_camel_schema(schema))
+    return tf_field_list
+
+
+class SchemaGenerator:
+    """
+    Generates random schemas with unique property names, so the baseline
+    walkers never see a field twice. Schema objects are shared between the
+    generated schemas like dereferenced discovery schemas share the
+    referenced ones.
+    """
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.count = 0
+        self.shared = []
+
+    def name(self):
+        self.count += 1
+        return self.rng.choice(["field", "sourceImage", "x"]) + str(
+            self.count
+        )
+
+    def leaf(self):
+        schema = {"type": self.rng.choice(["string", "integer", "boolean"])}
+        description = self.rng.choice([None, "A field.", f"{OUTPUT_ONLY} Id.",
+                                       "Output only. The state."])
+        if description is not None:
+            schema["description"] = description
+        if self.rng.random() < 0.2:
+            schema["additionalProperties"] = {"type": "string"}
+        return schema
+
+    def properties(self, depth, azure):
+        properties = {}
+        for _ in range(self.rng.randint(0, 4)):
+            value = self.schema(depth + 1, azure)
+            # A `properties` key is collapsed into the path of its parent;
+            # a leaf under it would be the field of its parent.
+            if (self.rng.random() < 0.1 and "properties" not in properties
+                    and value.get("properties")):
+                properties["properties"] = value
+            else:
+                properties[self.name()] = value
+        return properties
+
+    def schema(self, depth=0, azure=False):
+        if self.shared and self.rng.random() < 0.15:
+            return self.rng.choice(self.shared)
+        if depth > 4 or self.rng.random() < 0.4:
+            schema = self.leaf()
+            if azure and self.rng.random() < 0.1:
+                schema = {}
+        elif azure:
+            schema = self.rng.choice([
+                lambda: {"type": "object",
+                         "properties": self.properties(depth, azure)},
+                lambda: {"oneOf": [
+                    {"properties": self.properties(depth, azure)},
+                    {"properties": self.properties(depth, azure)},
+                ]},
+                lambda: {"type": "array", "items": {"oneOf": [
+                    {"properties": self.properties(depth, azure)},
+                ]}},
+                lambda: {"properties": self.properties(depth, azure),
+                         "oneOf": [
+                             {"properties": self.properties(depth, azure)},
+                         ]},
+            ])()
+        else:
+            schema = self.rng.choice([
+                lambda: {"type": "object",
+                         "properties": self.properties(depth, azure)},
+                lambda: {"type": "array", "items": {
+                    "type": "object",
+                    "properties": self.properties(depth, azure),
+                }},
+                lambda: {"type": "array", "items": {"type": "string"}},
+                lambda: {"properties": self.properties(depth, azure),
+                         "items": {
+                             "properties": self.properties(depth, azure),
+                         }},
+            ])()
+        if depth and schema and self.rng.random() < 0.3:
+            self.shared.append(schema)
+        return schema
+
+    def tf_name(self):
+        self.count += 1
+        return self.rng.choice(["name", "boot_disk", "ipv6_access_config"]) + (
+            f"_{self.count}"
+        )
+
+    def tf_type(self):
+        return self.rng.choice([
+            lambda: "string",
+            lambda: "number",
+            lambda: ["list", "string"],
+            lambda: ["map", "string"],
+            lambda: ["object", {self.tf_name(): "string"}],
+            lambda: ["list", ["object", {self.tf_name(): "string",
+                                         self.tf_name(): ["list", "number"]}]],
+            lambda: ["set", ["object", {}]],
+        ])()
+
+    def tf_block(self, depth=0):
+        block = {}
+        if self.rng.random() < 0.9:
+            block["attributes"] = {
+                self.tf_name(): {"type": self.tf_type(),
+                                 "optional": self.rng.random() < 0.5}
+                for _ in range(self.rng.randint(0, 5))
+            }
+        if depth < 4 and self.rng.random() < 0.7:
+            block["block_types"] = {
+                self.tf_name(): {"nesting_mode": "list",
+                                 **self.tf_block(depth + 1)}
+                for _ in range(self.rng.randint(0, 3))
+            }
+        if depth and self.rng.random() < 0.05:
+            # A nested block type without a block.
+            return {}
+        return {"block": block}
+
+
+def walker_fields(fields):
+    api_field_list = []
+    api_output_only = []
+    for path, is_output_only, _ in fields:
+        if is_output_only:
+            api_output_only.append(path)
+        else:
+            api_field_list.append(path)
+    return api_field_list, api_output_only
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_api_fields(seed):
+    generator = SchemaGenerator(seed)
+    schemas = [generator.schema() for _ in range(5)]
+    # The walker memoizes the shared objects over the components.
+    walker = DiffApiFieldWalker(DiffFieldPathTable())
+    for schema in schemas:
+        fields = walker_fields(walker.iter_fields(schema))
+        assert fields == baseline_api_fields(schema)
+        fields, output_only = walker.component_fields(schema)
+        assert (list(fields), output_only) == baseline_api_fields(schema)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_azure_api_fields(seed):
+    generator = SchemaGenerator(seed)
+    for _ in range(5):
+        schema = generator.schema(azure=True)
+        fields = walker_fields(iter_azure_api_fields(schema,
+                                                     DiffFieldPathTable()))
+        assert fields == baseline_api_fields(schema, azure=True)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_tf_fields(seed):
+    generator = SchemaGenerator(seed)
+    table = DiffFieldPathTable()
+    for prefix in ("", "spec", "spec.forProvider"):
+        schema = generator.tf_block()
+        fields = [path for path, _, _ in iter_tf_fields(schema, prefix,
+                                                        table)]
+        assert fields == baseline_tf_fields(schema, prefix)
+
+
+def test_compute_like_schema():
+    # Shared message types referenced as objects and as list items, with
+    # output only fields and a `properties` property.
+    access_config = {"type": "object", "properties": {
+        "natIP": {"type": "string"},
+        "kind": {"type": "string", "description": f"{OUTPUT_ONLY} Type."},
+    }}
+    network_interface = {"type": "object", "properties": {
+        "network": {"type": "string"},
+        "accessConfigs": {"type": "array", "items": access_config},
+        "ipv6AccessConfigs": {"type": "array", "items": access_config},
+    }}
+    schema = {"type": "object", "properties": {
+        "name": {"type": "string"},
+        "id": {"type": "string", "description": "Output only. Id."},
+        "networkInterfaces": {"type": "array", "items": network_interface},
+        "primaryInterface": network_interface,
+        "properties": {"type": "object", "properties": {
+            "labels": {"type": "object",
+                       "additionalProperties": {"type": "string"}},
+            "params": {"type": "object", "properties": {
+                "properties": {"properties": {"tags": {"type": "string"}}},
+            }},
+        }},
+    }}
+    walker = DiffApiFieldWalker(DiffFieldPathTable())
+    fields, output_only = walker.component_fields(schema)
+    assert (list(fields), output_only) == baseline_api_fields(schema)
+    assert list(fields) == [
+        "name",
+        "networkInterfaces.network",
+        "networkInterfaces.accessConfigs.natIP",
+        "networkInterfaces.ipv6AccessConfigs.natIP",
+        "primaryInterface.network",
+        "primaryInterface.accessConfigs.natIP",
+        "primaryInterface.ipv6AccessConfigs.natIP",
+        "labels",
+        "params..tags",
+    ]
+
+
+def test_deep_schemas():
+    # The baseline walkers exceeded the recursion limit.
+    schema = leaf = {"type": "string"}
+    block = {"block": {"attributes": {"leaf": {"type": "string"}}}}
+    for _ in range(5000):
+        schema = {"type": "object", "properties": {"a": schema}}
+        block = {"block": {"block_types": {"a": block}}}
+    path = ".".join(["a"] * 5000)
+    table = DiffFieldPathTable()
+    assert list(DiffApiFieldWalker(table).iter_fields(schema)) == [
+        (path, False, leaf)
+    ]
+    assert list(iter_azure_api_fields(schema, table)) == [
+        (path, False, leaf)
+    ]
+    assert [field for field, _, _ in iter_tf_fields(block, "", table)] == [
+        f"{path}.leaf"
+    ]
+
+
+def test_cyclic_schemas():
+    schema = {"type": "object", "properties": {"name": {"type": "string"}}}
+    schema["properties"]["parent"] = schema
+    table = DiffFieldPathTable()
+    assert [path for path, _, _ in DiffApiFieldWalker(table).iter_fields(
+        schema
+    )] == ["name", "parent"]
+    assert [path for path, _, _ in iter_azure_api_fields(schema, table)] == [
+        "name", "parent"
+    ]
+
+
+def test_tf_attribute_without_type():
+    # The baseline stopped the attribute walk of the block at an attribute
+    # without a type; it is reported as a field now.
+    schema = {"block": {"attributes": {
+        "name": {"type": "string"},
+        "untyped": {"optional": True},
+        "zone": {"type": "string"},
+    }}}
+    assert baseline_tf_fields(schema) == ["name"]
+    assert [path for path, _, _ in iter_tf_fields(
+        schema, "", DiffFieldPathTable()
+    )] == ["name", "untyped", "zone"]
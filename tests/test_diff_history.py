@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import pytest
+
+from diff_history import DiffHistory, DiffHistoryError, version_key
+
+FIELD = "scheduling.provisioningModel"
+
+
+@pytest.fixture
+def history(log):
+    with DiffHistory(log, ":memory:") as history:
+        yield history
+
+
+def add_run(history, provider_version, date, components, api="compute"):
+    return history.add_run("global", api, provider_version, date,
+                           f"/reports/{api}-{provider_version}-{date}",
+                           components)
+
+
+def instance(status, field=FIELD):
+    return ("Instance", "google_compute_instance", {status: [field]})
+
+
+def test_version_key():
+    assert version_key("6-10-0") > version_key("6-9-0")
+    assert version_key("6.10.0") == version_key("6-10-0")
+    assert version_key("10-0-0") > version_key("9-99-99")
+    versions = ["6-10-0", "5-44-2", "6-9-0", "6-10-1"]
+    assert sorted(versions, key=version_key) == [
+        "5-44-2", "6-9-0", "6-10-0", "6-10-1"
+    ]
+
+
+def test_first_implemented(history):
+    # The field flip-flops between missing and implemented; the first run
+    # in which it became implemented is reported.
+    add_run(history, "6-8-0", "2025-01-01_00-00-00", [instance("api_missing")])
+    add_run(history, "6-9-0", "2025-02-01_00-00-00",
+            [instance("api_implemented")])
+    add_run(history, "6-10-0", "2025-03-01_00-00-00",
+            [instance("api_missing")])
+    add_run(history, "6-11-0", "2025-04-01_00-00-00",
+            [instance("api_implemented")])
+    assert history.first_implemented("compute", FIELD) == {
+        "Instance": ("2025-02-01_00-00-00", "6-9-0")
+    }
+    assert [status for *_, status in history.field_history(
+        "compute", FIELD
+    )] == ["missing", "implemented", "missing", "implemented"]
+
+
+def test_first_implemented_per_component(history):
+    add_run(history, "6-8-0", "2025-01-01_00-00-00", [
+        instance("api_implemented"),
+        ("Disk", "google_compute_disk", {"api_missing": [FIELD]}),
+    ])
+    add_run(history, "6-9-0", "2025-02-01_00-00-00", [
+        instance("api_implemented"),
+        ("Disk", "google_compute_disk", {"api_implemented": [FIELD]}),
+    ])
+    assert history.first_implemented("compute", FIELD) == {
+        "Instance": ("2025-01-01_00-00-00", "6-8-0"),
+        "Disk": ("2025-02-01_00-00-00", "6-9-0"),
+    }
+    assert history.first_implemented("compute", FIELD, "Disk") == {
+        "Disk": ("2025-02-01_00-00-00", "6-9-0"),
+    }
+    assert history.first_implemented("compute", "unknown") == {}
+    assert history.first_implemented("container", FIELD) == {}
+
+
+def test_first_implemented_never(history):
+    add_run(history, "6-8-0", "2025-01-01_00-00-00", [instance("api_missing")])
+    add_run(history, "6-9-0", "2025-02-01_00-00-00", [instance("excluded")])
+    assert history.first_implemented("compute", FIELD) == {}
+
+
+def test_gap_trend(history):
+    report = {"api_implemented": ["a", "b"], "api_missing": ["c"],
+              "excluded": ["d"], "tf_specific": ["e"]}
+    # Runs are added out of the order of the provider versions, and 6-10-0
+    # is run twice.
+    add_run(history, "6-10-0", "2025-03-01_00-00-00",
+            [("Instance", "google_compute_instance", report)])
+    add_run(history, "6-9-0", "2025-02-01_00-00-00",
+            [("Instance", "google_compute_instance", report),
+             ("Disk", "google_compute_disk", {"api_missing": ["x"]})])
+    add_run(history, "6-10-0", "2025-03-02_00-00-00",
+            [("Instance", "google_compute_instance",
+              dict(report, api_missing=[]))])
+    add_run(history, "6-2-0", "2025-04-01_00-00-00",
+            [("Instance", "google_compute_instance", report)])
+    add_run(history, "6-10-0", "2025-03-03_00-00-00",
+            [("Instance", "google_compute_instance", report)], api="container")
+
+    assert history.gap_trend("compute") == [
+        ("6-2-0", "2025-04-01_00-00-00", 1, 4, 3, 2, 1),
+        ("6-9-0", "2025-02-01_00-00-00", 2, 5, 4, 2, 2),
+        ("6-10-0", "2025-03-02_00-00-00", 1, 3, 2, 2, 0),
+    ]
+    assert [row[0] for row in history.gap_trend("compute", last=2)] == [
+        "6-9-0", "6-10-0"
+    ]
+    assert history.gap_trend("storage") == []
+
+
+def test_has_run(history):
+    assert not history.has_run("/reports/compute-6-9-0-2025-02-01_00-00-00")
+    add_run(history, "6-9-0", "2025-02-01_00-00-00", [instance("api_missing")])
+    assert history.has_run("/reports/compute-6-9-0-2025-02-01_00-00-00")
+
+
+def test_failed_run_is_not_added(history):
+    add_run(history, "6-9-0", "2025-02-01_00-00-00", [instance("api_missing")])
+    # The duplicate component fails the whole run.
+    with pytest.raises(DiffHistoryError):
+        add_run(history, "6-10-0", "2025-03-01_00-00-00",
+                [instance("api_implemented"), instance("api_implemented")])
+    assert not history.has_run("/reports/compute-6-10-0-2025-03-01_00-00-00")
+    assert len(history.field_history("compute", FIELD)) == 1
+    assert [row[0] for row in history.gap_trend("compute")] == ["6-9-0"]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from diff_engine import DiffComponentResult
+from diff_incremental import (
+    DiffIncrementalState,
+    component_input_digest,
+    run_input_digest,
+    schema_digest
+)
+
+
+def test_component_input_digest():
+    fields = schema_digest((["name", "zone"], ["id"]))
+    tf = {"google_compute_instance": schema_digest({"block": {}})}
+    digest = component_input_digest("Instance", fields, tf, None)
+    assert digest == component_input_digest("Instance", fields, dict(tf),
+                                            None)
+    assert digest != component_input_digest(
+        "Instance", schema_digest((["name"], ["id"])), tf, None
+    )
+    assert digest != component_input_digest(
+        "Instance", fields, {"google_compute_instance": schema_digest({})},
+        None
+    )
+    assert digest != component_input_digest(
+        "Instance", fields, tf, {"Exclude": ["zone"]}
+    )
+
+
+def test_run_input_digest():
+    digest = run_input_digest(("20250101", "etag"), "lock", {})
+    assert digest == run_input_digest(("20250101", "etag"), "lock", {})
+    assert digest != run_input_digest(("20250102", "etag"), "lock", {})
+    assert digest != run_input_digest(("20250101", "etag"), "lock2", {})
+    assert digest != run_input_digest(("20250101", "etag"), "lock",
+                                      {"Instance": {}})
+    # Without a version, every component digest has to be computed.
+    assert run_input_digest((None, None), "lock", {}) is None
+    assert run_input_digest(("20250101", None), None, {}) is None
+
+
+def test_state(log, tmp_path):
+    result = DiffComponentResult(component="Instance",
+                                 tf_resource_name="google_compute_instance")
+    state = DiffIncrementalState(log, "inputs")
+    state.add("digest", result)
+    path = str(tmp_path / "report.inputs.json")
+    assert state.save(path)
+
+    state = DiffIncrementalState(log)
+    assert state.load(path)
+    assert state.inputs == "inputs"
+    assert state.digest("Instance") == "digest"
+    assert state.digest("Disk") is None
+    assert state.get("Instance", "digest") == result
+    assert state.get("Instance", "other") is None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import yaml
+
+from diff_api_compare import DiffApiCompare
+from diff_report_differ import diff_component_report, diff_reports
+
+OLD_REPORT = {
+    "api_implemented": ["name", "zone"],
+    "api_missing": ["labels", "tags.items", "shieldedInstanceConfig"],
+    "excluded": ["id"],
+    "tf_specific": ["project"],
+}
+NEW_REPORT = {
+    "api_implemented": ["name", "zone", "labels"],
+    "api_missing": ["shieldedInstanceConfig", "scheduling.provisioningModel"],
+    "excluded": ["id", "tags.items"],
+    "tf_specific": [],
+}
+
+
+def test_component_report_categories():
+    delta = diff_component_report("Instance", OLD_REPORT, NEW_REPORT)
+    assert delta.moved == {
+        ("api_missing", "api_implemented"): ["labels"],
+        ("api_missing", "excluded"): ["tags.items"],
+    }
+    assert delta.added == {"api_missing": ["scheduling.provisioningModel"]}
+    assert delta.removed == {"tf_specific": ["project"]}
+    assert (delta.added_count, delta.removed_count, delta.moved_count) == (
+        1, 1, 2
+    )
+    assert delta.entered("api_implemented") == ["labels"]
+    assert delta.entered("api_missing") == ["scheduling.provisioningModel"]
+    assert delta.entered("tf_specific") == []
+
+
+def test_component_report_direction():
+    # Swapping the reports swaps added and removed fields and the direction
+    # of the moves.
+    delta = diff_component_report("Instance", NEW_REPORT, OLD_REPORT)
+    assert delta.moved == {
+        ("api_implemented", "api_missing"): ["labels"],
+        ("excluded", "api_missing"): ["tags.items"],
+    }
+    assert delta.added == {"tf_specific": ["project"]}
+    assert delta.removed == {"api_missing": ["scheduling.provisioningModel"]}
+
+
+def test_component_report_unchanged():
+    reordered = {category: list(reversed(fields))
+                 for category, fields in OLD_REPORT.items()}
+    delta = diff_component_report("Instance", OLD_REPORT, reordered)
+    assert not delta
+    assert (delta.added, delta.removed, delta.moved) == ({}, {}, {})
+
+
+def test_component_report_new_category():
+    old = {"api_missing": ["a", "b"]}
+    new = {"api_missing": ["b"], "api_implemented": None,
+           "excluded": ["a", "c"]}
+    delta = diff_component_report("Disk", old, new)
+    assert delta.moved == {("api_missing", "excluded"): ["a"]}
+    assert delta.added == {"excluded": ["c"]}
+    assert delta.removed == {}
+
+
+def test_component_added_and_removed():
+    delta = diff_component_report("Disk", None, OLD_REPORT)
+    assert delta.added == OLD_REPORT
+    assert delta.removed == {} and delta.moved == {}
+
+    delta = diff_component_report("Disk", OLD_REPORT, {})
+    assert delta.removed == OLD_REPORT
+    assert delta.added == {} and delta.moved == {}
+
+
+def test_field_lists():
+    delta = diff_component_report("Instance", ["a", "b", "c"],
+                                  ["c", "d", "a"])
+    assert delta.added == {None: ["d"]}
+    assert delta.removed == {None: ["b"]}
+    assert delta.moved == {}
+
+
+def test_reports_components():
+    old = {"Instance": ["a", "b"], "Disk": ["x"], "Image": ["i"],
+           "Network": ["n"]}
+    new = {"Router": ["r"], "Instance": ["a", "c"], "Disk": ["x"],
+           "Image": ["i"]}
+    deltas = diff_reports(old, new)
+    # New components first, in the order of the new report, then the
+    # removed ones; unchanged components are skipped.
+    assert list(deltas) == ["Router", "Instance", "Network"]
+    assert deltas["Router"].added == {None: ["r"]}
+    assert deltas["Instance"].added == {None: ["c"]}
+    assert deltas["Instance"].removed == {None: ["b"]}
+    assert deltas["Network"].removed == {None: ["n"]}
+
+
+def test_reports_empty():
+    assert diff_reports(None, None) == {}
+    assert diff_reports({"Disk": []}, {"Disk": None}) == {}
+    assert list(diff_reports(None, {"Disk": ["x"]})) == ["Disk"]
+    assert list(diff_reports({"Disk": ["x"]}, None)) == ["Disk"]
+
+
+def test_reports_categories():
+    deltas = diff_reports({"Instance": OLD_REPORT},
+                          {"Instance": NEW_REPORT})
+    assert deltas["Instance"].entered("api_implemented") == ["labels"]
+
+
+def compare_apis(log, tmp_path, old, new):
+    old_path = tmp_path / "old-compare-apis.yaml"
+    old_path.write_text(yaml.dump(old))
+    compare = DiffApiCompare.__new__(DiffApiCompare)
+    compare.log = log
+    compare.cwd = str(tmp_path)
+    compare.old_yaml_report_path = str(old_path)
+    compare.api_comparison = new
+    assert compare._check_new_api_differences()
+    return compare.result
+
+
+def test_compare_apis_classification(log, tmp_path):
+    # Compare-apis reports list the fields present only in the beta API.
+    # Fields new in the list were added to beta, fields that left it were
+    # implemented in V1.
+    old = {
+        "Instance": ["a", "b"],
+        "Disk": ["x"],
+        "Network": ["n1", "n2"],
+        "Image": ["i"],
+    }
+    new = {
+        "Instance": ["a", "c"],
+        "Disk": ["x"],
+        "Router": ["r1", "r2"],
+        "Image": [],
+    }
+    assert compare_apis(log, tmp_path, old, new) == {
+        "Added to beta API": {
+            "Instance": ["c"],
+            "Router": ["r1", "r2"],
+        },
+        "Implemented in V1 API": {
+            "Instance": ["b"],
+            "Image": ["i"],
+            "Network": ["n1", "n2"],
+        },
+    }
+
+
+def test_compare_apis_unchanged(log, tmp_path):
+    report = {"Instance": ["a", "b"], "Disk": []}
+    assert compare_apis(log, tmp_path, report, {"Disk": [],
+                                                "Instance": ["b", "a"]}) == {
+        "Added to beta API": {},
+        "Implemented in V1 API": {},
+    }
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+#
+# Copyright 2025 Norbert Kamiński <norbert.kaminski@infogain.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import io
+import json
+
+import pytest
+
+from diff_tf_stream import DiffTfSchemaStream, DiffTfSchemaStreamError
+
+GOOGLE = "registry.terraform.io/hashicorp/google"
+GOOGLE_BETA = "registry.terraform.io/hashicorp/google-beta"
+CHUNK_SIZES = (1, 2, 3, 5, 7, 64, 1 << 20)
+RESOURCES = {"google_compute_instance", "google_compute_disk",
+             "google_storage_bucket"}
+
+SCHEMAS = {
+    "format_version": "1.0",
+    "provider_schemas": {
+        GOOGLE: {
+            "provider": {
+                "version": 0,
+                "block": {"description": "Braces } ] { [ in a \"skipped\""
+                                         " string \\"},
+            },
+            "resource_schemas": {
+                "google_compute_instance": {
+                    "version": 6,
+                    "block": {
+                        "attributes": {
+                            "name": {"type": "string", "required": True},
+                            "labels": {"type": ["map", "string"]},
+                            "scratch": {"type": ["list", ["object", {
+                                "size": "number",
+                                "interface": "string",
+                            }]]},
+                            "weight": {"type": "number",
+                                       "default": -12.5e-3},
+                            "note": {"type": "string",
+                                     "description": "Zürich été ☃"
+                                                    " \"quoted\" back\\slash"
+                                                    " \t tab"},
+                            "nothing": {"type": "string", "default": None},
+                        },
+                        "block_types": {
+                            "nested": {
+                                "nesting_mode": "list",
+                                "block": {"attributes": {
+                                    "deep": {"type": [[["string"]], []]},
+                                }},
+                            },
+                        },
+                    },
+                },
+                "google_compute_disk": {
+                    "version": 0,
+                    "block": {"attributes": {
+                        "size": {"type": "number", "default": 10},
+                        "skip": {"description": "}]\\\"[{"},
+                    }},
+                },
+                "google_storage_bucket": {
+                    "version": 1,
+                    "block": {"attributes": {"empty": {}, "list": []}},
+                },
+            },
+            "data_source_schemas": {
+                "google_compute_instance": {"version": 0, "block": {}},
+            },
+        },
+        GOOGLE_BETA: {
+            "provider": {"version": 0, "block": {}},
+            "resource_schemas": {
+                "google_compute_instance": {"version": 7, "block": {}},
+            },
+        },
+    },
+}
+
+
+def parse(document, resources, chunk_size=64):
+    if isinstance(document, str):
+        document = document.encode("utf-8")
+    stream = DiffTfSchemaStream(io.BytesIO(document), resources,
+                                chunk_size=chunk_size)
+    return stream.parse(), stream
+
+
+def expected(document, resources):
+    schemas = json.loads(document)
+    return {
+        "format_version": schemas["format_version"],
+        "provider_schemas": {
+            provider: {"resource_schemas": {
+                name: schema
+                for name, schema in provider_schema.get(
+                    "resource_schemas", {}
+                ).items()
+                if name in resources
+            }}
+            for provider, provider_schema in (
+                schemas["provider_schemas"].items()
+            )
+        },
+    }
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("indent", (None, 2))
+@pytest.mark.parametrize("ensure_ascii", (True, False))
+def test_chunk_boundaries(chunk_size, indent, ensure_ascii):
+    # Every chunk size splits strings, escapes, numbers and multi-byte
+    # characters at a different place.
+    document = json.dumps(SCHEMAS, indent=indent, ensure_ascii=ensure_ascii)
+    schemas, _ = parse(document, RESOURCES, chunk_size=chunk_size)
+    assert schemas == expected(document, RESOURCES)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_resource_filtering(chunk_size):
+    document = json.dumps(SCHEMAS)
+    resources = {"google_compute_disk", "google_unknown"}
+    schemas, stream = parse(document, resources, chunk_size=chunk_size)
+    assert schemas == expected(document, resources)
+    assert list(schemas["provider_schemas"][GOOGLE]["resource_schemas"]) == [
+        "google_compute_disk"
+    ]
+    assert schemas["provider_schemas"][GOOGLE_BETA] == {
+        "resource_schemas": {}
+    }
+
+
+def test_resource_names_of_skipped_resources():
+    _, stream = parse(json.dumps(SCHEMAS), set())
+    assert stream.resource_names == {
+        GOOGLE: ["google_compute_instance", "google_compute_disk",
+                 "google_storage_bucket"],
+        GOOGLE_BETA: ["google_compute_instance"],
+    }
+
+
+def test_container_with_in_operator():
+    class Prefix:
+        def __contains__(self, resource):
+            return resource.startswith("google_compute_")
+
+    document = json.dumps(SCHEMAS)
+    schemas, _ = parse(document, Prefix())
+    assert schemas == expected(document, {"google_compute_instance",
+                                          "google_compute_disk"})
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_skipped_subtrees(chunk_size):
+    # Skipped values of every JSON type, with brackets and escaped quotes
+    # inside strings, are not decoded.
+    skipped = {
+        "string": "} ] \\\" { [",
+        "number": -0.5e+10,
+        "true": True,
+        "false": False,
+        "null": None,
+        "array": [[], [[{}]], ["]", "[", "\\"], 1, 2.5],
+        "object": {"a": {"b": {"c": ["}"]}}},
+    }
+    document = json.dumps({
+        "format_version": "1.0",
+        "skipped": skipped,
+        "provider_schemas": {
+            GOOGLE: {
+                "skipped": skipped,
+                "resource_schemas": {
+                    "google_skipped": skipped,
+                    "google_kept": {"block": skipped},
+                },
+                "data_source_schemas": skipped,
+            },
+        },
+        "trailing": list(skipped.values()),
+    })
+    schemas, _ = parse(document, {"google_kept"}, chunk_size=chunk_size)
+    assert schemas == {
+        "format_version": "1.0",
+        "provider_schemas": {GOOGLE: {"resource_schemas": {
+            "google_kept": {"block": skipped},
+        }}},
+    }
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_scalar_at_chunk_end(chunk_size):
+    for value in (0, 12345678901234567890, -1.25e-7, True, False, None):
+        document = ('{"format_version": "1.0", "n": %s, "provider_schemas":'
+                    ' {"p": {"resource_schemas": {"r": %s}}}}'
+                    % (json.dumps(value), json.dumps(value)))
+        schemas, _ = parse(document, {"r"}, chunk_size=chunk_size)
+        assert schemas["provider_schemas"]["p"]["resource_schemas"] == {
+            "r": value
+        }
+
+
+def test_empty_objects():
+    schemas, stream = parse('{"format_version": "1.0",'
+                            ' "provider_schemas": {}}', RESOURCES)
+    assert schemas == {"format_version": "1.0", "provider_schemas": {}}
+    assert stream.resource_names == {}
+
+    schemas, _ = parse('{"provider_schemas": {"p": {}}}', RESOURCES)
+    assert schemas == {"provider_schemas": {"p": {"resource_schemas": {}}}}
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 1 << 20))
+def test_truncated_input(chunk_size):
+    document = json.dumps(SCHEMAS, ensure_ascii=False).encode("utf-8")
+    for end in range(len(document)):
+        with pytest.raises(DiffTfSchemaStreamError):
+            parse(document[:end], RESOURCES, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize("document", (
+    "",
+    "[]",
+    '{"provider_schemas": {"p": {"resource_schemas": {"r": {}}}}} {}',
+    '{"provider_schemas" {}}',
+    '{"provider_schemas": {} "format_version": "1.0"}',
+    '{provider_schemas: {}}',
+    '{"provider_schemas": {"p": {"resource_schemas": {"r": {"a": tru}}}}}',
+    '{"provider_schemas": {"p": {"resource_schemas": {"r": [}}}}',
+))
+def test_invalid_input(document):
+    with pytest.raises(DiffTfSchemaStreamError):
+        parse(document, {"r"})